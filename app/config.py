@@ -7,9 +7,23 @@ class Config:
     start_hour: int = 7
     start_minute: int = 30
     interval_minutes: int = 30
+    end_hour: int = 14
+    end_minute: int = 30
     max_poleks_per_slot: int = 7
     auto_fix_errors: bool = True
     enable_sabtu: bool = False
+    # Pewarnaan slot R/E di sheet Jadwal: "fill" (warna per sel) atau
+    # "conditional" (aturan conditional formatting, ikut berubah saat diedit)
+    slot_coloring: str = "fill"
+    # Sheet hasil Excel: None = semua, nama preset ExcelWriter.SHEET_PRESETS
+    # ("lengkap", "harian", "jadwal") atau list nama sheet
+    output_sheets: object = None
+    # Sheet Jadwal: "none" (satu sheet), "hari" atau "poli" (satu sheet per
+    # HARI / POLI + sheet indeks); grid di atas batas Excel selalu dipecah
+    jadwal_partition: str = "none"
+    # Sheet jadwal yang dibaca: None = sheet "Reguler" & "Poleks"; atau regex
+    # nama sheet (mis. "Poli .*" untuk satu sheet per poli / lokasi)
+    schedule_sheet_pattern: str = None
 
     hari_order: dict = field(default_factory=lambda: {
         "Senin": 1,
@@ -27,4 +41,4 @@ class Config:
         return hari
 
     def time_slot_end(self):
-        return time(14, 30)
+        return time(self.end_hour, self.end_minute)
@@ -0,0 +1,191 @@
+"""
+ScheduleAggregates - Agregat jadwal yang dihitung sekali per versi grid
+Hitungan R/E per (hari, slot), per (poli, hari) dan total grid dihitung
+dari ScheduleMatrix dengan bincount lalu dipakai bersama oleh Scheduler,
+ExcelWriter (semua sheet), tab Visualisasi dan analyzer Kanban.
+
+Versi grid = objek DataFrame: grid tidak diubah in-place (Scheduler, regrid
+dan edit menghasilkan DataFrame baru), sehingga memo cukup memakai identitas
+objek grid + slot.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from app.core.schedule_matrix import ScheduleMatrix
+
+
+class ScheduleAggregates:
+    # Jumlah versi grid yang disimpan di memo (LRU)
+    MEMO_MAXSIZE = 8
+    _memo = OrderedDict()
+    _memo_lock = threading.Lock()
+
+    def __init__(self, grid_df: pd.DataFrame, slot_strings: List[str]):
+        """
+        Hitung semua agregat dari grid
+
+        Args:
+            grid_df: DataFrame grid (object atau ber-skema)
+            slot_strings: List slot waktu (slot yang tidak ada di grid = kosong)
+        """
+        self.slot_strings = list(slot_strings)
+        self.matrix = ScheduleMatrix.from_grid(grid_df, self.slot_strings, keep_missing=True)
+        matrix = self.matrix
+
+        # Per (hari, slot); urutan hari = kemunculan pertama
+        self.days = matrix.days
+        self.counts_r = matrix.counts_by_day(ScheduleMatrix.CODE_R)
+        self.counts_e = matrix.counts_by_day(ScheduleMatrix.CODE_E)
+
+        # Per (poli, hari); urutan = kemunculan pertama pasangan (NaN ikut)
+        pair_ids, pair_codes = pd.factorize(matrix.poli_idx * max(len(matrix.days), 1) + matrix.day_idx)
+        self.pair_ids = pair_ids
+        first_rows = np.unique(pair_ids, return_index=True)[1]
+        self.pair_poli = matrix.polis[matrix.poli_idx[first_rows]] if len(first_rows) else np.array([], dtype=object)
+        self.pair_hari = matrix.days[matrix.day_idx[first_rows]] if len(first_rows) else np.array([], dtype=object)
+        self.pair_r = matrix.count_by(pair_ids, len(pair_codes), ScheduleMatrix.CODE_R).sum(axis=1)
+        self.pair_e = matrix.count_by(pair_ids, len(pair_codes), ScheduleMatrix.CODE_E).sum(axis=1)
+
+        # Total grid
+        self.total_rows = len(grid_df)
+        self.total_r = int(self.counts_r.sum())
+        self.total_e = int(self.counts_e.sum())
+        self.total_doctors = grid_df["DOKTER"].nunique() if "DOKTER" in grid_df.columns else 0
+        self.total_poli = grid_df["POLI"].nunique() if "POLI" in grid_df.columns else 0
+        self.total_slots = self.total_rows * len(self.slot_strings)
+
+    # ======================================================
+    # MEMO PER VERSI GRID
+    # ======================================================
+
+    @classmethod
+    def for_grid(cls, grid_df: pd.DataFrame, slot_strings: List[str]) -> "ScheduleAggregates":
+        """
+        Agregat untuk grid ini (dihitung sekali per versi grid & slot)
+
+        Args:
+            grid_df: DataFrame grid
+            slot_strings: List slot waktu
+
+        Returns:
+            ScheduleAggregates
+        """
+        key = (id(grid_df), tuple(slot_strings))
+        with cls._memo_lock:
+            entry = cls._memo.get(key)
+            if entry is not None and entry[0]() is grid_df:
+                cls._memo.move_to_end(key)
+                return entry[1]
+
+        aggregates = cls(grid_df, slot_strings)
+        try:
+            ref = weakref.ref(grid_df)
+        except TypeError:
+            return aggregates
+        with cls._memo_lock:
+            cls._memo[key] = (ref, aggregates)
+            while len(cls._memo) > cls.MEMO_MAXSIZE:
+                cls._memo.popitem(last=False)
+        return aggregates
+
+    @classmethod
+    def clear_memo(cls):
+        """Kosongkan memo agregat"""
+        with cls._memo_lock:
+            cls._memo.clear()
+
+    # ======================================================
+    # TABEL TURUNAN
+    # ======================================================
+
+    def statistics(self) -> dict:
+        """
+        Statistik ringkas grid
+
+        Returns:
+            Dictionary total_rows, total_doctors, total_poli, total_slots,
+            total_r, total_e, total_empty, fill_percentage
+        """
+        filled = self.total_r + self.total_e
+        return {
+            "total_rows": self.total_rows,
+            "total_doctors": self.total_doctors,
+            "total_poli": self.total_poli,
+            "total_slots": self.total_slots,
+            "total_r": self.total_r,
+            "total_e": self.total_e,
+            "total_empty": self.total_slots - filled,
+            "fill_percentage": (filled / self.total_slots) * 100 if self.total_slots > 0 else 0
+        }
+
+    def sorted_day_positions(self) -> List[int]:
+        """Posisi hari (baris counts_*) urut nama hari, tanpa HARI NaN"""
+        positions = [i for i, day in enumerate(self.days) if not pd.isna(day)]
+        return sorted(positions, key=lambda i: self.days[i])
+
+    def day_slot_counts(self, day_pos: int, slot: str):
+        """(jumlah R, jumlah E) untuk satu hari & slot"""
+        col = self.matrix.slot_index[slot]
+        return int(self.counts_r[day_pos, col]), int(self.counts_e[day_pos, col])
+
+    def peak_hours(self) -> List[list]:
+        """
+        Jumlah dokter aktif (R/E) per hari & slot yang terisi
+
+        Returns:
+            List [hari, slot, jumlah] urut nama hari lalu slot
+        """
+        active = self.counts_r + self.counts_e
+        rows = []
+        for day_pos in self.sorted_day_positions():
+            for col in np.flatnonzero(active[day_pos] > 0):
+                rows.append([self.days[day_pos], self.slot_strings[col], active[day_pos, col]])
+        return rows
+
+    def overload_table(self, max_poleks: int) -> pd.DataFrame:
+        """Slot (hari, slot) dengan Poleks melebihi batas (lihat ScheduleMatrix)"""
+        return ScheduleMatrix.overload_from_counts(self.counts_e, self.days, self.slot_strings, max_poleks)
+
+    def poli_hours(self, interval: int, sort: bool = False) -> pd.DataFrame:
+        """
+        Jam Reguler/Poleks per (poli, hari)
+
+        Args:
+            interval: Interval slot dalam menit
+            sort: False = urutan kemunculan pertama (NaN ikut); True = urut
+                  seperti groupby(['POLI', 'HARI']) tanpa kunci NaN
+
+        Returns:
+            DataFrame kolom POLI, HARI, REGULER (JAM), POLEKS (JAM), TOTAL JAM
+        """
+        hours_r = [round(count * interval / 60, 2) for count in self.pair_r.tolist()]
+        hours_e = [round(count * interval / 60, 2) for count in self.pair_e.tolist()]
+        table = pd.DataFrame({
+            "POLI": self.pair_poli,
+            "HARI": self.pair_hari,
+            "REGULER (JAM)": hours_r,
+            "POLEKS (JAM)": hours_e,
+            "TOTAL JAM": [r + e for r, e in zip(hours_r, hours_e)]
+        })
+        if sort:
+            table = table[table["POLI"].notna() & table["HARI"].notna()]
+            order = self._group_order(table)
+            table = table.iloc[order].reset_index(drop=True)
+        return table
+
+    def _group_order(self, table: pd.DataFrame) -> np.ndarray:
+        """Urutan baris seperti kunci groupby (kategori: urut kategori grid)"""
+        keys = []
+        for col in ["POLI", "HARI"]:
+            source = self.matrix.meta[col] if col in self.matrix.meta.columns else None
+            if source is not None and isinstance(source.dtype, pd.CategoricalDtype):
+                keys.append(pd.Categorical(table[col], dtype=source.dtype).codes)
+            else:
+                keys.append(pd.factorize(table[col], sort=True)[0])
+        return np.lexsort(keys[::-1]) if len(table) else np.array([], dtype=np.int64)
@@ -4,21 +4,112 @@ DataCleaner - Modul untuk membersihkan data Excel sebelum diproses
 """
 
 import pandas as pd
+import numpy as np
 import io
+import os
 import re
-from typing import Union, List
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Union, List, Optional, Tuple
 import traceback
 
+from app.core.workbook_session import WorkbookSession
+
 
 class DataCleaner:
     """
     Class untuk membersihkan data dari berbagai sumber input
     """
     
-    def __init__(self):
-        """Inisialisasi DataCleaner"""
+    # Baris per blok saat sheet xlsx dibaca streaming (memori per blok)
+    READ_CHUNK_ROWS = 50_000
+    
+    # Sheet jadwal bawaan (urutan baca) jika Config.schedule_sheet_pattern kosong;
+    # nama sheet ini sekaligus menjadi Jenis Poli barisnya
+    SCHEDULE_SHEETS = ['Reguler', 'Poleks']
+    
+    # Proses pembaca sheet: parse XML sheet tertahan GIL, jadi beberapa sheet
+    # dibaca & dibersihkan di proses terpisah (waktu ≈ sheet terbesar); dibatasi
+    # os.cpu_count(): di host 1 CPU pool hanya menambah biaya start proses
+    READ_WORKERS = 4
+    
+    # File lebih kecil dari ini dibaca di proses utama (start proses & kirim
+    # hasil lebih mahal daripada membaca langsung)
+    READ_PARALLEL_MIN_BYTES = 1024 * 1024
+    
+    # Kolom jadwal per hari (nama setelah COLUMN_MAPPING)
+    HARI_COLUMNS = ['Senin', 'Selasa', 'Rabu', 'Kamis', "Jum'at", 'Sabtu']
+    
+    # Kolom penanda sheet asal tiap baris
+    SHEET_COLUMN = 'Sheet Asal'
+    
+    # Mapping nama kolom sumber → nama kolom standar
+    COLUMN_MAPPING = {
+        'Nama Dokter': 'Nama Dokter',
+        'nama dokter': 'Nama Dokter',
+        'Dokter': 'Nama Dokter',
+        'Poli Asal': 'Poli Asal',
+        'poli asal': 'Poli Asal',
+        'Poli': 'Poli Asal',
+        'Jenis Poli': 'Jenis Poli',
+        'jenis poli': 'Jenis Poli',
+        'Jenis': 'Jenis Poli',
+        'Senin': 'Senin',
+        'Selasa': 'Selasa',
+        'Rabu': 'Rabu',
+        'Kamis': 'Kamis',
+        "Jum'at": "Jum'at",
+        'Jumat': "Jum'at",
+        'Sabtu': 'Sabtu'
+    }
+    
+    # Pool proses dipakai bersama semua sesi dalam satu proses
+    _read_pool = None
+    _read_pool_lock = threading.Lock()
+    
+    def __init__(self, config=None):
+        """
+        Inisialisasi DataCleaner
+        
+        Args:
+            config: Config (opsional) untuk pola sheet jadwal
+                    (schedule_sheet_pattern, dibaca saat file diproses)
+        """
+        self.config = config
         print("✅ DataCleaner initialized")
     
+    @property
+    def sheet_pattern(self) -> Optional[str]:
+        """Pola regex nama sheet jadwal dari Config, None = SCHEDULE_SHEETS"""
+        return getattr(self.config, "schedule_sheet_pattern", None) or None
+    
+    @classmethod
+    def schedule_sheets(cls, sheet_names: List[str], pattern: str = None) -> List[Tuple[str, Optional[str]]]:
+        """
+        Sheet jadwal yang dibaca dari workbook
+        
+        Args:
+            sheet_names: Nama sheet di workbook (urutan file)
+            pattern: Regex nama sheet (fullmatch, tanpa beda huruf besar/kecil);
+                     None = SCHEDULE_SHEETS dengan urutan SCHEDULE_SHEETS
+            
+        Returns:
+            List (nama sheet, jenis poli) - jenis None jika sheet bukan
+            SCHEDULE_SHEETS (Jenis Poli dari kolom sheet)
+        """
+        if not pattern:
+            return [(sheet, sheet) for sheet in cls.SCHEDULE_SHEETS if sheet in sheet_names]
+        
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Pola sheet tidak valid '{pattern}': {e}")
+        return [(sheet, sheet if sheet in cls.SCHEDULE_SHEETS else None)
+                for sheet in sheet_names if regex.fullmatch(sheet)]
+    
     def clean(self, df_or_file) -> pd.DataFrame:
         """
         Clean data dari berbagai sumber
@@ -28,6 +119,7 @@ class DataCleaner:
                       1. BytesIO (file upload Streamlit)
                       2. String path ke file
                       3. DataFrame
+                      4. WorkbookSession (sheet yang sudah di-parse)
             
         Returns:
             DataFrame yang sudah dibersihkan
@@ -35,8 +127,13 @@ class DataCleaner:
         print(f"🔧 DataCleaner.clean() called with type: {type(df_or_file)}")
         
         try:
+            # Case 0: WorkbookSession (parse dipakai bersama Validator & preview)
+            if isinstance(df_or_file, WorkbookSession):
+                print(f"   Input is WorkbookSession ({df_or_file.key[:8]})...")
+                return self._clean_from_workbook(df_or_file)
+            
             # Case 1: BytesIO (file upload Streamlit)
-            if isinstance(df_or_file, io.BytesIO):
+            elif isinstance(df_or_file, io.BytesIO):
                 print("   Input is BytesIO, reading Excel file...")
                 return self._clean_from_bytesio(df_or_file)
             
@@ -68,73 +165,228 @@ class DataCleaner:
     
     def _clean_from_bytesio(self, bytes_io: io.BytesIO) -> pd.DataFrame:
         """Clean data dari BytesIO"""
+        return self._clean_from_workbook(WorkbookSession.from_file(bytes_io))
+    
+    def _clean_from_workbook(self, workbook: WorkbookSession) -> pd.DataFrame:
+        """Clean data dari WorkbookSession (dibaca & dibersihkan sekali per isi file)"""
+        pattern = self.sheet_pattern
+        cleaned = workbook.cached(("cleaned", pattern), lambda: self._read_workbook(workbook))
+        return cleaned.copy(deep=False)
+    
+    def _read_workbook(self, workbook: WorkbookSession) -> pd.DataFrame:
+        """Baca & bersihkan sheet jadwal (xlsx streaming, format lain via pandas)"""
+        if workbook.is_xlsx:
+            return self._clean_streaming(workbook)
+        return self._clean_from_frames(workbook)
+    
+    def _sources(self, sheet_names: List[str]) -> List[Tuple[str, Optional[str]]]:
+        """Sheet jadwal (nama, jenis) yang dibaca; fallback sheet pertama"""
+        pattern = self.sheet_pattern
+        sources = self.schedule_sheets(sheet_names, pattern)
+        
+        if not pattern:
+            for sheet in self.SCHEDULE_SHEETS:
+                if sheet not in sheet_names:
+                    print(f"   ⚠️ Sheet '{sheet}' not found")
+        elif sources:
+            print(f"   Sheets matching '{pattern}': {[sheet for sheet, _ in sources]}")
+        
+        if not sources:
+            # Fallback: baca sheet pertama
+            print("   No schedule sheets found, reading first sheet...")
+            sources.append((sheet_names[0], None))
+        return sources
+    
+    def _clean_streaming(self, workbook: WorkbookSession) -> pd.DataFrame:
+        """
+        Baca sheet jadwal secara streaming (openpyxl read-only): hanya kolom
+        yang dikenali COLUMN_MAPPING, langsung sebagai teks, dan dibersihkan
+        per blok READ_CHUNK_ROWS baris. Beberapa sheet dibaca bersamaan di
+        READ_WORKERS proses (paling banyak jumlah CPU); hasil digabung dengan
+        urutan sheet tetap. Teks kolom angka / tanggal dikoreksi seperti hasil
+        pd.read_excel (WorkbookSession.text_fixes) dan baris tanpa jadwal hari
+        dibuang setelah digabung, seperti pembersihan frame gabungan.
+        """
         try:
-            # Reset stream position
-            bytes_io.seek(0)
-            
-            # Baca sheet names
-            excel_file = pd.ExcelFile(bytes_io)
-            sheet_names = excel_file.sheet_names
+            sheet_names = workbook.sheet_names
             print(f"   Excel sheets found: {sheet_names}")
             
-            # Gabungkan sheet Reguler dan Poleks
-            all_data = []
+            sources = self._sources(sheet_names)
             
-            for sheet in ['Reguler', 'Poleks']:
-                if sheet in sheet_names:
-                    print(f"   Reading sheet: {sheet}")
-                    df = pd.read_excel(excel_file, sheet_name=sheet)
-                    df['Jenis Poli'] = sheet  # Tambahkan kolom jenis
-                    all_data.append(df)
-                else:
-                    print(f"   ⚠️ Sheet '{sheet}' not found")
+            started = time.perf_counter()
+            # Pool proses hanya menguntungkan jika ada CPU lain untuk sheet lain
+            workers = max(1, min(self.READ_WORKERS, len(sources), os.cpu_count() or 1))
+            if len(workbook.data) < self.READ_PARALLEL_MIN_BYTES:
+                workers = 1
             
-            if not all_data:
-                # Fallback: baca sheet pertama
-                print("   No Reguler/Poleks sheets, reading first sheet...")
-                df = pd.read_excel(excel_file, sheet_name=0)
-                all_data.append(df)
+            results = None
+            if workers > 1:
+                results = self._stream_sheets_parallel(workbook, sources)
+            if results is None:
+                workers = 1
+                results = [self._stream_sheet(workbook, sheet, jenis) for sheet, jenis in sources]
             
-            # Gabungkan semua data
-            combined_df = pd.concat(all_data, ignore_index=True)
-            print(f"   Combined data: {len(combined_df)} rows")
+            headers = [list(samples) + ([] if jenis is None else ['Jenis Poli'])
+                       for (_, _, _, samples), (_, jenis) in zip(results, sources)]
+            fixes = WorkbookSession.text_fixes([
+                (samples, {} if jenis is None else {'Jenis Poli': jenis})
+                for (_, _, _, samples), (_, jenis) in zip(results, sources)
+            ])
+            cleaned = [self._fix_text(frame, fix, sheet_headers)
+                       for (frames, _, _, _), sheet_headers, fix in zip(results, headers, fixes)
+                       for frame in frames]
+            total_rows = sum(rows for _, rows, _, _ in results)
+            slowest = max(elapsed for _, _, elapsed, _ in results)
+            print(f"   Streamed data: {total_rows} rows from {len(sources)} sheet(s) in {len(cleaned)} chunk(s), "
+                  f"{time.perf_counter() - started:.2f}s (sheet terlama {slowest:.2f}s, {workers} worker)")
             
-            # Clean dataframe
-            return self._clean_dataframe(combined_df)
+            if not cleaned:
+                return pd.DataFrame()
+            combined = pd.concat(cleaned, ignore_index=True)
+            
+            # Baris sheet tanpa (sebagian) kolom hari: semua kolom hari yang ada
+            # di sheet mana pun kosong (kolom yang tidak ada di hasil = kosong)
+            mapped = {name for sheet_headers in headers for name in self._mapped_names(sheet_headers)[0]}
+            if any(h in mapped for h in self.HARI_COLUMNS):
+                hari_cols = [h for h in self.HARI_COLUMNS if h in combined.columns]
+                days_empty = combined[hari_cols].isna().all(axis=1)
+                if days_empty.any():
+                    print(f"   Removed {int(days_empty.sum())} combined rows with all empty days")
+                    combined = combined[~days_empty].reset_index(drop=True)
+            return combined
             
         except Exception as e:
-            print(f"❌ Error reading from BytesIO: {e}")
+            print(f"❌ Error reading workbook: {e}")
             print(traceback.format_exc())
             raise
     
-    def _clean_from_excel(self, file_path: str) -> pd.DataFrame:
-        """Clean data dari file Excel"""
+    @classmethod
+    def _get_read_pool(cls) -> ProcessPoolExecutor:
+        with cls._read_pool_lock:
+            if cls._read_pool is None:
+                # spawn: aman untuk proses induk yang multi-thread (server Streamlit)
+                cls._read_pool = ProcessPoolExecutor(max_workers=cls.READ_WORKERS,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return cls._read_pool
+    
+    @classmethod
+    def _reset_read_pool(cls):
+        with cls._read_pool_lock:
+            if cls._read_pool is not None:
+                cls._read_pool.shutdown(wait=False, cancel_futures=True)
+                cls._read_pool = None
+    
+    def _stream_sheets_parallel(self, workbook: WorkbookSession, sources):
+        """
+        Baca sheet jadwal bersamaan di pool proses
+        
+        Args:
+            workbook: WorkbookSession
+            sources: List (nama sheet, jenis poli)
+            
+        Returns:
+            Hasil _stream_sheet per sheet (urutan sources), atau None jika
+            pool proses tidak tersedia (dibaca di proses utama)
+        """
         try:
-            excel_file = pd.ExcelFile(file_path)
-            sheet_names = excel_file.sheet_names
-            print(f"   Excel sheets: {sheet_names}")
+            pool = self._get_read_pool()
+            futures = [pool.submit(_stream_sheet_worker, workbook.data, workbook.key,
+                                   sheet, jenis, self.READ_CHUNK_ROWS)
+                       for sheet, jenis in sources]
+            return [future.result() for future in futures]
+        except (BrokenProcessPool, OSError) as e:
+            print(f"   ⚠️ Parallel sheet reading unavailable, reading sequentially: {e}")
+            self._reset_read_pool()
+            return None
+    
+    def _stream_sheet(self, workbook: WorkbookSession, sheet: str, jenis: Optional[str]):
+        """
+        Baca & bersihkan satu sheet secara streaming
+        
+        Args:
+            workbook: WorkbookSession
+            sheet: Nama sheet
+            jenis: Jenis Poli untuk semua baris sheet, None = dari kolom sheet
             
-            all_data = []
+        Returns:
+            Tuple (list frame bersih per blok, jumlah baris dibaca, detik,
+            contoh nilai per kolom untuk WorkbookSession.text_fixes)
+        """
+        started = time.perf_counter()
+        print(f"   Streaming sheet: {sheet}")
+        frames = []
+        rows = 0
+        samples = {}
+        for chunk in workbook.iter_text_chunks(sheet, list(self.COLUMN_MAPPING), self.READ_CHUNK_ROWS, samples):
+            rows += len(chunk)
+            if jenis is not None:
+                chunk['Jenis Poli'] = jenis  # Tambahkan kolom jenis
+            chunk[self.SHEET_COLUMN] = sheet
+            frames.append(self._clean_dataframe(chunk))
+        return frames, rows, time.perf_counter() - started, samples
+    
+    def _fix_text(self, df: pd.DataFrame, fix: dict, headers: List[str]) -> pd.DataFrame:
+        """
+        Terapkan koreksi teks WorkbookSession.text_fixes (per header sumber)
+        ke frame bersih (kolom sudah di-rename COLUMN_MAPPING)
+        
+        Args:
+            df: Frame bersih satu blok sheet
+            fix: {header sumber: jenis koreksi}
+            headers: Header sumber blok (urutan kolom sebelum dibersihkan)
             
-            for sheet in ['Reguler', 'Poleks']:
-                if sheet in sheet_names:
-                    df = pd.read_excel(excel_file, sheet_name=sheet)
-                    df['Jenis Poli'] = sheet
-                    all_data.append(df)
+        Returns:
+            Frame dengan teks kolom terkoreksi
+        """
+        if not fix or df.empty:
+            return df
+        # Kolom hasil berasal dari header pertama yang dipetakan ke namanya
+        sources = {}
+        for header, name in zip(headers, self._mapped_names(headers)[0]):
+            sources.setdefault(name, header)
+        fixed = {name: WorkbookSession.apply_text_fix(df[name], fix[header])
+                 for name, header in sources.items() if header in fix and name in df.columns}
+        return df.assign(**fixed) if fixed else df
+    
+    def _clean_from_frames(self, workbook: WorkbookSession) -> pd.DataFrame:
+        """Clean data dari frame sheet WorkbookSession (file non-xlsx, mis. .xls)"""
+        try:
+            sheet_names = workbook.sheet_names
+            print(f"   Excel sheets found: {sheet_names}")
+            
+            # Gabungkan sheet jadwal
+            all_data = []
             
-            if not all_data:
-                df = pd.read_excel(excel_file, sheet_name=0)
-                all_data.append(df)
+            for sheet, jenis in self._sources(sheet_names):
+                print(f"   Reading sheet: {sheet}")
+                # Frame sesi dipakai bersama: kolom jenis & sheet ditambahkan di frame baru
+                tags = {'Jenis Poli': jenis} if jenis is not None else {}
+                tags[self.SHEET_COLUMN] = sheet
+                all_data.append(workbook.sheet(sheet).assign(**tags))
             
+            # Gabungkan semua data
             combined_df = pd.concat(all_data, ignore_index=True)
+            print(f"   Combined data: {len(combined_df)} rows")
+            
+            # Clean dataframe
             return self._clean_dataframe(combined_df)
             
         except Exception as e:
-            print(f"❌ Error reading Excel file: {e}")
+            print(f"❌ Error reading workbook: {e}")
+            print(traceback.format_exc())
             raise
     
+    def _clean_from_excel(self, file_path: str) -> pd.DataFrame:
+        """Clean data dari file Excel"""
+        return self._clean_from_workbook(WorkbookSession.from_file(file_path))
+    
     def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Clean DataFrame yang sudah digabungkan"""
+        """
+        Clean DataFrame yang sudah digabungkan dalam satu pass terencana:
+        mapping kolom diselesaikan sekali di level nama (tanpa copy/rename
+        frame), teks dinormalisasi per nilai unik, dan baris dibuang dengan
+        satu mask gabungan saat frame hasil dibangun
+        """
         print(f"   Cleaning DataFrame with {len(df)} rows, {len(df.columns)} columns")
         
         if df.empty:
@@ -143,87 +395,40 @@ class DataCleaner:
         
         print(f"   Original columns: {list(df.columns)}")
         
-        # Buat copy untuk menghindari warning
-        df_clean = df.copy()
-        
-        # 1. Normalisasi nama kolom (jika ada)
-        if hasattr(df_clean, 'columns'):
-            df_clean.columns = [str(col).strip() for col in df_clean.columns]
-        else:
-            print("   ⚠️ DataFrame has no columns attribute")
-            return pd.DataFrame()
-        
-        # 2. Mapping nama kolom
-        column_mapping = {
-            'Nama Dokter': 'Nama Dokter',
-            'nama dokter': 'Nama Dokter',
-            'Dokter': 'Nama Dokter',
-            'Poli Asal': 'Poli Asal',
-            'poli asal': 'Poli Asal',
-            'Poli': 'Poli Asal',
-            'Jenis Poli': 'Jenis Poli',
-            'jenis poli': 'Jenis Poli',
-            'Jenis': 'Jenis Poli',
-            'Senin': 'Senin',
-            'Selasa': 'Selasa',
-            'Rabu': 'Rabu',
-            'Kamis': 'Kamis',
-            "Jum'at": "Jum'at",
-            'Jumat': "Jum'at",
-            'Sabtu': 'Sabtu'
-        }
-        
-        # Rename kolom
-        renamed_count = 0
-        for old_name, new_name in column_mapping.items():
-            if old_name in df_clean.columns and new_name not in df_clean.columns:
-                df_clean.rename(columns={old_name: new_name}, inplace=True)
-                renamed_count += 1
-                print(f"   Renamed column: {old_name} -> {new_name}")
-        
-        print(f"   Total columns renamed: {renamed_count}")
-        
-        # 3. Drop kolom yang tidak perlu
-        cols_to_drop = ['No', 'Unnamed: 0', 'Unnamed: 1', 'Unnamed: 2', 'Unnamed: 3', 'Unnamed: 4']
-        dropped_count = 0
-        for col in cols_to_drop:
-            if col in df_clean.columns:
-                df_clean.drop(columns=[col], inplace=True)
-                dropped_count += 1
-                print(f"   Dropped column: {col}")
-        
-        print(f"   Total columns dropped: {dropped_count}")
+        # 1-3. Rencana kolom: strip nama, mapping (COLUMN_MAPPING), drop
+        names, keep_positions = self._plan_columns(df)
         
         # 4. Validasi kolom required
         required_cols = ['Nama Dokter', 'Poli Asal']
-        missing_cols = [col for col in required_cols if col not in df_clean.columns]
+        missing_cols = [col for col in required_cols if col not in names]
         
         if missing_cols:
             print(f"   ❌ Missing required columns: {missing_cols}")
-            print(f"   Available columns: {list(df_clean.columns)}")
+            print(f"   Available columns: {names}")
             raise ValueError(f"Missing required columns: {missing_cols}")
         
         print(f"   ✓ All required columns present")
         
-        # 5. Clean data per kolom
-        # Nama Dokter
-        if 'Nama Dokter' in df_clean.columns:
-            df_clean['Nama Dokter'] = df_clean['Nama Dokter'].astype(str).str.strip()
-            # Remove empty doctor names
-            initial_count = len(df_clean)
-            mask = (df_clean['Nama Dokter'].isna()) | (df_clean['Nama Dokter'].isin(['nan', 'NaN', 'None', '']))
-            df_clean = df_clean[~mask].reset_index(drop=True)
-            print(f"   Removed {initial_count - len(df_clean)} rows with empty doctor names")
-        
-        # Poli Asal
-        if 'Poli Asal' in df_clean.columns:
-            df_clean['Poli Asal'] = df_clean['Poli Asal'].astype(str).str.strip()
-        
-        # Jenis Poli (jika ada)
-        if 'Jenis Poli' in df_clean.columns:
-            df_clean['Jenis Poli'] = df_clean['Jenis Poli'].astype(str).str.strip()
-            # Normalisasi nilai
-            df_clean['Jenis Poli'] = df_clean['Jenis Poli'].replace({
+        # Kolom sumber per nama hasil (nama pertama yang cocok, seperti df[nama])
+        source = {}
+        for name, position in zip(names, keep_positions):
+            source.setdefault(name, df.iloc[:, position])
+        
+        # 5. Clean data per kolom (kode per baris + teks unik; diambil saat frame dibangun)
+        n_rows = len(df)
+        columns = {}
+        codes, texts = self._clean_text(source['Nama Dokter'].to_numpy(dtype=object))
+        columns['Nama Dokter'] = (codes, texts)
+        # Elemen terakhir untuk kode -1 (NaN)
+        empty = (texts.isna() | texts.isin(['nan', 'NaN', 'None', ''])).to_numpy()
+        doctor_empty = np.append(empty, True)[codes]
+        
+        codes, texts = self._clean_text(source['Poli Asal'].to_numpy(dtype=object))
+        columns['Poli Asal'] = (codes, texts)
+        
+        if 'Jenis Poli' in source:
+            codes, texts = self._clean_text(source['Jenis Poli'].to_numpy(dtype=object))
+            texts = texts.replace({
                 'reguler': 'Reguler',
                 'poleks': 'Poleks',
                 'Polek': 'Poleks',
@@ -232,38 +437,51 @@ class DataCleaner:
                 'Reguler': 'Reguler',
                 'Poleks': 'Poleks'
             })
-        else:
+            columns['Jenis Poli'] = (codes, texts)
+        
+        # 6. Clean kolom hari (per nilai unik; kosong = semua hari tanpa jadwal)
+        hari_cols = self.HARI_COLUMNS
+        hari_cols_exist = [h for h in hari_cols if h in source]
+        days_empty = np.full(n_rows, bool(hari_cols_exist))
+        replaced = {}
+        for hari in hari_cols_exist:
+            codes, texts = self._clean_text(source[hari].to_numpy(dtype=object))
+            sentinel = texts.isin(['nan', 'NaN', 'NaT', 'None', '']).to_numpy()
+            texts = texts.mask(sentinel)
+            filled = np.append(texts.notna().to_numpy(), False)[codes]
+            days_empty &= ~filled
+            columns[hari] = (codes, texts)
+            replaced[hari] = np.append(sentinel, False)[codes]
+            print(f"   Cleaned column {hari}: {int((filled & ~doctor_empty).sum())} non-empty values")
+        
+        # 7. Satu mask gabungan: dokter kosong atau semua kolom hari kosong
+        print(f"   Removed {int(doctor_empty.sum())} rows with empty doctor names")
+        removed_days = int((days_empty & ~doctor_empty).sum())
+        if removed_days > 0:
+            print(f"   Removed {removed_days} rows with all empty days")
+        keep = ~(doctor_empty | days_empty)
+        
+        # 8. Bangun frame hasil sekali (urutan kolom seperti sumber, index baru)
+        result = {}
+        for name in source:
+            if name in columns:
+                codes, texts = columns[name]
+                result[name] = texts.array.take(codes[keep], allow_fill=True)
+            else:
+                result[name] = source[name].array[keep]
+        df_clean = pd.DataFrame(result, copy=False)
+        
+        # Seperti replace(..., None) setelah buang dokter kosong: kolom hari
+        # yang nilai kosongnya diganti menjadi object
+        object_cols = {name: object for name, hits in replaced.items() if hits[~doctor_empty].any()}
+        if object_cols:
+            df_clean = df_clean.astype(object_cols)
+        
+        if 'Jenis Poli' not in df_clean.columns:
             # Jika tidak ada kolom Jenis Poli, tambahkan default
             df_clean['Jenis Poli'] = 'Reguler'
             print(f"   Added default 'Jenis Poli' column")
         
-        # 6. Clean kolom hari
-        hari_cols = ['Senin', 'Selasa', 'Rabu', 'Kamis', "Jum'at", 'Sabtu']
-        hari_cleaned = {}
-        
-        for hari in hari_cols:
-            if hari in df_clean.columns:
-                # Konversi ke string dan clean
-                df_clean[hari] = df_clean[hari].astype(str).str.strip()
-                # Replace nilai kosong dengan None
-                df_clean[hari] = df_clean[hari].replace(['nan', 'NaN', 'NaT', 'None', ''], None)
-                non_empty = df_clean[hari].notna().sum()
-                hari_cleaned[hari] = non_empty
-                print(f"   Cleaned column {hari}: {non_empty} non-empty values")
-        
-        # 7. Drop baris yang semua kolom harinya kosong
-        hari_cols_exist = [h for h in hari_cols if h in df_clean.columns]
-        if hari_cols_exist:
-            initial_count = len(df_clean)
-            mask = df_clean[hari_cols_exist].isnull().all(axis=1)
-            df_clean = df_clean[~mask].reset_index(drop=True)
-            removed_count = initial_count - len(df_clean)
-            if removed_count > 0:
-                print(f"   Removed {removed_count} rows with all empty days")
-        
-        # 8. Reset index
-        df_clean = df_clean.reset_index(drop=True)
-        
         print(f"   ✅ Cleaning complete: {len(df_clean)} rows remaining")
         print(f"   Final columns: {list(df_clean.columns)}")
         
@@ -277,6 +495,70 @@ class DataCleaner:
         
         return df_clean
     
+    @staticmethod
+    def _clean_text(values: np.ndarray):
+        """
+        Teks ter-strip seperti astype(str).str.strip(), dihitung sekali per
+        nilai unik (jadwal & nama banyak berulang)
+        
+        Args:
+            values: Array object nilai sel
+            
+        Returns:
+            Tuple (kode per baris, -1 = kosong; Series teks per kode)
+        """
+        if pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+            codes, uniques = pd.factorize(values)
+        else:
+            # Campuran tipe (mis. 1, 1.0, True) tidak boleh digabung sebelum jadi teks
+            codes, uniques = np.arange(len(values)), values
+        return codes.astype(np.int32), pd.Series(uniques, dtype=object).astype(str).str.strip()
+    
+    def _plan_columns(self, df: pd.DataFrame):
+        """
+        Nama kolom hasil & posisi kolom sumbernya (strip nama, rename
+        COLUMN_MAPPING berurutan, drop kolom tidak perlu) tanpa menyentuh frame
+        
+        Args:
+            df: DataFrame sumber
+            
+        Returns:
+            Tuple (list nama kolom hasil, list posisi kolom di df)
+        """
+        names, renamed = self._mapped_names([str(col).strip() for col in df.columns])
+        for old_name, new_name in renamed:
+            print(f"   Renamed column: {old_name} -> {new_name}")
+        
+        print(f"   Total columns renamed: {len(renamed)}")
+        
+        cols_to_drop = ['No', 'Unnamed: 0', 'Unnamed: 1', 'Unnamed: 2', 'Unnamed: 3', 'Unnamed: 4']
+        dropped = [col for col in cols_to_drop if col in names]
+        for col in dropped:
+            print(f"   Dropped column: {col}")
+        
+        print(f"   Total columns dropped: {len(dropped)}")
+        
+        positions = [i for i, name in enumerate(names) if name not in dropped]
+        return [names[i] for i in positions], positions
+    
+    def _mapped_names(self, names: List[str]):
+        """
+        Rename COLUMN_MAPPING berurutan: rename sebelumnya ikut menentukan
+        rename berikutnya
+        
+        Args:
+            names: Nama kolom (sudah di-strip)
+            
+        Returns:
+            Tuple (list nama kolom hasil, list (nama lama, nama baru))
+        """
+        renamed = []
+        for old_name, new_name in self.COLUMN_MAPPING.items():
+            if old_name in names and new_name not in names:
+                names = [new_name if name == old_name else name for name in names]
+                renamed.append((old_name, new_name))
+        return names, renamed
+    
     def validate_time_format(self, time_str: str) -> bool:
         """
         Validasi format waktu
@@ -385,8 +667,16 @@ def validate_excel_file(file_path: str) -> bool:
         return False
 
 
+def _stream_sheet_worker(data: bytes, key: str, sheet: str, jenis: Optional[str], chunk_rows: int):
+    """Baca & bersihkan satu sheet di proses pool (lihat DataCleaner._stream_sheet)"""
+    cleaner = DataCleaner()
+    cleaner.READ_CHUNK_ROWS = chunk_rows
+    return cleaner._stream_sheet(WorkbookSession(data, key), sheet, jenis)
+
+
 # ============================================================
 # MODULE EXPORTS
 # ============================================================
 
 __all__ = ['DataCleaner', 'clean_data', 'validate_excel_file']
+
@@ -0,0 +1,641 @@
+"""
+StreamingExcelWriter - Mode tulis streaming untuk ExcelWriter.write
+Memakai openpyxl write-only: setiap baris dikirim sekali ke sheet dengan
+style yang sudah ditentukan dari data (tanpa pass styling ulang per sel),
+dan lebar kolom dihitung dari DataFrame / baris data, bukan dari worksheet.
+Isi dan format sheet hasil sama dengan mode standar.
+"""
+
+import io
+import time
+import traceback
+from copy import copy
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.hyperlink import Hyperlink
+
+
+class _StyleCache:
+    """
+    Cache kombinasi style → StyleArray sehingga setiap sel cukup menyalin
+    indeks style yang sudah terdaftar di workbook (tanpa hashing objek style)
+    """
+
+    def __init__(self):
+        self._arrays = {}
+
+    def cell(self, ws, value, key, font=None, fill=None, border=None,
+             alignment=None, number_format=None, protection=None):
+        cell = WriteOnlyCell(ws, value)
+        style = self._arrays.get(key)
+        if style is None:
+            if font is not None:
+                cell.font = font
+            if fill is not None:
+                cell.fill = fill
+            if border is not None:
+                cell.border = border
+            if alignment is not None:
+                cell.alignment = alignment
+            if number_format is not None:
+                cell.number_format = number_format
+            if protection is not None:
+                cell.protection = protection
+            self._arrays[key] = copy(cell._style)
+        else:
+            cell._style = copy(style)
+        return cell
+
+
+class StreamingExcelWriter:
+    # Style tambahan yang di mode standar dibuat per sel
+    FONT_CONFLICT = Font(size=12, bold=True)
+    FONT_LINK = Font(size=10, color="0563C1", underline="single")
+    TINGKAT_FILLS = {
+        "TINGGI": PatternFill("solid", fgColor="FFC7CE"),  # Merah muda
+        "SEDANG": PatternFill("solid", fgColor="FFE699"),  # Kuning muda
+        "RENDAH": PatternFill("solid", fgColor="C6EFCE"),  # Hijau muda
+    }
+
+    def __init__(self, writer):
+        """
+        Inisialisasi StreamingExcelWriter
+
+        Args:
+            writer: ExcelWriter (sumber style, konfigurasi & data baris sheet)
+        """
+        self.writer = writer
+        self.styles = _StyleCache()
+
+    def write(self, source_file, df_grid, slot_str, placeholder_sheets=None, sheets=None, partition="none"):
+        """
+        Tulis workbook hasil secara streaming
+
+        Args:
+            source_file: File Excel asli (BytesIO) yang sheet-nya ikut disalin
+            df_grid: DataFrame grid hasil Scheduler
+            slot_str: List string slot waktu
+            placeholder_sheets: Nama sheet asli yang dibuat kosong (isinya
+                                digabung belakangan oleh app.core.xlsx_merge)
+            sheets: Sheet hasil yang dibuat (None = semua OUTPUT_SHEETS)
+            partition: Pemisahan sheet Jadwal ("none", "hari", "poli"); grid
+                       di atas batas Excel selalu dipecah
+
+        Returns:
+            BytesIO buffer berisi file Excel
+        """
+        w = self.writer
+        source_wb = None if placeholder_sheets is not None else self._open_source(source_file)
+        originals = list(placeholder_sheets or [])
+        if source_wb is not None:
+            originals = [name for name in source_wb.sheetnames if name not in w.OUTPUT_SHEETS]
+
+        # Urutan nama sheet seperti mode standar sebelum _reorder_sheets
+        selected = w.OUTPUT_SHEETS if sheets is None else sheets
+        generated = [name for name in ["Rekap Layanan", "Rekap Poli", "Rekap Dokter", "Peak Hour Analysis",
+                                       "Conflict Dokter", "Peta Konflik Dokter", "Grafik Poli", "Summary"]
+                     if name in selected]
+        creation_order = (["Jadwal"] if "Jadwal" in selected else []) + originals + generated
+        sheet_order = w._sheet_order(creation_order)
+
+        # Sheet partisi menyusul sheet indeks "Jadwal"
+        parts = []
+        if "Jadwal" in selected and w._jadwal_partitioned(df_grid, slot_str, partition):
+            taken = {name.lower() for name in sheet_order}
+            parts = [(w._partition_sheet_name(label, taken), rows, slots)
+                     for label, rows, slots in w._jadwal_partitions(df_grid, slot_str, partition)]
+            part_names = [name for name, _, _ in parts]
+            for order in (creation_order, sheet_order):
+                position = order.index("Jadwal") + 1
+                order[position:position] = part_names
+            print(f"   Jadwal split into {len(parts)} sheet(s) ({partition})")
+
+        wb = Workbook(write_only=True)
+        worksheets = {name: wb.create_sheet(name) for name in sheet_order}
+
+        def write_jadwal(ws):
+            if parts:
+                self._write_jadwal_partitions(ws, worksheets, parts, df_grid, slot_str, partition)
+            else:
+                self._write_jadwal(ws, df_grid, slot_str)
+
+        builders = [
+            ("Jadwal", write_jadwal),
+            ("Rekap Layanan", lambda ws: self._write_table(
+                ws, ["POLI", "HARI", "DOKTER", "JENIS", "WAKTU LAYANAN"],
+                w._sheet_payload("Rekap Layanan", df_grid, slot_str))),
+            ("Rekap Poli", lambda ws: self._write_rekap_poli(ws, df_grid, slot_str)),
+            ("Rekap Dokter", lambda ws: self._write_table(
+                ws, ["DOKTER", "HARI", "SHIFT", "TOTAL JAM"],
+                w._sheet_payload("Rekap Dokter", df_grid, slot_str))),
+            ("Peak Hour Analysis", lambda ws: self._write_table(
+                ws, ["HARI", "SLOT", "JUMLAH DOKTER", "LEVEL"],
+                w._sheet_payload("Peak Hour Analysis", df_grid, slot_str))),
+            ("Conflict Dokter", lambda ws: self._write_table(
+                ws, ["DOKTER", "HARI", "SLOT", "KETERANGAN", "TINGKAT"],
+                w._sheet_payload("Conflict Dokter", df_grid, slot_str), tingkat_fill=True)),
+            ("Peta Konflik Dokter", lambda ws: self._write_conflict_map(ws, df_grid, slot_str)),
+            ("Grafik Poli", lambda ws: self._write_grafik(ws, df_grid, slot_str)),
+            ("Summary", lambda ws: self._write_summary(ws, df_grid, slot_str, creation_order)),
+        ]
+
+        if source_wb is not None:
+            for name in originals:
+                self._copy_source_sheet(worksheets[name], source_wb[name])
+            source_wb.close()
+
+        for sheet_name, build in builders:
+            if sheet_name not in selected:
+                continue
+            w._check_cancelled()
+            print(f"Streaming '{sheet_name}' sheet...")
+            started = time.perf_counter()
+            try:
+                build(worksheets[sheet_name])
+            except Exception as e:
+                print(f"⚠️ Error creating sheet '{sheet_name}': {e}")
+                print(traceback.format_exc())
+            w._record_timing(sheet_name, "tulis", time.perf_counter() - started)
+
+        w._check_cancelled()
+        buf = io.BytesIO()
+        wb.save(buf)
+        buf.seek(0)
+        print(f"✅ Excel file streamed successfully: {buf.getbuffer().nbytes:,} bytes")
+        return buf
+
+    # ======================================================
+    # UTILITAS
+    # ======================================================
+
+    def _open_source(self, source_file):
+        """Buka workbook sumber dalam mode read-only (None jika gagal)"""
+        try:
+            if hasattr(source_file, 'read'):
+                source_file.seek(0)
+                return load_workbook(source_file, read_only=True)
+        except Exception as e:
+            print(f"⚠️ Could not load source workbook: {e}")
+        return None
+
+    @staticmethod
+    def _text_length(value):
+        """Panjang teks sel untuk lebar kolom (sel kosong/falsy = 0)"""
+        try:
+            return len(str(value)) if value else 0
+        except Exception:
+            return 0
+
+    def _set_widths(self, ws, max_lengths):
+        """Set lebar kolom (harus sebelum baris pertama di mode write-only)"""
+        for col, max_length in enumerate(max_lengths, start=1):
+            ws.column_dimensions[get_column_letter(col)].width = self.writer._column_width(max_length)
+
+    def _row_widths(self, rows, n_cols):
+        """Panjang teks maksimum per kolom dari list baris"""
+        lengths = [0] * n_cols
+        for row in rows:
+            for col, value in enumerate(row):
+                length = self._text_length(value)
+                if length > lengths[col]:
+                    lengths[col] = length
+        return lengths
+
+    def _plain(self, ws, value):
+        """Sel tanpa style khusus (font default mode standar)"""
+        return self.styles.cell(ws, value, 'plain', font=self.writer.font_normal)
+
+    def _header_cell(self, ws, value, border=None):
+        w = self.writer
+        border = border or w.thin_border
+        return self.styles.cell(ws, value, ('header', id(border)), font=w.font_header,
+                                fill=w.fill_header, alignment=w.align_center, border=border)
+
+    # ======================================================
+    # SHEET JADWAL
+    # ======================================================
+
+    @staticmethod
+    def _factorize(values):
+        """Kode & nilai unik (object) satu kolom; NaN/None ikut sebagai nilai"""
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        return codes, np.asarray(uniques, dtype=object)
+
+    @staticmethod
+    def _normalized(value):
+        try:
+            return str(value).strip() if value else ""
+        except Exception:
+            return ""
+
+    def _write_jadwal(self, ws, df_grid, slot_str):
+        jadwal = self._prepare_jadwal(df_grid, slot_str)
+        self._append_jadwal(ws, jadwal, range(jadwal["n_rows"]), range(len(slot_str)),
+                            conditional=jadwal["conditional"])
+
+    def _prepare_jadwal(self, df_grid, slot_str):
+        """
+        Nilai, jenis warna & lebar kolom sel Jadwal untuk seluruh grid.
+        Urutan Poleks (overload) dihitung per (hari, slot) di seluruh grid
+        sehingga sama saja apakah baris ditulis ke satu sheet atau dipecah.
+        """
+        w = self.writer
+        meta_headers = ["POLI", "JENIS", "HARI", "DOKTER", "JAM"]
+        headers = meta_headers + list(slot_str)
+
+        conditional = w.slot_coloring == "conditional"
+        if df_grid is not None and not df_grid.empty:
+            if conditional:
+                df_grid = w._normalize_slot_values(df_grid, slot_str)
+            n_rows = len(df_grid)
+            columns = [df_grid[h].to_numpy(dtype=object) if h in df_grid.columns
+                       else np.full(n_rows, "", dtype=object) for h in headers]
+            color_rows = True
+        else:
+            # Contoh jika tidak ada data (sama dengan mode standar)
+            n_rows = 1
+            example = ["Poli Anak", "Reguler", "Senin", "dr. Contoh", "07:30-10:00"] + [""] * len(slot_str)
+            columns = [np.array([v], dtype=object) for v in example]
+            color_rows = False
+
+        # Baris dengan HARI kosong tidak diwarnai (nilai slot dibiarkan)
+        hari_codes, hari_uniques = self._factorize(columns[2])
+        hari_norm = np.array([self._normalized(v) for v in hari_uniques], dtype=object)
+        hari_ids, _ = pd.factorize(hari_norm[hari_codes])
+        keep = (hari_norm[hari_codes] == "") | (not color_rows)
+
+        # Jenis sel slot: 0 = kosong/lain, 1 = R, 2 = E dalam batas, 3 = E overload
+        n_slots = len(slot_str)
+        kinds = np.zeros((n_rows, n_slots), dtype=np.int8)
+        slot_values = []
+        lengths = [self._text_length(h) for h in headers]
+        for j in range(n_slots):
+            values = columns[5 + j]
+            codes, uniques = self._factorize(values)
+            norm = np.array([self._normalized(v) for v in uniques], dtype=object)
+            unique_kind = np.where(norm == "R", 1, np.where(norm == "E", 2, 0)).astype(np.int8)
+            kinds[:, j] = unique_kind[codes]
+            slot_values.append(values)
+
+            # Nilai yang ditulis: R → "R", E → nilai asli, lain → "" (kecuali baris keep)
+            written = np.zeros(len(uniques), dtype=bool)
+            written[np.unique(codes[keep])] = True
+            written[np.unique(codes[~keep & (kinds[:, j] == 2)])] = True
+            candidates = [self._text_length(u) for u in uniques[written]]
+            if ((kinds[:, j] == 1) & ~keep).any():
+                candidates.append(1)
+            lengths[5 + j] = max([lengths[5 + j]] + candidates)
+
+        kinds[keep] = 0
+
+        # Urutan Poleks per (hari, slot) sesuai urutan baris → overload jika >= batas
+        is_e = kinds == 2
+        if is_e.any():
+            position = pd.DataFrame(is_e.astype(np.int32)).groupby(hari_ids).cumsum().to_numpy() - 1
+            kinds[is_e & (position >= w.max_e)] = 3
+
+        for j in range(5):
+            codes, uniques = self._factorize(columns[j])
+            lengths[j] = max([lengths[j]] + [self._text_length(u) for u in uniques])
+
+        return {"headers": headers, "columns": columns, "slot_values": slot_values, "kinds": kinds,
+                "keep": keep, "lengths": lengths, "n_rows": n_rows, "color_rows": color_rows,
+                "conditional": conditional}
+
+    def _append_jadwal(self, ws, jadwal, rows, slots, conditional):
+        """
+        Tulis header + baris Jadwal terpilih ke satu sheet write-only
+
+        Args:
+            ws: Worksheet write-only
+            jadwal: Hasil _prepare_jadwal
+            rows: Posisi baris grid yang ditulis (urut)
+            slots: Range posisi slot yang ditulis
+            conditional: True = warna slot dari aturan conditional formatting
+        """
+        w = self.writer
+        headers = jadwal["headers"][:5] + [jadwal["headers"][5 + j] for j in slots]
+        columns = jadwal["columns"]
+        slot_values = jadwal["slot_values"]
+        kinds = jadwal["kinds"]
+        keep = jadwal["keep"]
+        n_rows = len(rows)
+        n_slots = len(slots)
+
+        self._set_widths(ws, jadwal["lengths"][:5] + [jadwal["lengths"][5 + j] for j in slots])
+        ws.freeze_panes = "F2"
+
+        # Mode conditional: warna dari aturan sheet, sel slot tanpa fill
+        slot_fills = {1: w.fill_r, 2: w.fill_e, 3: w.fill_over}
+        if conditional:
+            slot_fills = {}
+            if jadwal["color_rows"]:
+                w._add_slot_conditional_formatting(ws, n_rows, n_slots)
+
+        ws.append([self._header_cell(ws, h) for h in headers])
+
+        for local, i in enumerate(rows):
+            gray = (local % 2 == 0)  # baris sheet genap
+            row = []
+            for j in range(5):
+                alignment = w.align_left if j < 4 else w.align_center
+                row.append(self.styles.cell(
+                    ws, columns[j][i], ('jadwal_meta', j < 4, gray),
+                    font=w.font_normal, border=w.thin_border, alignment=alignment,
+                    fill=w.fill_gray if gray else None
+                ))
+            kind_row = kinds[i]
+            keep_row = keep[i]
+            for j in slots:
+                kind = int(kind_row[j])
+                if keep_row:
+                    value = slot_values[j][i]
+                elif kind == 0:
+                    value = ""
+                elif kind == 1:
+                    value = "R"
+                else:
+                    value = slot_values[j][i]
+                row.append(self.styles.cell(
+                    ws, value, ('jadwal_slot', kind),
+                    font=w.font_normal, border=w.thin_border, alignment=w.align_center,
+                    fill=slot_fills.get(kind)
+                ))
+            ws.append(row)
+
+    def _write_jadwal_partitions(self, ws_index, worksheets, parts, df_grid, slot_str, partition):
+        """
+        Sheet indeks "Jadwal" (hyperlink ke tiap partisi) + sheet partisi.
+        Setiap sheet partisi ditulis penuh lalu ditinggalkan (write-only),
+        jadi memori tidak bertambah dengan jumlah partisi.
+
+        Args:
+            ws_index: Worksheet "Jadwal" (indeks)
+            worksheets: Dict nama → worksheet write-only
+            parts: List (nama sheet, posisi baris, range posisi slot)
+            df_grid: DataFrame grid ber-skema
+            slot_str: List slot waktu
+            partition: "none", "hari" atau "poli"
+        """
+        w = self.writer
+        jadwal = self._prepare_jadwal(df_grid, slot_str)
+
+        # COUNTIFS per sheet hanya benar jika semua baris satu HARI ada di
+        # satu sheet; selain itu overload diwarnai per sel dari seluruh grid
+        conditional = jadwal["conditional"]
+        if conditional and not (partition == "hari" and len(df_grid) + 1 <= w.JADWAL_MAX_ROWS):
+            print("   ⚠️ Conditional coloring needs whole HARI per sheet, using cell fills")
+            conditional = False
+
+        key_header = {"hari": "HARI", "poli": "POLI"}.get(partition, "BAGIAN")
+        header = ["NO", "SHEET", key_header, "JUMLAH BARIS", "SLOT"]
+        rows = []
+        for number, (name, part_rows, part_slots) in enumerate(parts, start=1):
+            label = name[len("Jadwal "):] if name.startswith("Jadwal ") else name
+            slot_range = (f"{slot_str[part_slots[0]]} - {slot_str[part_slots[-1]]}"
+                          if len(part_slots) else "")
+            rows.append([number, name, label, len(part_rows), slot_range])
+
+        self._set_widths(ws_index, [max(a, b) for a, b in zip(self._row_widths(rows, len(header)),
+                                                               map(self._text_length, header))])
+        ws_index.freeze_panes = "A2"
+        ws_index.append([self._header_cell(ws_index, h) for h in header])
+        for r, row in enumerate(rows, start=2):
+            out = []
+            for c, value in enumerate(row, start=1):
+                if c == 2:
+                    cell = self.styles.cell(ws_index, value, 'jadwal_link', font=self.FONT_LINK,
+                                            border=w.thin_border, alignment=w.align_left)
+                    target = value.replace("'", "''")
+                    cell.hyperlink = Hyperlink(ref=f"B{r}", location=f"'{target}'!A1", display=value)
+                else:
+                    cell = self.styles.cell(ws_index, value, ('jadwal_index', c == 3), font=w.font_normal,
+                                            border=w.thin_border,
+                                            alignment=w.align_left if c == 3 else w.align_center)
+                out.append(cell)
+            ws_index.append(out)
+
+        for name, part_rows, part_slots in parts:
+            w._check_cancelled()
+            self._append_jadwal(worksheets[name], jadwal, part_rows, part_slots, conditional)
+
+    # ======================================================
+    # SHEET TABEL (REKAP, PEAK HOUR, CONFLICT)
+    # ======================================================
+
+    def _write_table(self, ws, header, rows, tingkat_fill=False, total_row=None):
+        """
+        Tulis sheet bergaya rekap (_style_rekap_sheet) dalam satu pass
+
+        Args:
+            ws: Worksheet write-only
+            header: List judul kolom
+            rows: List baris data
+            tingkat_fill: Warnai baris menurut kolom TINGKAT (sheet Conflict)
+            total_row: Baris TOTAL (bold, fill total) di akhir, opsional
+        """
+        w = self.writer
+        data_rows = list(rows) + ([total_row] if total_row else [])
+        n_cols = max([len(header)] + [len(r) for r in data_rows])
+        self._set_widths(ws, self._row_widths([header] + data_rows, n_cols))
+        ws.freeze_panes = "A2"
+
+        padded_header = list(header) + [None] * (n_cols - len(header))
+        if not data_rows:
+            ws.append([self._plain(ws, v) for v in padded_header])
+            return
+        ws.append([self._header_cell(ws, v) for v in padded_header])
+
+        total_index = len(data_rows) - 1 if total_row else -1
+        for i, values in enumerate(data_rows):
+            sheet_row = i + 2
+            values = list(values) + [None] * (n_cols - len(values))
+            is_total = (i == total_index)
+
+            fill = w.fill_gray if sheet_row % 2 == 0 else (w.fill_total if is_total else None)
+            if tingkat_fill and n_cols >= 5:
+                tingkat = str(values[4] if values[4] else "").upper()
+                for level, level_fill in self.TINGKAT_FILLS.items():
+                    if level in tingkat:
+                        fill = level_fill
+                        break
+            font = w.font_bold if is_total else w.font_normal
+
+            row = []
+            for col, value in enumerate(values, start=1):
+                alignment, number_format = w._rekap_cell_format(value, col)
+                row.append(self.styles.cell(
+                    ws, value, ('table', id(alignment), number_format, id(fill), id(font)),
+                    font=font, fill=fill, border=w.thin_border,
+                    alignment=alignment, number_format=number_format
+                ))
+            ws.append(row)
+
+    def _write_rekap_poli(self, ws, df_grid, slot_str):
+        """Rekap Poli + baris TOTAL"""
+        rows = self.writer._sheet_payload("Rekap Poli", df_grid, slot_str)
+        total_row = None
+        if rows:
+            last_row = len(rows) + 1
+            total_row = ["TOTAL", "",
+                         f"=SUM(C2:C{last_row})",
+                         f"=SUM(D2:D{last_row})",
+                         f"=SUM(E2:E{last_row})"]
+        self._write_table(ws, ["POLI", "HARI", "REGULER (JAM)", "POLEKS (JAM)", "TOTAL JAM"],
+                          rows, total_row=total_row)
+
+    # ======================================================
+    # SHEET PETA KONFLIK, GRAFIK & SUMMARY
+    # ======================================================
+
+    def _write_conflict_map(self, ws, df_grid, slot_str):
+        w = self.writer
+        doctors, rows, conflict_fills = w._sheet_payload("Peta Konflik Dokter", df_grid, slot_str)
+
+        # Tanpa konflik: satu baris keterangan saja
+        if not doctors:
+            self._set_widths(ws, self._row_widths(rows, 1))
+            ws.append([self._plain(ws, rows[0][0])])
+            return
+
+        n_cols = len(rows[0])
+        self._set_widths(ws, self._row_widths(rows, n_cols))
+
+        ws.append([self._header_cell(ws, v, border=w.thick_border) for v in rows[0]])
+        for row_idx, values in enumerate(rows[1:], start=2):
+            row = [self.styles.cell(ws, value, 'map_slot', font=w.font_bold,
+                                    alignment=w.align_center, border=w.thin_border)
+                   for value in values[:2]]
+            for col_idx, value in enumerate(values[2:], start=3):
+                fill = conflict_fills.get((row_idx, col_idx))
+                font = self.FONT_CONFLICT if value in ["⚠️", "🚨"] else w.font_normal
+                row.append(self.styles.cell(
+                    ws, value, ('map_cell', id(fill), id(font)),
+                    font=font, fill=fill, border=w.thin_border, alignment=w.align_center
+                ))
+            ws.append(row)
+
+    def _write_grafik(self, ws, df_grid, slot_str):
+        w = self.writer
+        # Data Rekap Poli dari agregat grid (sheet Rekap Poli tidak harus ada)
+        chart_data = w._sheet_payload("Grafik Poli", df_grid, slot_str)
+
+        # Jika tidak ada data, buat dummy (sama dengan mode standar)
+        if not chart_data:
+            chart_data = [
+                ["Poli Anak", 24.5],
+                ["Poli Dalam", 18.2],
+                ["Poli Bedah", 15.8],
+                ["Poli Jantung", 12.3],
+                ["Poli Lainnya", 8.7]
+            ]
+
+        rows = [["POLI", "TOTAL JAM"]] + chart_data
+        self._set_widths(ws, self._row_widths(rows, 2))
+
+        ws.append([self._header_cell(ws, v) for v in rows[0]])
+        for sheet_row, values in enumerate(rows[1:], start=2):
+            fill = w.fill_gray if sheet_row % 2 == 0 else None
+            ws.append([
+                self.styles.cell(ws, values[0], ('chart', 1, id(fill)), font=w.font_normal,
+                                 fill=fill, border=w.thin_border, alignment=w.align_left),
+                self.styles.cell(ws, values[1], ('chart', 2, id(fill)), font=w.font_normal,
+                                 fill=fill, border=w.thin_border, alignment=w.align_right)
+            ])
+
+        w._add_poli_chart(ws, len(rows))
+
+    def _write_summary(self, ws, df_grid, slot_str, sheetnames):
+        """
+        Summary kecil & berukuran tetap: dibangun dengan kode mode standar di
+        workbook sementara lalu disalin sekali (termasuk merge & lebar kolom)
+        """
+        w = self.writer
+        scratch = Workbook()
+        scratch.remove(scratch.active)
+        for name in sheetnames:
+            if name != "Summary":
+                scratch.create_sheet(name)
+        source = w._create_summary_sheet(scratch, df_grid, slot_str)
+        for other in scratch.worksheets:
+            if other is not source:
+                scratch.remove(other)
+        w._apply_styling_to_all_sheets(scratch)
+        w._auto_adjust_column_widths(scratch)
+
+        for letter, dim in source.column_dimensions.items():
+            ws.column_dimensions[letter].width = dim.width
+        for merged in source.merged_cells.ranges:
+            ws.merged_cells.add(str(merged))
+
+        for row in source.iter_rows():
+            out = []
+            for cell in row:
+                target = WriteOnlyCell(ws, cell.value)
+                if cell.has_style:
+                    target.font = copy(cell.font)
+                    target.fill = copy(cell.fill)
+                    target.border = copy(cell.border)
+                    target.alignment = copy(cell.alignment)
+                    target.number_format = cell.number_format
+                    target.protection = copy(cell.protection)
+                out.append(target)
+            ws.append(out)
+
+    # ======================================================
+    # SHEET ASLI DARI FILE SUMBER
+    # ======================================================
+
+    def _copy_source_sheet(self, ws, source_ws):
+        """
+        Salin sheet asli (nilai & style sel) dari workbook read-only
+
+        Font default (Calibri) diganti font_normal seperti
+        _apply_styling_to_all_sheets; lebar kolom dihitung ulang dari nilai.
+        """
+        w = self.writer
+
+        # Pass 1: ukuran & lebar kolom
+        n_cols = 0
+        lengths = []
+        for values in source_ws.iter_rows(values_only=True):
+            if len(values) > n_cols:
+                lengths.extend([0] * (len(values) - n_cols))
+                n_cols = len(values)
+            for col, value in enumerate(values):
+                length = self._text_length(value)
+                if length > lengths[col]:
+                    lengths[col] = length
+        self._set_widths(ws, lengths)
+
+        # Pass 2: tulis sel dengan style yang disalin sekali per style id
+        for source_row in source_ws.iter_rows():
+            row = []
+            for cell in source_row:
+                style_id = getattr(cell, '_style_id', 0)
+                value = getattr(cell, 'value', None)
+                if style_id:
+                    font = cell.font
+                    row.append(self.styles.cell(
+                        ws, value, ('source', style_id),
+                        font=w.font_normal if font.name == 'Calibri' else font,
+                        fill=cell.fill, border=cell.border, alignment=cell.alignment,
+                        number_format=cell.number_format, protection=cell.protection
+                    ))
+                else:
+                    row.append(self._source_default(ws, value, source_ws))
+            row.extend(self._source_default(ws, None, source_ws) for _ in range(n_cols - len(row)))
+            ws.append(row)
+
+    def _source_default(self, ws, value, source_ws):
+        """Sel tanpa style di sheet sumber (style 0 workbook sumber)"""
+        fonts = source_ws.parent._fonts
+        font = fonts[0] if len(fonts) else None
+        if font is None or font.name == 'Calibri':
+            return self._plain(ws, value)
+        return self.styles.cell(ws, value, ('source', 0), font=font)
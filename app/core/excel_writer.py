@@ -4,16 +4,65 @@ Membuat file Excel dengan multiple sheets: Jadwal, Rekap, Analisis, dll.
 """
 
 import io
+import time
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.chart import BarChart, Reference
+from openpyxl.formatting.rule import FormulaRule
 from openpyxl.utils import get_column_letter
 import traceback
 
+from app.core.aggregates import ScheduleAggregates
+from app.core.schedule_matrix import ScheduleMatrix
+from app.core.slot_axis import SlotAxis
+from app.core.schema import apply_grid_schema
+from app.core.excel_stream import StreamingExcelWriter
+from app.core.output_cache import OutputCache
+from app.core.prebuild import WriteCancelled
+from app.core.xlsx_merge import merge_source_sheets, sheet_names
+
 
 class ExcelWriter:
+    # Sheet hasil yang selalu dibuat ulang (versi lama di file sumber dihapus)
+    OUTPUT_SHEETS = ["Jadwal", "Rekap Layanan", "Rekap Poli",
+                     "Rekap Dokter", "Peak Hour Analysis",
+                     "Conflict Dokter", "Peta Konflik Dokter",
+                     "Grafik Poli", "Summary"]
+
+    # Preset pilihan sheet hasil (parameter sheets / Config.output_sheets)
+    SHEET_PRESETS = {
+        "lengkap": OUTPUT_SHEETS,
+        "harian": ["Jadwal", "Rekap Poli"],
+        "jadwal": ["Jadwal"],
+    }
+
+    # Pemisahan sheet Jadwal (parameter partition / Config.jadwal_partition):
+    # satu sheet per HARI atau per POLI + sheet indeks "Jadwal" ber-hyperlink
+    JADWAL_PARTITIONS = ["none", "hari", "poli"]
+
+    # Batas Excel per sheet (termasuk baris header & 5 kolom info); sheet
+    # Jadwal yang melebihinya selalu dipecah, juga tanpa mode partisi
+    JADWAL_MAX_ROWS = 1_048_576
+    JADWAL_MAX_COLUMNS = 16_384
+
+    # Grid dengan sel (baris x kolom) sebanyak ini atau lebih ditulis streaming
+    STREAMING_MIN_CELLS = 100_000
+
+    # Sheet asli file sumber disalin byte demi byte (lihat app.core.xlsx_merge)
+    PASSTHROUGH_SOURCE_SHEETS = True
+
+    # File hasil di-cache per isi input (lihat app.core.output_cache); file dari
+    # cache dikembalikan apa adanya, termasuk waktu pembuatan di sheet Summary
+    OUTPUT_CACHE = True
+
+    # Thread untuk menghitung data sheet secara paralel (<= 1 = serial);
+    # serialisasi ke workbook tetap serial
+    PAYLOAD_WORKERS = 4
+
     def __init__(self, config):
         """
         Inisialisasi ExcelWriter dengan konfigurasi
@@ -24,10 +73,22 @@ class ExcelWriter:
         self.config = config
         self.interval = config.interval_minutes
         self.max_e = config.max_poleks_per_slot
+        self.slot_coloring = getattr(config, "slot_coloring", "fill")
+        self.output_sheets = getattr(config, "output_sheets", None)
+        self.jadwal_partition = getattr(config, "jadwal_partition", "none")
+        self.last_cache_hit = False
+        # Event pembatalan (diisi OutputPrebuilder untuk build latar belakang)
+        self.cancel_event = None
+        # Data sheet hasil _prepare_payloads & waktu per sheet build terakhir
+        self._payloads = {}
+        self.last_timings = {}
         
         print(f"✅ ExcelWriter initialized with config:")
         print(f"   - Interval: {self.interval} minutes")
         print(f"   - Max poleks per slot: {self.max_e}")
+        print(f"   - Slot coloring: {self.slot_coloring}")
+        print(f"   - Output sheets: {self.output_sheets or 'lengkap'}")
+        print(f"   - Jadwal partition: {self.jadwal_partition}")
         print(f"   - Color rules: R=Green, E(≤{self.max_e})=Blue, E(>{self.max_e})=Red")
         
         # ======================================================
@@ -77,31 +138,237 @@ class ExcelWriter:
     # MAIN WRITE METHOD
     # ======================================================
     
-    def write(self, source_file, df_grid, slot_str):
+    def write(self, source_file, df_grid, slot_str, validation=None, streaming=None,
+              passthrough=None, use_cache=None, sheets=None, partition=None):
         """
         Tulis hasil jadwal ke file Excel dengan multiple sheets
         
         Args:
             source_file: File Excel asli (BytesIO atau path) sebagai template
-            df_grid: DataFrame hasil scheduler (format grid)
+            df_grid: DataFrame hasil scheduler (format grid; kolom object atau
+                     skema category dari app.core.schema)
             slot_str: List string slot waktu
+            validation: Hasil ScheduleMatrix.validate() dari Scheduler (opsional).
+                        Jika None, dihitung sekali saat dibutuhkan.
+            streaming: True = mode write-only (baris ditulis sekali, memori
+                       datar), False = mode standar, None = otomatis jika grid
+                       >= STREAMING_MIN_CELLS sel
+            passthrough: True = sheet asli disalin apa adanya di level zip/XML
+                         (tanpa load_workbook), False = sheet asli dimuat &
+                         di-style ulang openpyxl, None = PASSTHROUGH_SOURCE_SHEETS
+            use_cache: True/False = pakai cache file hasil atau tidak,
+                       None = OUTPUT_CACHE. File dari cache dikembalikan apa
+                       adanya (byte yang sama dengan build pertama); waktu di
+                       sheet Summary diberi label "Dibuat pertama kali".
+            sheets: Sheet hasil yang dibuat: list nama (subset OUTPUT_SHEETS)
+                    atau nama preset SHEET_PRESETS; None = Config.output_sheets
+                    (default semua). Sheet yang tidak dipilih tidak dihitung.
+            partition: Pemisahan sheet Jadwal: "none", "hari" (satu sheet per
+                       HARI) atau "poli" (satu sheet per POLI); None =
+                       Config.jadwal_partition. Mode partisi selalu streaming.
             
         Returns:
             BytesIO buffer berisi file Excel
         """
+        self._validation = validation
+        self._payloads = {}
+        self.last_timings = {}
+        
+        # Satu skema dtype untuk semua sheet (grid object lama tetap diterima)
+        df_grid = apply_grid_schema(df_grid, slot_str)
+        
         print(f"📝 ExcelWriter.write() called")
         print(f"   - df_grid shape: {df_grid.shape if df_grid is not None else 'None'}")
         print(f"   - slot_str length: {len(slot_str) if slot_str else 0}")
         print(f"   - Max poleks per slot: {self.max_e}")
         
+        if use_cache is None:
+            use_cache = self.OUTPUT_CACHE
+        streaming, passthrough, sheets, partition = self._resolve_output(
+            df_grid, slot_str, streaming, passthrough, sheets, partition
+        )
+        print(f"   - Sheets: {', '.join(sheets)}")
+        
+        self.last_cache_hit = False
+        self._cached_build = use_cache
+        if not use_cache:
+            return self._build_output(source_file, df_grid, slot_str, streaming, passthrough, sheets, partition)
+        
+        try:
+            key = OutputCache.make_key(source_file, df_grid, slot_str,
+                                       self._cache_settings(streaming, passthrough, sheets, partition))
+        except Exception as e:
+            print(f"⚠️ Output cache key failed, building without cache: {e}")
+            self._cached_build = False
+            return self._build_output(source_file, df_grid, slot_str, streaming, passthrough, sheets, partition)
+        
+        self._fallback_output = False
+        data, self.last_cache_hit = OutputCache.get_or_build(
+            key,
+            lambda: self._build_output(source_file, df_grid, slot_str, streaming, passthrough,
+                                       sheets, partition).getvalue()
+        )
+        if self.last_cache_hit:
+            print(f"⚡ Output served from cache: {len(data):,} bytes")
+        elif self._fallback_output:
+            # Workbook minimal hasil error tidak disimpan untuk download berikutnya
+            OutputCache.discard(key)
+        return io.BytesIO(data)
+    
+    def _resolve_output(self, df_grid, slot_str, streaming=None, passthrough=None, sheets=None, partition=None):
+        """
+        Mode & pilihan output efektif untuk write() (lihat argumen write)
+        
+        Returns:
+            Tuple (streaming, passthrough, sheets, partition)
+        """
+        if streaming is None:
+            streaming = df_grid is not None and df_grid.size >= self.STREAMING_MIN_CELLS
+        if passthrough is None:
+            passthrough = self.PASSTHROUGH_SOURCE_SHEETS
+        sheets = self._resolve_sheets(sheets)
+        partition = self._resolve_partition(partition)
+        if "Jadwal" in sheets and self._jadwal_partitioned(df_grid, slot_str, partition) and not streaming:
+            # Sheet partisi hanya ditulis write-only (memori datar per sheet)
+            print(f"   - Jadwal partition '{partition}': using streaming mode")
+            streaming = True
+        return streaming, passthrough, sheets, partition
+    
+    def _cache_settings(self, streaming, passthrough, sheets, partition="none"):
+        """Pengaturan writer yang ikut menentukan isi file hasil (kunci cache)"""
+        return {
+            **self._config_settings(),
+            "partition": partition,
+            "jadwal_limits": (self.JADWAL_MAX_ROWS, self.JADWAL_MAX_COLUMNS),
+            "slot_coloring": self.slot_coloring,
+            "streaming": bool(streaming),
+            "passthrough": bool(passthrough),
+            "sheets": tuple(sheets),
+        }
+    
+    def _config_settings(self):
+        """
+        Nilai Config yang ditulis ke file hasil (sheet Summary) atau menentukan
+        urutan hari (Conflict Dokter, Peta Konflik, partisi Jadwal). Sheet
+        hasil membaca nilai dari sini agar kunci cache tidak tertinggal.
+        """
+        return {
+            "start": (self.config.start_hour, self.config.start_minute),
+            "interval": self.interval,
+            "max_e": self.max_e,
+            "auto_fix_errors": bool(self.config.auto_fix_errors),
+            "enable_sabtu": bool(self.config.enable_sabtu),
+            "hari_list": tuple(self.config.hari_list),
+        }
+    
+    def _resolve_sheets(self, sheets=None):
+        """
+        Daftar sheet hasil yang dibuat, urut seperti OUTPUT_SHEETS
+        
+        Args:
+            sheets: List nama sheet, nama preset, atau None (= self.output_sheets)
+            
+        Returns:
+            List nama sheet (minimal satu)
+        """
+        if sheets is None:
+            sheets = self.output_sheets
+        if sheets is None:
+            return list(self.OUTPUT_SHEETS)
+        
+        if isinstance(sheets, str):
+            if sheets not in self.SHEET_PRESETS:
+                print(f"⚠️ Unknown sheet preset '{sheets}', writing all sheets")
+                return list(self.OUTPUT_SHEETS)
+            sheets = self.SHEET_PRESETS[sheets]
+        
+        unknown = [name for name in sheets if name not in self.OUTPUT_SHEETS]
+        if unknown:
+            print(f"⚠️ Unknown output sheet(s) ignored: {unknown}")
+        
+        selected = [name for name in self.OUTPUT_SHEETS if name in sheets]
+        if not selected:
+            print("⚠️ No output sheet selected, writing Jadwal only")
+            selected = ["Jadwal"]
+        return selected
+    
+    def _resolve_partition(self, partition=None):
+        """Mode pemisahan sheet Jadwal ("none" / "hari" / "poli")"""
+        if partition is None:
+            partition = self.jadwal_partition
+        partition = str(partition or "none").lower()
+        if partition not in self.JADWAL_PARTITIONS:
+            print(f"⚠️ Unknown Jadwal partition '{partition}', writing a single Jadwal sheet")
+            return "none"
+        return partition
+    
+    def _build_output(self, source_file, df_grid, slot_str, streaming, passthrough, sheets, partition="none"):
+        """Buat file hasil (sheet hasil + sheet asli) tanpa cache"""
+        self._check_cancelled()
+        self._prepare_payloads(df_grid, slot_str, sheets)
+        
+        # Sheet hasil dibuat terpisah (sheet asli jadi placeholder kosong),
+        # lalu digabung dengan part sheet asli di level paket xlsx
+        placeholders = self._passthrough_sheets(source_file) if passthrough else None
+        if placeholders:
+            try:
+                generated = self._write_workbook(None, df_grid, slot_str, streaming, sheets,
+                                                 placeholders, partition)
+                self._check_cancelled()
+                print(f"🔗 Merging {len(placeholders)} original sheet(s) at package level...")
+                buf = merge_source_sheets(generated, source_file, placeholders)
+                print(f"✅ Excel file merged successfully: {buf.getbuffer().nbytes:,} bytes")
+                self._report_timings()
+                return buf
+            except WriteCancelled:
+                raise
+            except Exception as e:
+                print(f"⚠️ Passthrough merge failed, loading source workbook instead: {e}")
+                print(traceback.format_exc())
+        
+        buf = self._write_workbook(source_file, df_grid, slot_str, streaming, sheets, partition=partition)
+        self._report_timings()
+        return buf
+    
+    def _write_workbook(self, source_file, df_grid, slot_str, streaming, sheets, placeholders=None,
+                        partition="none"):
+        """
+        Bangun workbook hasil (mode streaming atau standar)
+        
+        Args:
+            source_file: File Excel asli (None jika sheet asli digabung belakangan)
+            df_grid: DataFrame grid ber-skema
+            slot_str: List string slot waktu
+            streaming: True untuk mode write-only
+            sheets: Sheet hasil yang dibuat (lihat _resolve_sheets)
+            placeholders: Nama sheet asli yang dibuat sebagai sheet kosong (opsional)
+            partition: Pemisahan sheet Jadwal (hanya mode streaming)
+            
+        Returns:
+            BytesIO buffer berisi file Excel
+        """
+        if streaming:
+            try:
+                print("🚀 Streaming mode (write-only workbook)")
+                if df_grid is not None and not df_grid.empty and "Jadwal" in sheets:
+                    self._debug_poleks_distribution(df_grid, slot_str)
+                return StreamingExcelWriter(self).write(source_file, df_grid, slot_str,
+                                                        placeholder_sheets=placeholders,
+                                                        sheets=sheets, partition=partition)
+            except WriteCancelled:
+                raise
+            except Exception as e:
+                print(f"⚠️ Streaming mode failed, using standard mode: {e}")
+                print(traceback.format_exc())
+        
         try:
             # Load atau buat workbook
-            wb = self._load_or_create_workbook(source_file)
+            wb = self._load_or_create_workbook(source_file, placeholders)
             
             print(f"✅ Workbook ready with {len(wb.sheetnames)} sheets")
             
             # Debug: tampilkan distribusi poleks
-            if df_grid is not None and not df_grid.empty:
+            if df_grid is not None and not df_grid.empty and "Jadwal" in sheets:
                 self._debug_poleks_distribution(df_grid, slot_str)
             
             # Urutan pembuatan sheets
@@ -113,18 +380,23 @@ class ExcelWriter:
                 ("Peak Hour Analysis", lambda wb, df, slots: self._create_peak_hour_sheet(wb, df, slots)),
                 ("Conflict Dokter", lambda wb, df, slots: self._create_conflict_doctor_sheet(wb, df, slots)),
                 ("Peta Konflik Dokter", lambda wb, df, slots: self._create_conflict_map_sheet(wb, df, slots)),
-                ("Grafik Poli", lambda wb, df, slots: self._create_grafik_poli_sheet(wb, df)),
+                ("Grafik Poli", lambda wb, df, slots: self._create_grafik_poli_sheet(wb, df, slots)),
                 ("Summary", lambda wb, df, slots: self._create_summary_sheet(wb, df, slots)),
             ]
             
-            # Buat semua sheets
+            # Buat sheets yang dipilih saja (sheet lain tidak dihitung sama sekali)
             for sheet_name, create_func in sheets_to_create:
+                if sheet_name not in sheets:
+                    continue
+                self._check_cancelled()
                 print(f"Creating '{sheet_name}' sheet...")
+                started = time.perf_counter()
                 try:
                     create_func(wb, df_grid, slot_str)
                 except Exception as e:
                     print(f"⚠️ Error creating sheet '{sheet_name}': {e}")
                     print(traceback.format_exc())
+                self._record_timing(sheet_name, "tulis", time.perf_counter() - started)
             
             # Apply styling ke semua sheets
             print("Applying styling to all sheets...")
@@ -138,6 +410,7 @@ class ExcelWriter:
             self._reorder_sheets(wb)
             
             # Save to buffer
+            self._check_cancelled()
             print("Saving to buffer...")
             buf = io.BytesIO()
             wb.save(buf)
@@ -147,12 +420,108 @@ class ExcelWriter:
             print(f"✅ Excel file created successfully: {file_size:,} bytes")
             return buf
             
+        except WriteCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error in ExcelWriter.write(): {e}")
             print(traceback.format_exc())
             # Fallback: buat workbook minimal
+            self._fallback_output = True
             return self._create_fallback_workbook(df_grid, slot_str)
     
+    # ======================================================
+    # PARTISI SHEET JADWAL
+    # ======================================================
+    
+    def _jadwal_partitioned(self, df_grid, slot_str, partition):
+        """True jika sheet Jadwal ditulis sebagai beberapa sheet partisi"""
+        if df_grid is None or df_grid.empty:
+            return False
+        if partition != "none":
+            return True
+        return (len(df_grid) + 1 > self.JADWAL_MAX_ROWS
+                or 5 + len(slot_str) > self.JADWAL_MAX_COLUMNS)
+    
+    def _jadwal_partitions(self, df_grid, slot_str, partition):
+        """
+        Rencana sheet partisi Jadwal
+        
+        Baris tiap kelompok (HARI / POLI) tetap dalam urutan grid. Kelompok
+        yang melebihi batas baris/kolom Excel dipecah lagi menjadi bagian
+        (1), (2), ... sebelum batas tercapai.
+        
+        Args:
+            df_grid: DataFrame grid ber-skema (tidak kosong)
+            slot_str: List slot waktu
+            partition: "none", "hari" atau "poli"
+            
+        Returns:
+            List (label, posisi baris, range posisi slot)
+        """
+        n_rows = len(df_grid)
+        if partition == "none":
+            groups = [("", np.arange(n_rows))]
+        else:
+            column = partition.upper()
+            empty_label = "Tanpa Hari" if partition == "hari" else "Tanpa Poli"
+            if column in df_grid.columns:
+                values = df_grid[column].astype(object).to_numpy()
+                keys = np.array(["" if pd.isna(v) else str(v).strip() for v in values], dtype=object)
+            else:
+                keys = np.full(n_rows, "", dtype=object)
+            codes, uniques = pd.factorize(keys)
+            uniques = list(uniques)
+            if partition == "hari":
+                rank = {hari: i for i, hari in enumerate(self._config_settings()["hari_list"])}
+                ordered = sorted(range(len(uniques)),
+                                 key=lambda u: (uniques[u] == "", rank.get(uniques[u], len(rank)), uniques[u]))
+            else:
+                ordered = sorted(range(len(uniques)), key=lambda u: (uniques[u] == "", uniques[u]))
+            groups = [(uniques[u] or empty_label, np.flatnonzero(codes == u)) for u in ordered]
+        
+        max_rows = max(self.JADWAL_MAX_ROWS - 1, 1)
+        max_slots = max(self.JADWAL_MAX_COLUMNS - 5, 1)
+        n_slots = len(slot_str)
+        slot_blocks = [range(start, min(start + max_slots, n_slots))
+                       for start in range(0, n_slots, max_slots)] or [range(0)]
+        
+        parts = []
+        for label, rows in groups:
+            row_blocks = [rows[start:start + max_rows] for start in range(0, len(rows), max_rows)]
+            blocks = [(rows_part, slots_part) for rows_part in row_blocks for slots_part in slot_blocks]
+            for number, (rows_part, slots_part) in enumerate(blocks, start=1):
+                part_label = f"{label} ({number})".strip() if len(blocks) > 1 else label
+                parts.append((part_label, rows_part, slots_part))
+        return parts
+    
+    @staticmethod
+    def _partition_sheet_name(label, taken):
+        """
+        Nama sheet partisi yang valid di Excel (maks 31 karakter, tanpa
+        karakter terlarang) dan unik terhadap nama yang sudah dipakai
+        
+        Args:
+            label: Label partisi (mis. "Senin", "Poli Anak (2)")
+            taken: Set nama sheet yang sudah dipakai (huruf kecil); ditambah
+            
+        Returns:
+            Nama sheet
+        """
+        label = "".join("-" if ch in '[]:*?/\\' else ch for ch in str(label)).strip(" '")
+        base = f"Jadwal {label}".strip()[:31].rstrip(" '")
+        name, number = base, 2
+        while name.lower() in taken:
+            suffix = f" ~{number}"
+            name = base[:31 - len(suffix)].rstrip(" '") + suffix
+            number += 1
+        taken.add(name.lower())
+        return name
+    
+    def _check_cancelled(self):
+        """Hentikan build jika dibatalkan (build latar belakang yang sudah basi)"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise WriteCancelled("Output build cancelled")
+    
     def _debug_poleks_distribution(self, df_grid, slot_str):
         """Debug: tampilkan distribusi poleks per slot"""
         print("\n📊 DEBUG: POLEKS DISTRIBUTION PER HARI & SLOT")
@@ -162,29 +531,29 @@ class ExcelWriter:
             print("No data available")
             return
         
+        aggregates = self._aggregates(df_grid, slot_str)
+        
         # Group by hari
-        for hari in sorted(df_grid["HARI"].unique()):
-            hari_data = df_grid[df_grid["HARI"] == hari]
+        for day_pos in aggregates.sorted_day_positions():
+            hari = aggregates.days[day_pos]
             print(f"\n📅 HARI: {hari}")
             print("-" * 40)
             
             overload_slots = []
             
             for slot in slot_str[:15]:  # Tampilkan 15 slot pertama
-                if slot in hari_data.columns:
-                    e_count = (hari_data[slot] == "E").sum()
-                    r_count = (hari_data[slot] == "R").sum()
+                r_count, e_count = aggregates.day_slot_counts(day_pos, slot)
+                
+                if e_count > 0 or r_count > 0:
+                    status = ""
+                    if e_count > 0:
+                        if e_count <= self.max_e:
+                            status = f"OK ({e_count} Poleks)"
+                        else:
+                            status = f"OVERLOAD! {e_count} > {self.max_e}"
+                            overload_slots.append((slot, e_count))
                     
-                    if e_count > 0 or r_count > 0:
-                        status = ""
-                        if e_count > 0:
-                            if e_count <= self.max_e:
-                                status = f"OK ({e_count} Poleks)"
-                            else:
-                                status = f"OVERLOAD! {e_count} > {self.max_e}"
-                                overload_slots.append((slot, e_count))
-                        
-                        print(f"  {slot}: {r_count}R {e_count}E - {status}")
+                    print(f"  {slot}: {r_count}R {e_count}E - {status}")
             
             # Tampilkan warning jika ada overload
             if overload_slots:
@@ -194,8 +563,32 @@ class ExcelWriter:
         
         print("\n" + "=" * 60)
     
-    def _load_or_create_workbook(self, source_file):
-        """Load workbook dari source atau buat baru"""
+    def _passthrough_sheets(self, source_file):
+        """
+        Nama sheet asli yang bisa disalin di level paket xlsx
+        
+        Returns:
+            List nama sheet (selain OUTPUT_SHEETS), atau None jika source
+            bukan file xlsx yang bisa dibaca / tidak punya sheet asli
+        """
+        if not hasattr(source_file, 'read'):
+            return None
+        try:
+            names = [name for name in sheet_names(source_file) if name not in self.OUTPUT_SHEETS]
+            return names or None
+        except Exception as e:
+            print(f"⚠️ Source workbook not usable for passthrough: {e}")
+            return None
+    
+    def _load_or_create_workbook(self, source_file, placeholders=None):
+        """Load workbook dari source atau buat baru (dengan sheet placeholder)"""
+        if placeholders is not None:
+            wb = Workbook()
+            del wb["Sheet"]
+            for name in placeholders:
+                wb.create_sheet(name)
+            return wb
+        
         try:
             if hasattr(source_file, 'read'):
                 # BytesIO atau file-like object
@@ -203,12 +596,7 @@ class ExcelWriter:
                 wb = load_workbook(source_file)
                 
                 # Hapus sheet yang mungkin mengganggu
-                sheets_to_remove = ["Jadwal", "Rekap Layanan", "Rekap Poli", 
-                                  "Rekap Dokter", "Peak Hour Analysis", 
-                                  "Conflict Dokter", "Peta Konflik Dokter",
-                                  "Grafik Poli", "Summary"]
-                
-                for sheet in sheets_to_remove:
+                for sheet in self.OUTPUT_SHEETS:
                     if sheet in wb.sheetnames:
                         del wb[sheet]
                 
@@ -283,6 +671,8 @@ class ExcelWriter:
         
         # Data
         if df_grid is not None and not df_grid.empty:
+            if self.slot_coloring == "conditional":
+                df_grid = self._normalize_slot_values(df_grid, slot_str)
             for _, row in df_grid.iterrows():
                 ws.append([row.get(h, "") for h in headers])
         else:
@@ -302,10 +692,12 @@ class ExcelWriter:
         if ws.max_row <= 1:
             return
         
-        print(f"   Styling Jadwal sheet: {ws.max_row-1} rows, {ws.max_column} columns")
+        # Dimensi tetap selama styling (max_row/max_column openpyxl memindai semua sel)
+        max_row, max_column = ws.max_row, ws.max_column
+        print(f"   Styling Jadwal sheet: {max_row-1} rows, {max_column} columns")
         
         # 1. STYLE HEADER
-        for col in range(1, ws.max_column + 1):
+        for col in range(1, max_column + 1):
             cell = ws.cell(row=1, column=col)
             cell.fill = self.fill_header
             cell.font = self.font_header
@@ -313,8 +705,9 @@ class ExcelWriter:
             cell.border = self.thin_border
         
         # 2. STYLE DATA ROWS (kolom metadata)
-        for row in range(2, ws.max_row + 1):
-            for col in range(1, ws.max_column + 1):
+        for row in range(2, max_row + 1):
+            self._check_cancelled()
+            for col in range(1, max_column + 1):
                 cell = ws.cell(row=row, column=col)
                 cell.border = self.thin_border
                 
@@ -332,13 +725,17 @@ class ExcelWriter:
                     ws.cell(row=row, column=col).fill = self.fill_gray
         
         # 3. WARNA SLOT WAKTU BERDASARKAN ATURAN
-        if df_grid is not None and not df_grid.empty and ws.max_row > 1:
+        if self.slot_coloring == "conditional":
+            if df_grid is not None and not df_grid.empty:
+                self._add_slot_conditional_formatting(ws, min(len(df_grid), max_row - 1), len(slot_str))
+        
+        elif df_grid is not None and not df_grid.empty and max_row > 1:
             print(f"   Applying color rules to time slots...")
             
             # Step 1: Kumpulkan semua baris E per (hari, slot) untuk menentukan urutan
             poleks_tracking = {}
             
-            for row_idx in range(2, min(len(df_grid) + 2, ws.max_row + 1)):
+            for row_idx in range(2, min(len(df_grid) + 2, max_row + 1)):
                 hari_cell = ws.cell(row=row_idx, column=3)  # Kolom C = HARI
                 hari = str(hari_cell.value).strip() if hari_cell.value else ""
                 
@@ -346,7 +743,7 @@ class ExcelWriter:
                     continue
                 
                 for col_idx, slot in enumerate(slot_str, start=6):  # Kolom F dst
-                    if col_idx <= ws.max_column:
+                    if col_idx <= max_column:
                         cell = ws.cell(row=row_idx, column=col_idx)
                         value = str(cell.value).strip() if cell.value else ""
                         
@@ -359,7 +756,7 @@ class ExcelWriter:
             # Step 2: Apply warna berdasarkan aturan
             overload_count = 0
             
-            for row_idx in range(2, min(len(df_grid) + 2, ws.max_row + 1)):
+            for row_idx in range(2, min(len(df_grid) + 2, max_row + 1)):
                 hari_cell = ws.cell(row=row_idx, column=3)
                 hari = str(hari_cell.value).strip() if hari_cell.value else ""
                 
@@ -367,7 +764,7 @@ class ExcelWriter:
                     continue
                 
                 for col_idx, slot in enumerate(slot_str, start=6):
-                    if col_idx <= ws.max_column:
+                    if col_idx <= max_column:
                         cell = ws.cell(row=row_idx, column=col_idx)
                         value = str(cell.value).strip() if cell.value else ""
                         
@@ -416,6 +813,69 @@ class ExcelWriter:
         
         print(f"   ✅ Jadwal sheet styling completed")
     
+    def _normalize_slot_values(self, df_grid, slot_str):
+        """
+        Nilai slot seperti hasil pewarnaan per sel: "R", "E" atau "" untuk
+        baris dengan HARI terisi (baris tanpa HARI dibiarkan apa adanya)
+        
+        Returns:
+            DataFrame baru (kolom slot bertipe object)
+        """
+        def normalized(value):
+            return str(value).strip() if value else ""
+        
+        hari = df_grid["HARI"].to_numpy(dtype=object) if "HARI" in df_grid.columns else None
+        if hari is None:
+            return df_grid
+        active = np.array([normalized(v) != "" for v in hari], dtype=bool)
+        
+        result = df_grid.copy(deep=False)
+        for slot in slot_str:
+            if slot not in result.columns:
+                continue
+            values = result[slot].to_numpy(dtype=object)
+            codes, uniques = pd.factorize(values, use_na_sentinel=False)
+            mapped = np.array([v if v in ("R", "E") else "" for v in map(normalized, uniques)], dtype=object)
+            result[slot] = np.where(active, mapped[codes], values)
+        return result
+    
+    def _add_slot_conditional_formatting(self, ws, n_rows, n_slots):
+        """
+        Warna slot sebagai aturan conditional formatting di blok slot Jadwal
+        
+        Overload memakai COUNTIFS berjalan per (HARI, slot): Poleks ke-(max+1)
+        dan seterusnya di slot & hari yang sama merah, sama dengan pewarnaan
+        per sel. Aturan dievaluasi Excel sehingga warna ikut berubah saat file
+        diedit.
+        
+        Args:
+            ws: Worksheet Jadwal (standar atau write-only)
+            n_rows: Jumlah baris data (mulai baris 2)
+            n_slots: Jumlah kolom slot (mulai kolom F)
+        """
+        if n_rows < 1 or n_slots < 1:
+            return
+        
+        last_col = get_column_letter(5 + n_slots)
+        cell_range = f"F2:{last_col}{n_rows + 1}"
+        active = 'TRIM($C2)<>""'
+        
+        def solid(fill):
+            color = fill.fgColor.rgb
+            return PatternFill("solid", fgColor=color, bgColor=color)
+        
+        rules = [
+            (f'AND({active},TRIM(F2)="E",COUNTIFS($C$2:$C2,$C2,F$2:F2,"E")>{self.max_e})', self.fill_over),
+            (f'AND({active},TRIM(F2)="E")', self.fill_e),
+            (f'AND({active},TRIM(F2)="R")', self.fill_r),
+        ]
+        for formula, fill in rules:
+            ws.conditional_formatting.add(
+                cell_range, FormulaRule(formula=[formula], fill=solid(fill), stopIfTrue=True)
+            )
+        
+        print(f"   ✅ Conditional formatting added to {cell_range} (max poleks {self.max_e})")
+    
     def _style_jadwal_sheet_fallback(self, ws, df_grid, slot_str):
         """Style fallback sederhana"""
         if ws.max_row <= 1:
@@ -454,32 +914,8 @@ class ExcelWriter:
         ws = wb.create_sheet("Rekap Layanan")
         ws.append(["POLI", "HARI", "DOKTER", "JENIS", "WAKTU LAYANAN"])
         
-        if df_grid is not None and not df_grid.empty:
-            processed_combinations = set()
-            
-            for _, row in df_grid.iterrows():
-                poli = row["POLI"]
-                hari = row["HARI"]
-                dokter = row["DOKTER"]
-                jenis = row["JENIS"]
-                
-                combination_key = f"{poli}|{hari}|{dokter}|{jenis}"
-                if combination_key in processed_combinations:
-                    continue
-                
-                processed_combinations.add(combination_key)
-                
-                # Kumpulkan slot aktif
-                active_slots = []
-                for slot in slot_str:
-                    if slot in row and pd.notna(row[slot]) and row[slot] in ["R", "E"]:
-                        active_slots.append(slot)
-                
-                if active_slots:
-                    time_ranges = self._combine_slots_to_ranges(active_slots, slot_str)
-                    
-                    for time_range in time_ranges:
-                        ws.append([poli, hari, dokter, jenis, time_range])
+        for row in self._sheet_payload("Rekap Layanan", df_grid, slot_str):
+            ws.append(row)
         
         # Style
         self._style_rekap_sheet(ws)
@@ -495,33 +931,8 @@ class ExcelWriter:
         ws = wb.create_sheet("Rekap Poli")
         ws.append(["POLI", "HARI", "REGULER (JAM)", "POLEKS (JAM)", "TOTAL JAM"])
         
-        if df_grid is not None and not df_grid.empty:
-            # Group by poli dan hari
-            poli_stats = {}
-            
-            for _, row in df_grid.iterrows():
-                poli = row["POLI"]
-                hari = row["HARI"]
-                key = (poli, hari)
-                
-                if key not in poli_stats:
-                    poli_stats[key] = {"R": 0, "E": 0}
-                
-                # Hitung slot R dan E
-                for slot in slot_str:
-                    if slot in row and pd.notna(row[slot]):
-                        if row[slot] == "R":
-                            poli_stats[key]["R"] += 1
-                        elif row[slot] == "E":
-                            poli_stats[key]["E"] += 1
-            
-            # Tulis data
-            for (poli, hari), counts in poli_stats.items():
-                hours_r = round(counts["R"] * self.interval / 60, 2)
-                hours_e = round(counts["E"] * self.interval / 60, 2)
-                total_hours = hours_r + hours_e
-                
-                ws.append([poli, hari, hours_r, hours_e, total_hours])
+        for row in self._sheet_payload("Rekap Poli", df_grid, slot_str):
+            ws.append(row)
         
         # Add totals row
         if ws.max_row > 1:
@@ -552,38 +963,8 @@ class ExcelWriter:
         ws = wb.create_sheet("Rekap Dokter")
         ws.append(["DOKTER", "HARI", "SHIFT", "TOTAL JAM"])
         
-        if df_grid is not None and not df_grid.empty:
-            # Group by dokter dan hari
-            doctor_shifts = {}
-            
-            for _, row in df_grid.iterrows():
-                dokter = row["DOKTER"]
-                hari = row["HARI"]
-                key = (dokter, hari)
-                
-                if key not in doctor_shifts:
-                    doctor_shifts[key] = []
-                
-                # Kumpulkan slot aktif
-                active_slots = []
-                for slot in slot_str:
-                    if slot in row and pd.notna(row[slot]) and row[slot] in ["R", "E"]:
-                        active_slots.append(slot)
-                
-                if active_slots:
-                    doctor_shifts[key].extend(active_slots)
-            
-            # Tulis data
-            for (dokter, hari), slots in doctor_shifts.items():
-                if slots:
-                    # Gabungkan slot berurutan
-                    unique_slots = sorted(set(slots))
-                    time_ranges = self._combine_slots_to_ranges(unique_slots, slot_str)
-                    
-                    for time_range in time_ranges:
-                        # Hitung durasi
-                        duration = self._calculate_duration(time_range, slot_str)
-                        ws.append([dokter, hari, time_range, round(duration, 2)])
+        for row in self._sheet_payload("Rekap Dokter", df_grid, slot_str):
+            ws.append(row)
         
         # Style
         self._style_rekap_sheet(ws)
@@ -599,27 +980,8 @@ class ExcelWriter:
         ws = wb.create_sheet("Peak Hour Analysis")
         ws.append(["HARI", "SLOT", "JUMLAH DOKTER", "LEVEL"])
         
-        if df_grid is not None and not df_grid.empty:
-            # Hitung per hari
-            for hari in sorted(df_grid["HARI"].unique()):
-                hari_data = df_grid[df_grid["HARI"] == hari]
-                
-                for slot in slot_str:
-                    if slot in hari_data.columns:
-                        count = ((hari_data[slot] == "R") | (hari_data[slot] == "E")).sum()
-                        
-                        if count > 0:
-                            # Tentukan level
-                            if count >= 10:
-                                level = "VERY HIGH"
-                            elif count >= 7:
-                                level = "HIGH"
-                            elif count >= 4:
-                                level = "MEDIUM"
-                            else:
-                                level = "LOW"
-                            
-                            ws.append([hari, slot, count, level])
+        for row in self._sheet_payload("Peak Hour Analysis", df_grid, slot_str):
+            ws.append(row)
         
         # Style
         self._style_rekap_sheet(ws)
@@ -635,21 +997,8 @@ class ExcelWriter:
         ws = wb.create_sheet("Conflict Dokter")
         ws.append(["DOKTER", "HARI", "SLOT", "KETERANGAN", "TINGKAT"])
         
-        if df_grid is not None and not df_grid.empty:
-            conflicts = self._find_doctor_conflicts(df_grid, slot_str)
-            
-            for conflict in conflicts:
-                ws.append([
-                    conflict["dokter"],
-                    conflict["hari"],
-                    conflict["slot"],
-                    conflict["keterangan"],
-                    conflict["tingkat"]
-                ])
-        
-        # Jika tidak ada konflik
-        if ws.max_row == 1:
-            ws.append(["", "", "", "✅ Tidak ada konflik ditemukan", "INFO"])
+        for row in self._sheet_payload("Conflict Dokter", df_grid, slot_str):
+            ws.append(row)
         
         # Style
         self._style_conflict_sheet(ws)
@@ -664,80 +1013,43 @@ class ExcelWriter:
         
         ws = wb.create_sheet("Peta Konflik Dokter")
         
-        # Get unique doctors
-        doctors = sorted(df_grid["DOKTER"].unique()) if df_grid is not None and not df_grid.empty else []
+        doctors, rows, conflict_fills = self._sheet_payload("Peta Konflik Dokter", df_grid, slot_str)
         
+        # Tanpa konflik: satu baris keterangan saja
         if not doctors:
-            ws.append(["Tidak ada data dokter"])
+            ws.append(rows[0])
             return ws
         
-        # Header row
-        header = ["SLOT"] + doctors
-        ws.append(header)
-        
-        # Data rows
-        for slot in slot_str:
-            row = [slot]
-            for _ in doctors:
-                row.append("")  # Placeholder
+        for row in rows:
             ws.append(row)
         
-        # Fill conflict data
-        if df_grid is not None and not df_grid.empty:
-            for (dokter, hari), group in df_grid.groupby(["DOKTER", "HARI"]):
-                if dokter in doctors:
-                    col_idx = doctors.index(dokter) + 2  # +1 untuk header, +1 untuk 1-based indexing
-                    
-                    for slot in slot_str:
-                        if slot in group.columns:
-                            row_idx = slot_str.index(slot) + 2  # +1 untuk header, +1 untuk 1-based indexing
-                            cell = ws.cell(row=row_idx, column=col_idx)
-                            
-                            values = group[slot].unique()
-                            
-                            if len(values) > 1 and any(v in ["R", "E"] for v in values):
-                                cell.value = "⚠️"
-                                cell.fill = self.fill_conflict
-                                cell.alignment = self.align_center
-                            
-                            if "R" in values and "E" in values:
-                                cell.value = "🚨"
-                                cell.fill = self.fill_conflict_hard
-                                cell.alignment = self.align_center
+        # Warnai sel konflik
+        for (row_idx, col_idx), fill in conflict_fills.items():
+            cell = ws.cell(row=row_idx, column=col_idx)
+            cell.fill = fill
+            cell.alignment = self.align_center
         
         # Style
         self._style_conflict_map_sheet(ws, len(doctors))
         
         return ws
     
-    def _create_grafik_poli_sheet(self, wb, df_grid):
+    def _create_grafik_poli_sheet(self, wb, df_grid, slot_str):
         """Buat sheet Grafik Poli"""
         if "Grafik Poli" in wb.sheetnames:
             del wb["Grafik Poli"]
         
         ws = wb.create_sheet("Grafik Poli")
         
-        # Coba ambil data dari Rekap Poli
+        # Data dari agregat yang sama dengan Rekap Poli (sheet Rekap Poli
+        # tidak harus ikut dibuat)
         chart_data = []
         
-        if "Rekap Poli" in wb.sheetnames:
-            try:
-                rp_ws = wb["Rekap Poli"]
-                
-                # Kumpulkan total per poli (abaikan baris TOTAL)
-                poli_totals = {}
-                for row in rp_ws.iter_rows(min_row=2, max_col=5, values_only=True):
-                    if row and row[0] and row[0] != "TOTAL" and row[4] is not None:
-                        poli = str(row[0]).strip()
-                        total = float(row[4]) if isinstance(row[4], (int, float)) else 0
-                        poli_totals[poli] = poli_totals.get(poli, 0) + total
-                
-                # Konversi ke list untuk chart
-                for poli, total in sorted(poli_totals.items(), key=lambda x: x[1], reverse=True):
-                    chart_data.append([poli, total])
-                
-            except Exception as e:
-                print(f"⚠️ Error extracting chart data: {e}")
+        try:
+            chart_data = self._sheet_payload("Grafik Poli", df_grid, slot_str)
+            
+        except Exception as e:
+            print(f"⚠️ Error extracting chart data: {e}")
         
         # Jika tidak ada data, buat dummy
         if not chart_data:
@@ -756,26 +1068,7 @@ class ExcelWriter:
         
         # Create chart jika ada data
         if len(chart_data) > 0:
-            try:
-                chart = BarChart()
-                chart.title = "Beban Poli (Total Jam)"
-                chart.style = 10
-                chart.y_axis.title = "Total Jam"
-                chart.x_axis.title = "Poli"
-                chart.height = 15
-                chart.width = 25
-                
-                data = Reference(ws, min_col=2, min_row=1, max_row=ws.max_row)
-                categories = Reference(ws, min_col=1, min_row=2, max_row=ws.max_row)
-                
-                chart.add_data(data, titles_from_data=True)
-                chart.set_categories(categories)
-                
-                # Tambahkan chart ke sheet
-                ws.add_chart(chart, "E5")
-                
-            except Exception as e:
-                print(f"⚠️ Could not create chart: {e}")
+            self._add_poli_chart(ws, ws.max_row)
         
         # Style
         self._style_chart_sheet(ws)
@@ -797,7 +1090,7 @@ class ExcelWriter:
         title_cell.alignment = Alignment(horizontal="center", vertical="center")
         
         # Statistics
-        stats = self._calculate_statistics(df_grid, slot_str)
+        stats, overload_count = self._sheet_payload("Summary", df_grid, slot_str)
         
         ws.append([])  # Empty row
         ws.append(["STATISTIK", "", "", ""])
@@ -813,15 +1106,16 @@ class ExcelWriter:
         # Configuration
         ws.append([])  # Empty row
         ws.append(["KONFIGURASI", "", "", ""])
-        ws.append(["Jam Mulai", f"{self.config.start_hour:02d}:{self.config.start_minute:02d}", "", ""])
-        ws.append(["Interval Slot", f"{self.config.interval_minutes} menit", "", ""])
-        ws.append(["Maks Poleks/Slot", self.config.max_poleks_per_slot, "", ""])
-        ws.append(["Auto Fix Errors", "Ya" if self.config.auto_fix_errors else "Tidak", "", ""])
-        ws.append(["Hari Sabtu", "Aktif" if self.config.enable_sabtu else "Nonaktif", "", ""])
+        settings = self._config_settings()
+        start_hour, start_minute = settings["start"]
+        ws.append(["Jam Mulai", f"{start_hour:02d}:{start_minute:02d}", "", ""])
+        ws.append(["Interval Slot", f"{settings['interval']} menit", "", ""])
+        ws.append(["Maks Poleks/Slot", settings["max_e"], "", ""])
+        ws.append(["Auto Fix Errors", "Ya" if settings["auto_fix_errors"] else "Tidak", "", ""])
+        ws.append(["Hari Sabtu", "Aktif" if settings["enable_sabtu"] else "Nonaktif", "", ""])
         
         # Poleks overload warning
         if df_grid is not None and not df_grid.empty:
-            overload_count = self._count_poleks_overload(df_grid, slot_str)
             if overload_count > 0:
                 ws.append([])
                 ws.append(["PERINGATAN", f"{overload_count} slot Poleks melebihi batas!", "", ""])
@@ -834,7 +1128,9 @@ class ExcelWriter:
         
         # Timestamp
         ws.append([])  # Empty row
-        ws.append(["Dibuat pada", datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "", ""])
+        # File ber-cache dipakai ulang apa adanya: waktunya = build pertama
+        created_label = "Dibuat pertama kali" if getattr(self, "_cached_build", False) else "Dibuat pada"
+        ws.append([created_label, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "", ""])
         ws.append(["Aplikasi", "Sistem Jadwal Dokter v1.0", "", ""])
         
         # Style
@@ -844,21 +1140,29 @@ class ExcelWriter:
     
     def _count_poleks_overload(self, df_grid, slot_str):
         """Hitung berapa banyak slot yang melebihi batas poleks"""
-        overload_count = 0
-        
         if df_grid is None or df_grid.empty:
-            return overload_count
+            return 0
         
-        for hari in df_grid["HARI"].unique():
-            hari_data = df_grid[df_grid["HARI"] == hari]
-            
-            for slot in slot_str:
-                if slot in hari_data.columns:
-                    e_count = (hari_data[slot] == "E").sum()
-                    if e_count > self.max_e:
-                        overload_count += 1
+        return len(self._aggregates(df_grid, slot_str).overload_table(self.max_e))
+    
+    def _aggregates(self, df_grid, slot_str):
+        """Agregat grid (dihitung sekali per versi grid, dipakai semua sheet)"""
+        return ScheduleAggregates.for_grid(df_grid, slot_str)
+    
+    def _get_validation(self, df_grid, slot_str):
+        """
+        Ambil hasil validasi (overload & konflik) untuk grid ini.
+        Dipakai ulang dari Scheduler jika tersedia, jika tidak dihitung sekali.
+        """
+        validation = getattr(self, "_validation", None)
+        
+        if (validation is None or
+                validation.get("slot_strings") != list(slot_str) or
+                validation.get("max_poleks") != self.max_e):
+            validation = ScheduleMatrix.from_grid(df_grid, slot_str).validate(self.max_e)
+            self._validation = validation
         
-        return overload_count
+        return validation
     
     # ======================================================
     # STYLING METHODS UNTUK SHEET LAIN
@@ -883,21 +1187,10 @@ class ExcelWriter:
                 cell = ws.cell(row=row, column=col)
                 cell.border = self.thin_border
                 
-                # Align numeric columns to right
-                if col >= 3 and cell.value is not None:
-                    try:
-                        # Coba konversi ke float
-                        if isinstance(cell.value, str) and '%' in cell.value:
-                            cell.alignment = self.align_right
-                        else:
-                            float(str(cell.value).replace('%', ''))
-                            cell.alignment = self.align_right
-                            if isinstance(cell.value, (int, float)):
-                                cell.number_format = '#,##0.00'
-                    except (ValueError, TypeError):
-                        cell.alignment = self.align_left
-                else:
-                    cell.alignment = self.align_left
+                alignment, number_format = self._rekap_cell_format(cell.value, col)
+                cell.alignment = alignment
+                if number_format:
+                    cell.number_format = number_format
             
             # Alternate row colors
             if row % 2 == 0:
@@ -926,28 +1219,31 @@ class ExcelWriter:
                 ws.cell(row=row, column=col).fill = fill_color
     
     def _style_conflict_map_sheet(self, ws, num_doctors):
-        """Style conflict map sheet"""
+        """Style conflict map sheet (kolom HARI & SLOT lalu kolom dokter)"""
         if ws.max_row <= 1:
             return
         
+        max_row, max_column = ws.max_row, ws.max_column
+        
         # Header
-        for col in range(1, ws.max_column + 1):
+        for col in range(1, max_column + 1):
             cell = ws.cell(row=1, column=col)
             cell.fill = self.fill_header
             cell.font = self.font_header
             cell.alignment = self.align_center
             cell.border = self.thick_border
         
-        # Slot column (kolom pertama)
-        for row in range(2, ws.max_row + 1):
-            cell = ws.cell(row=row, column=1)
-            cell.font = self.font_bold
-            cell.alignment = self.align_center
-            cell.border = self.thin_border
+        # Kolom label (HARI, SLOT)
+        for row in range(2, max_row + 1):
+            for col in range(1, 3):
+                cell = ws.cell(row=row, column=col)
+                cell.font = self.font_bold
+                cell.alignment = self.align_center
+                cell.border = self.thin_border
         
         # Doctor columns
-        for row in range(2, ws.max_row + 1):
-            for col in range(2, min(ws.max_column + 1, num_doctors + 2)):
+        for row in range(2, max_row + 1):
+            for col in range(3, min(max_column + 1, num_doctors + 3)):
                 cell = ws.cell(row=row, column=col)
                 cell.alignment = self.align_center
                 cell.border = self.thin_border
@@ -1047,9 +1343,7 @@ class ExcelWriter:
                     except:
                         pass
                 
-                # Adjust width (min 10, max 50)
-                adjusted_width = min(max(max_length + 2, 10), 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
+                ws.column_dimensions[column_letter].width = self._column_width(max_length)
     
     def _reorder_sheets(self, wb):
         """Reorder sheets untuk UX yang lebih baik"""
@@ -1073,51 +1367,349 @@ class ExcelWriter:
             ws = wb[sheet_name]
             wb.move_sheet(ws, offset=-len(wb.sheetnames) + i)
     
+    # ======================================================
+    # DATA SHEET PARALEL & WAKTU PER SHEET
+    # ======================================================
+    
+    def _payload_builders(self, df_grid, slot_str):
+        """Fungsi penghitung data tiap sheet hasil (tanpa menyentuh workbook)"""
+        return {
+            "Rekap Layanan": lambda: self._rekap_layanan_rows(df_grid, slot_str),
+            "Rekap Poli": lambda: self._rekap_poli_rows(df_grid, slot_str),
+            "Rekap Dokter": lambda: self._rekap_dokter_rows(df_grid, slot_str),
+            "Peak Hour Analysis": lambda: self._peak_hour_rows(df_grid, slot_str),
+            "Conflict Dokter": lambda: self._conflict_doctor_rows(df_grid, slot_str),
+            "Peta Konflik Dokter": lambda: self._conflict_map_data(df_grid, slot_str),
+            "Grafik Poli": lambda: self._poli_chart_data(self._rekap_poli_rows(df_grid, slot_str)),
+            "Summary": lambda: (self._calculate_statistics(df_grid, slot_str),
+                                self._count_poleks_overload(df_grid, slot_str)),
+        }
+    
+    def _prepare_payloads(self, df_grid, slot_str, sheets):
+        """
+        Hitung data sheet terpilih secara paralel sebelum serialisasi.
+        Tahap 1: agregat & validasi bersama; tahap 2: data per sheet.
+        Hasil disimpan di self._payloads (exception ikut disimpan dan
+        dilempar ulang saat sheet dibuat).
+        """
+        builders = self._payload_builders(df_grid, slot_str)
+        wanted = [name for name in sheets if name in builders]
+        if not wanted or df_grid is None or df_grid.empty:
+            return
+        
+        shared = []
+        if any(name in wanted for name in ["Rekap Poli", "Peak Hour Analysis", "Grafik Poli", "Summary"]):
+            shared.append(lambda: self._aggregates(df_grid, slot_str))
+        if any(name in wanted for name in ["Conflict Dokter", "Peta Konflik Dokter"]):
+            shared.append(lambda: self._get_validation(df_grid, slot_str))
+        
+        def timed(name, func):
+            self._check_cancelled()
+            started = time.perf_counter()
+            try:
+                result = func()
+            except WriteCancelled:
+                raise
+            except Exception as e:
+                result = e
+            return name, result, time.perf_counter() - started
+        
+        payloads = {}
+        started = time.perf_counter()
+        workers = max(1, min(self.PAYLOAD_WORKERS, len(wanted)))
+        if workers == 1:
+            for func in shared:
+                timed(None, func)
+            shared_time = time.perf_counter() - started
+            results = [timed(name, builders[name]) for name in wanted]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sheet-payload") as pool:
+                for future in [pool.submit(timed, None, func) for func in shared]:
+                    future.result()
+                shared_time = time.perf_counter() - started
+                results = [f.result() for f in [pool.submit(timed, name, builders[name]) for name in wanted]]
+        
+        self._record_timing("(agregat & validasi)", "data", shared_time)
+        for name, result, elapsed in results:
+            payloads[name] = result
+            self._record_timing(name, "data", elapsed)
+        self._payloads = payloads
+        print(f"🧮 Sheet data prepared for {len(wanted)} sheet(s) with {workers} worker(s) "
+              f"in {time.perf_counter() - started:.2f}s")
+    
+    def _sheet_payload(self, sheet_name, df_grid, slot_str):
+        """Data sheet dari _prepare_payloads (dihitung langsung jika belum ada)"""
+        if sheet_name in self._payloads:
+            result = self._payloads[sheet_name]
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return self._payload_builders(df_grid, slot_str)[sheet_name]()
+    
+    def _record_timing(self, sheet_name, stage, seconds):
+        """Catat waktu satu tahap (data / tulis) untuk satu sheet"""
+        timing = self.last_timings.setdefault(sheet_name, {"data": 0.0, "tulis": 0.0})
+        timing[stage] += seconds
+    
+    def _report_timings(self):
+        """Cetak waktu per sheet (urut dari yang paling lama)"""
+        if not self.last_timings:
+            return
+        print("⏱️ Sheet timings (data | tulis):")
+        ordered = sorted(self.last_timings.items(), key=lambda item: -(item[1]["data"] + item[1]["tulis"]))
+        for sheet_name, timing in ordered:
+            print(f"   {sheet_name:<24} {timing['data']:7.2f}s | {timing['tulis']:7.2f}s")
+    
+    # ======================================================
+    # DATA BARIS SHEET (dipakai mode standar & streaming)
+    # ======================================================
+    
+    def _rekap_layanan_rows(self, df_grid, slot_str):
+        """Baris data sheet Rekap Layanan (tanpa header)"""
+        rows = []
+        if df_grid is None or df_grid.empty:
+            return rows
+        
+        matrix = ScheduleMatrix.from_grid(df_grid, slot_str, keep_missing=True)
+        meta = {col: df_grid[col].to_numpy(dtype=object) for col in ["POLI", "HARI", "DOKTER", "JENIS"]}
+        
+        # Kombinasi poli|hari|dokter|jenis yang sama hanya ditulis sekali
+        combination_keys = pd.Series([
+            f"{poli}|{hari}|{dokter}|{jenis}"
+            for poli, hari, dokter, jenis in zip(meta["POLI"], meta["HARI"], meta["DOKTER"], meta["JENIS"])
+        ])
+        first_rows = ~combination_keys.duplicated().to_numpy()
+        
+        runs = matrix.runs(interval=self.interval)
+        runs = runs[first_rows[runs["ROW"].to_numpy()]]
+        texts = ScheduleMatrix.run_texts(runs)
+        
+        for row, time_range in zip(runs["ROW"].tolist(), texts.tolist()):
+            rows.append([meta["POLI"][row], meta["HARI"][row], meta["DOKTER"][row],
+                         meta["JENIS"][row], time_range])
+        
+        return rows
+    
+    def _rekap_poli_rows(self, df_grid, slot_str):
+        """Baris data sheet Rekap Poli (tanpa header & baris TOTAL)"""
+        rows = []
+        if df_grid is None or df_grid.empty:
+            return rows
+        
+        # Jam per poli & hari (urutan kemunculan pertama)
+        table = self._aggregates(df_grid, slot_str).poli_hours(self.interval)
+        rows = [list(row) for row in table.itertuples(index=False, name=None)]
+        
+        return rows
+    
+    def _rekap_dokter_rows(self, df_grid, slot_str):
+        """Baris data sheet Rekap Dokter (tanpa header)"""
+        rows = []
+        if df_grid is None or df_grid.empty:
+            return rows
+        
+        # Gabungan slot aktif per dokter-hari (urutan kemunculan pertama)
+        matrix = ScheduleMatrix.from_grid(df_grid, slot_str, keep_missing=True)
+        group_ids, group_keys = matrix.group_ids("DOKTER", "HARI")
+        runs = matrix.group_runs(group_ids, len(group_keys), interval=self.interval)
+        texts = ScheduleMatrix.run_texts(runs)
+        durations = runs["DURASI"].round(2).tolist()
+        
+        for group, time_range, duration in zip(runs["ROW"].tolist(), texts.tolist(), durations):
+            dokter, hari = group_keys[group]
+            rows.append([dokter, hari, time_range, duration])
+        
+        return rows
+    
+    def _peak_hour_rows(self, df_grid, slot_str):
+        """Baris data sheet Peak Hour Analysis (tanpa header)"""
+        rows = []
+        if df_grid is None or df_grid.empty:
+            return rows
+        
+        # Hitung per hari
+        for hari, slot, count in self._aggregates(df_grid, slot_str).peak_hours():
+            # Tentukan level
+            if count >= 10:
+                level = "VERY HIGH"
+            elif count >= 7:
+                level = "HIGH"
+            elif count >= 4:
+                level = "MEDIUM"
+            else:
+                level = "LOW"
+            
+            rows.append([hari, slot, count, level])
+        
+        return rows
+    
+    def _conflict_doctor_rows(self, df_grid, slot_str):
+        """Baris data sheet Conflict Dokter (baris INFO jika tidak ada konflik)"""
+        rows = []
+        if df_grid is not None and not df_grid.empty:
+            for conflict in self._find_doctor_conflicts(df_grid, slot_str):
+                rows.append([
+                    conflict["dokter"],
+                    conflict["hari"],
+                    conflict["slot"],
+                    conflict["keterangan"],
+                    conflict["tingkat"]
+                ])
+        
+        # Jika tidak ada konflik
+        if not rows:
+            rows.append(["", "", "", "✅ Tidak ada konflik ditemukan", "INFO"])
+        
+        return rows
+    
+    def _conflict_map_data(self, df_grid, slot_str):
+        """
+        Isi sheet Peta Konflik Dokter (sparse): pivot tabel konflik validasi
+        dengan satu baris per (hari, slot) yang berisi konflik dan satu kolom
+        per dokter yang konflik. ⚠️ = beberapa poli bersamaan, 🚨 = bentrok
+        Reguler & Poleks.
+        
+        Returns:
+            Tuple (doctors, rows termasuk header, dict (baris, kolom) → fill
+            untuk sel konflik; indeks 1-based seperti worksheet). Jika tidak
+            ada konflik: doctors kosong dan rows = [[keterangan]].
+        """
+        if df_grid is None or df_grid.empty:
+            return [], [["Tidak ada data dokter"]], {}
+        
+        table = self._get_validation(df_grid, slot_str)["conflicts"]
+        if table.empty:
+            return [], [["✅ Tidak ada konflik ditemukan"]], {}
+        
+        # Urutan baris: hari sesuai Config (hari lain menyusul), lalu slot
+        day_order = {hari: i for i, hari in enumerate(self._config_settings()["hari_list"])}
+        hari = table["HARI"].to_numpy(dtype=object)
+        day_rank = pd.Series(hari).map(day_order)
+        unknown = day_rank.isna().to_numpy()
+        day_rank = day_rank.fillna(-1).to_numpy(dtype=np.int64, copy=True)
+        day_rank[unknown] = len(day_order) + pd.factorize(hari[unknown])[0]
+        slot_pos = table["SLOT"].map({slot: i for i, slot in enumerate(slot_str)}).to_numpy(dtype=np.int64)
+        row_ids, row_keys = pd.factorize(day_rank * max(len(slot_str), 1) + slot_pos, sort=True)
+        first = np.unique(row_ids, return_index=True)[1]
+        
+        doctors = sorted(pd.unique(table["DOKTER"].to_numpy(dtype=object)))
+        doc_ids = pd.Categorical(table["DOKTER"].to_numpy(dtype=object), categories=doctors).codes
+        
+        # 1 = ⚠️, 2 = 🚨 (satu entri per dokter, hari, slot)
+        marks = np.zeros((len(row_keys), len(doctors)), dtype=np.int8)
+        marks[row_ids, doc_ids] = np.where(table["TINGKAT"].to_numpy() == "TINGGI", 2, 1)
+        
+        symbols = np.array(["", "⚠️", "🚨"], dtype=object)
+        slots = table["SLOT"].to_numpy(dtype=object)
+        rows = [["HARI", "SLOT"] + doctors]
+        for i, values in enumerate(symbols[marks].tolist()):
+            rows.append([hari[first[i]], slots[first[i]]] + values)
+        
+        fills = [None, self.fill_conflict, self.fill_conflict_hard]
+        conflict_fills = {
+            (r + 2, c + 3): fills[marks[r, c]]  # +1 header / 2 kolom label, +1 1-based
+            for r, c in zip(*np.nonzero(marks))
+        }
+        
+        return doctors, rows, conflict_fills
+    
+    def _add_poli_chart(self, ws, max_row):
+        """Tambahkan bar chart beban poli (data di kolom A:B sampai max_row)"""
+        try:
+            chart = BarChart()
+            chart.title = "Beban Poli (Total Jam)"
+            chart.style = 10
+            chart.y_axis.title = "Total Jam"
+            chart.x_axis.title = "Poli"
+            chart.height = 15
+            chart.width = 25
+            
+            data = Reference(ws, min_col=2, min_row=1, max_row=max_row)
+            categories = Reference(ws, min_col=1, min_row=2, max_row=max_row)
+            
+            chart.add_data(data, titles_from_data=True)
+            chart.set_categories(categories)
+            
+            # Tambahkan chart ke sheet
+            ws.add_chart(chart, "E5")
+            
+        except Exception as e:
+            print(f"⚠️ Could not create chart: {e}")
+    
+    def _poli_chart_data(self, rekap_poli_rows):
+        """Total jam per poli (urut menurun) dari baris Rekap Poli"""
+        poli_totals = {}
+        for row in rekap_poli_rows:
+            if row and row[0] and row[0] != "TOTAL" and row[4] is not None:
+                poli = str(row[0]).strip()
+                total = float(row[4]) if isinstance(row[4], (int, float)) else 0
+                poli_totals[poli] = poli_totals.get(poli, 0) + total
+        
+        # Konversi ke list untuk chart
+        return [[poli, total] for poli, total in
+                sorted(poli_totals.items(), key=lambda x: x[1], reverse=True)]
+    
     # ======================================================
     # HELPER METHODS
     # ======================================================
     
+    def _rekap_cell_format(self, value, col):
+        """Alignment & number format sel data sheet rekap (kolom 1-based)"""
+        if col >= 3 and value is not None:
+            try:
+                # Coba konversi ke float
+                if isinstance(value, str) and '%' in value:
+                    return self.align_right, None
+                float(str(value).replace('%', ''))
+                if isinstance(value, (int, float)):
+                    return self.align_right, '#,##0.00'
+                return self.align_right, None
+            except (ValueError, TypeError):
+                return self.align_left, None
+        return self.align_left, None
+    
+    @staticmethod
+    def _column_width(max_length):
+        """Lebar kolom dari panjang teks terpanjang (min 10, max 50)"""
+        return min(max(max_length + 2, 10), 50)
+    
+    def _sheet_order(self, sheetnames):
+        """Urutan akhir sheet setelah _reorder_sheets (tanpa menyentuh workbook)"""
+        order = list(sheetnames)
+        desired_order = [
+            "Summary",
+            "Jadwal", 
+            "Rekap Layanan",
+            "Rekap Poli",
+            "Rekap Dokter",
+            "Peak Hour Analysis",
+            "Conflict Dokter",
+            "Peta Konflik Dokter",
+            "Grafik Poli"
+        ]
+        existing_sheets = [s for s in desired_order if s in order]
+        
+        # Sama dengan Workbook.move_sheet(ws, offset=-len(sheetnames) + i)
+        for i, sheet_name in enumerate(existing_sheets):
+            idx = order.index(sheet_name)
+            del order[idx]
+            order.insert(idx - len(sheetnames) + i, sheet_name)
+        return order
+    
     def _combine_slots_to_ranges(self, slots, slot_str):
         """Gabungkan slot menjadi range waktu"""
         if not slots:
             return []
         
         try:
+            axis = SlotAxis.from_labels(slot_str)
+            
             # Pastikan slots ada dalam slot_str
-            valid_slots = [s for s in slots if s in slot_str]
-            if not valid_slots:
+            runs = axis.runs(slots)
+            if not runs:
                 return slots
             
-            # Urutkan berdasarkan posisi di slot_str
-            valid_slots.sort(key=lambda x: slot_str.index(x))
-            
-            ranges = []
-            start = valid_slots[0]
-            end = valid_slots[0]
-            
-            for i in range(1, len(valid_slots)):
-                current_idx = slot_str.index(valid_slots[i])
-                prev_idx = slot_str.index(end)
-                
-                # Cek jika berurutan
-                if current_idx == prev_idx + 1:
-                    end = valid_slots[i]
-                else:
-                    if start == end:
-                        ranges.append(start)
-                    else:
-                        ranges.append(f"{start}-{end}")
-                    
-                    start = valid_slots[i]
-                    end = valid_slots[i]
-            
-            # Tambahkan range terakhir
-            if start == end:
-                ranges.append(start)
-            else:
-                ranges.append(f"{start}-{end}")
-            
-            return ranges
+            return [axis.format_run(start, end) for start, end in runs]
             
         except Exception as e:
             print(f"⚠️ Error combining slots: {e}")
@@ -1128,10 +1720,11 @@ class ExcelWriter:
         try:
             if '-' in time_range:
                 start_str, end_str = time_range.split('-')
+                axis = SlotAxis.from_labels(slot_str)
+                start_idx = axis.position(start_str)
+                end_idx = axis.position(end_str)
                 
-                if start_str in slot_str and end_str in slot_str:
-                    start_idx = slot_str.index(start_str)
-                    end_idx = slot_str.index(end_str)
+                if start_idx >= 0 and end_idx >= 0:
                     num_slots = end_idx - start_idx + 1
                     return num_slots * self.interval / 60
             
@@ -1149,33 +1742,19 @@ class ExcelWriter:
             return conflicts
         
         try:
-            for (dokter, hari), group in df_grid.groupby(["DOKTER", "HARI"]):
-                if len(group) > 1:  # Dokter muncul di >1 poli di hari yang sama
-                    for slot in slot_str:
-                        if slot in group.columns:
-                            active_rows = group[group[slot].isin(["R", "E"])]
-                            
-                            if len(active_rows) > 1:
-                                active_polis = active_rows["POLI"].tolist()
-                                
-                                # Cek untuk konflik R vs E
-                                has_r = any(active_rows[slot] == "R")
-                                has_e = any(active_rows[slot] == "E")
-                                
-                                if has_r and has_e:
-                                    tingkat = "TINGGI"
-                                    keterangan = f"Bentrok Reguler & Poleks"
-                                else:
-                                    tingkat = "SEDANG"
-                                    keterangan = f"{len(active_polis)} poli bersamaan"
-                                
-                                conflicts.append({
-                                    "dokter": dokter,
-                                    "hari": hari,
-                                    "slot": slot,
-                                    "keterangan": keterangan,
-                                    "tingkat": tingkat
-                                })
+            table = self._get_validation(df_grid, slot_str)["conflicts"]
+            
+            # Urut per dokter lalu hari (slot tetap berurutan di dalamnya)
+            table = table.sort_values(["DOKTER", "HARI"], kind="stable")
+            
+            for row in table.itertuples(index=False):
+                conflicts.append({
+                    "dokter": row.DOKTER,
+                    "hari": row.HARI,
+                    "slot": row.SLOT,
+                    "keterangan": row.KETERANGAN,
+                    "tingkat": row.TINGKAT
+                })
         except Exception as e:
             print(f"⚠️ Error finding conflicts: {e}")
         
@@ -1195,23 +1774,7 @@ class ExcelWriter:
         }
         
         if df_grid is not None and not df_grid.empty:
-            stats["total_rows"] = len(df_grid)
-            stats["total_doctors"] = df_grid["DOKTER"].nunique()
-            stats["total_poli"] = df_grid["POLI"].nunique()
-            
-            total_cells = len(df_grid) * len(slot_str)
-            stats["total_slots"] = total_cells
-            
-            # Hitung R dan E
-            for slot in slot_str:
-                if slot in df_grid.columns:
-                    stats["total_r"] += (df_grid[slot] == "R").sum()
-                    stats["total_e"] += (df_grid[slot] == "E").sum()
-            
-            stats["total_empty"] = total_cells - stats["total_r"] - stats["total_e"]
-            
-            if total_cells > 0:
-                stats["fill_percentage"] = ((stats["total_r"] + stats["total_e"]) / total_cells) * 100
+            stats.update(self._aggregates(df_grid, slot_str).statistics())
         
         return stats
     
@@ -1237,17 +1800,7 @@ class ExcelWriter:
             
             # Generate slot strings jika tidak provided
             if slot_str is None:
-                from datetime import time
-                slot_str = []
-                current_time = self.config.start_hour * 60 + self.config.start_minute
-                end_time = 14 * 60 + 30  # 14:30
-                
-                while current_time < end_time:
-                    hours = current_time // 60
-                    minutes = current_time % 60
-                    time_str = f"{hours:02d}:{minutes:02d}"
-                    slot_str.append(time_str)
-                    current_time += self.config.interval_minutes
+                slot_str = SlotAxis.from_config(self.config).to_list()
             
             # Create Reguler sheet
             ws_reg = wb.create_sheet("Reguler")
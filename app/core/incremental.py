@@ -0,0 +1,209 @@
+"""
+Incremental - Cache hasil run Scheduler untuk re-proses inkremental
+Saat roster yang sama di-upload ulang dengan sedikit perubahan, hanya baris
+sumber yang berubah yang di-parse ulang; baris grid dan hasil validasi yang
+tidak tersentuh diambil dari run sebelumnya.
+
+Rentang waktu per sel disimpan dalam menit (bukan slot), sehingga grid untuk
+interval atau jam mulai lain bisa diturunkan ulang tanpa membaca Excel lagi.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+from app.core.schedule_matrix import ScheduleMatrix
+
+
+KEY_COLUMNS = ['POLI', 'JENIS', 'HARI', 'DOKTER']
+SOURCE_COLUMNS = ['Nama Dokter', 'Poli Asal', 'Jenis Poli']
+
+
+class RosterRunCache:
+    """
+    Menyimpan state run terakhir:
+    - fingerprint setiap baris sumber (dokter, poli, jenis, sel hari)
+    - sel hari hasil parse per baris dalam menit (satu blok sel per fingerprint)
+    - matriks grid untuk sumbu slot terakhir (kunci kombinasi, kode, JAM)
+    - hasil validasi
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Kosongkan cache (run berikutnya diproses penuh)"""
+        self.signature = None
+        self.slot_strings = None
+        self.fingerprints = None
+        self.blocks = None
+        self.grid_keys = None
+        self.codes = None
+        self.jam = None
+        self.validation = None
+
+    def is_compatible(self, signature) -> bool:
+        """Cache hanya bisa dipakai jika daftar hari sama dengan run sebelumnya"""
+        return self.fingerprints is not None and self.signature == signature
+
+    # ======================================================
+    # FINGERPRINT & DIFF
+    # ======================================================
+
+    @staticmethod
+    def fingerprint_rows(df: pd.DataFrame, hari_list) -> np.ndarray:
+        """
+        Hash 64-bit per baris sumber dari kolom yang mempengaruhi ekspansi slot
+
+        Returns:
+            numpy array uint64 (satu per baris df)
+        """
+        columns = [c for c in SOURCE_COLUMNS + list(hari_list) if c in df.columns]
+        if not columns:
+            return np.zeros(len(df), dtype=np.uint64)
+
+        frame = df[columns].astype(object).where(df[columns].notna(), None)
+        hashed = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+        # Nama kolom ikut di-hash agar kolom hari yang hilang/baru terdeteksi
+        salt = pd.util.hash_array(np.array(['|'.join(columns)], dtype=object))[0]
+        return hashed ^ salt
+
+    def diff(self, fingerprints: np.ndarray):
+        """
+        Bandingkan fingerprint baru dengan run sebelumnya
+
+        Returns:
+            Tuple (reuse_mask per baris baru, removed_fingerprints)
+        """
+        reuse = np.isin(fingerprints, self.fingerprints)
+        removed = np.setdiff1d(self.fingerprints, fingerprints)
+        return reuse, removed
+
+    def reused_cells(self, fingerprints: np.ndarray, reuse: np.ndarray) -> pd.DataFrame:
+        """
+        Ambil sel hasil parse tersimpan untuk baris yang tidak berubah
+
+        Returns:
+            DataFrame sel (POLI, JENIS, HARI, DOKTER, KODE, TEXT, START, END,
+            _FP, _POS) urut per posisi baris lalu urutan hari
+        """
+        current = pd.DataFrame({
+            '_FP': fingerprints[reuse],
+            '_POS': np.flatnonzero(reuse)
+        })
+        entries = current.merge(self.blocks, on='_FP', how='inner', sort=False)
+        entries = entries.sort_values(['_POS', '_SEQ'], kind='stable')
+        return entries.drop(columns='_SEQ').reset_index(drop=True)
+
+    def removed_keys(self, removed: np.ndarray) -> pd.DataFrame:
+        """Kombinasi grid yang dulu dihasilkan baris yang sekarang hilang/berubah"""
+        if self.blocks is None or len(removed) == 0:
+            return pd.DataFrame(columns=KEY_COLUMNS)
+        return self.blocks.loc[self.blocks['_FP'].isin(removed), KEY_COLUMNS]
+
+    # ======================================================
+    # SIMPAN STATE
+    # ======================================================
+
+    def store(self, signature, slot_strings, fingerprints: np.ndarray, cells: pd.DataFrame,
+              matrix: ScheduleMatrix, validation: Optional[dict]):
+        """
+        Simpan hasil run untuk dipakai run berikutnya
+
+        Args:
+            signature: Tuple hari_list run ini
+            slot_strings: Sumbu slot grid run ini
+            fingerprints: Fingerprint per baris sumber
+            cells: Sel hasil parse (menit) dengan kolom _FP dan _POS
+            matrix: ScheduleMatrix grid hasil run
+            validation: Hasil ScheduleMatrix.validate()
+        """
+        self.signature = signature
+        self.slot_strings = list(slot_strings)
+        self.fingerprints = fingerprints
+
+        # Satu blok sel per fingerprint (dari kemunculan pertamanya)
+        first_pos = np.unique(fingerprints, return_index=True)[1]
+        blocks = cells[cells['_POS'].isin(first_pos)].copy()
+        blocks['_SEQ'] = blocks.groupby('_POS').cumcount()
+        self.blocks = blocks.drop(columns='_POS').reset_index(drop=True)
+
+        self.grid_keys = pd.MultiIndex.from_frame(matrix.meta[KEY_COLUMNS])
+        self.codes = matrix.codes.copy()
+        self.jam = matrix.meta['JAM'].to_numpy(dtype=object)
+        self.validation = validation
+
+
+def update_validation(matrix: ScheduleMatrix, cache: RosterRunCache,
+                      touched_keys: pd.MultiIndex, max_poleks: int) -> dict:
+    """
+    Hitung ulang validasi hanya untuk hari dan (dokter, hari) yang tersentuh
+
+    Args:
+        matrix: ScheduleMatrix grid baru
+        cache: RosterRunCache berisi grid & validasi run sebelumnya
+        touched_keys: Kombinasi POLI/JENIS/HARI/DOKTER yang berubah
+        max_poleks: Batas poleks per slot
+
+    Returns:
+        Dictionary dengan format sama seperti ScheduleMatrix.validate()
+    """
+    previous = cache.validation
+
+    # Urutan baris lama harus tetap agar daftar POLIS konflik lama masih sama
+    prev_idx = cache.grid_keys.get_indexer(pd.MultiIndex.from_frame(matrix.meta[KEY_COLUMNS]))
+    kept_idx = prev_idx[prev_idx >= 0]
+    order_kept = bool(np.all(np.diff(kept_idx) > 0))
+
+    if (previous is None or not order_kept or
+            previous['max_poleks'] != max_poleks or
+            previous['slot_strings'] != matrix.slot_strings or
+            previous['invalid_values'] or matrix.invalid_values):
+        return matrix.validate(max_poleks)
+
+    touched = touched_keys.to_frame(index=False)
+    days = pd.Index(matrix.days)
+    touched_day = days.isin(touched['HARI'])
+
+    # 1. Hitungan poleks per (hari, slot): hari tersentuh dihitung ulang
+    counts = np.zeros((len(days), matrix.n_slots), dtype=np.int64)
+    prev_pos = pd.Index(previous['days']).get_indexer(days)
+    keep_day = ~touched_day & (prev_pos >= 0)
+    counts[keep_day] = previous['poleks_counts'][prev_pos[keep_day]]
+
+    recount_day = ~keep_day
+    if recount_day.any():
+        sub = matrix.subset(recount_day[matrix.day_idx])
+        sub_counts = sub.counts_by_day(ScheduleMatrix.CODE_E)
+        counts[recount_day] = sub_counts[pd.Index(sub.days).get_indexer(days[recount_day])]
+
+    # 2. Konflik: hanya grup (dokter, hari) tersentuh yang dihitung ulang
+    doctor_day = pd.MultiIndex.from_arrays([matrix.meta['DOKTER'], matrix.meta['HARI']])
+    touched_dd = pd.MultiIndex.from_arrays([touched['DOKTER'], touched['HARI']])
+    row_touched = doctor_day.isin(touched_dd)
+
+    new_conflicts = matrix.subset(row_touched).conflict_table()
+    old_conflicts = previous['conflicts']
+    old_dd = pd.MultiIndex.from_arrays([old_conflicts['DOKTER'], old_conflicts['HARI']])
+    old_conflicts = old_conflicts[~old_dd.isin(touched_dd) & old_dd.isin(doctor_day)]
+
+    # Urutkan grup sesuai kemunculan pertama di grid baru
+    group_rank = pd.Series(np.arange(len(doctor_day.unique())), index=doctor_day.unique())
+    parts = [part for part in [old_conflicts, new_conflicts] if not part.empty]
+    conflicts = pd.concat(parts, ignore_index=True) if parts else new_conflicts
+    if not conflicts.empty:
+        rank = group_rank.reindex(
+            pd.MultiIndex.from_arrays([conflicts['DOKTER'], conflicts['HARI']])
+        ).to_numpy()
+        conflicts = conflicts.iloc[np.argsort(rank, kind='stable')].reset_index(drop=True)
+
+    return {
+        'poleks_counts': counts,
+        'days': list(matrix.days),
+        'slot_strings': list(matrix.slot_strings),
+        'max_poleks': max_poleks,
+        'overload': ScheduleMatrix.overload_from_counts(counts, matrix.days, matrix.slot_strings, max_poleks),
+        'conflicts': conflicts,
+        'invalid_values': []
+    }
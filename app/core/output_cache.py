@@ -0,0 +1,178 @@
+"""
+OutputCache - Cache file Excel hasil (bytes xlsx) berbasis isi
+Kunci = hash isi file sumber + isi grid + sumbu slot + pengaturan writer,
+sehingga download ulang grid yang sama langsung dilayani dari cache dan
+beberapa sesi/pengguna yang meng-export roster yang sama berbagi satu build.
+Cache dipakai bersama satu proses (semua sesi Streamlit) dan dibatasi total
+ukuran bytes dengan eviction LRU. File dari cache dikembalikan apa adanya:
+waktu di sheet Summary adalah waktu build pertama ("Dibuat pertama kali").
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class OutputCache:
+    # Batas total ukuran file yang disimpan (bytes)
+    MAX_BYTES = 64 * 1024 * 1024
+
+    _entries = OrderedDict()
+    _total_bytes = 0
+    _lock = threading.Lock()
+    _build_locks = {}
+
+    # ======================================================
+    # KUNCI
+    # ======================================================
+
+    @staticmethod
+    def make_key(source_file, df_grid: pd.DataFrame, slot_str: List[str], settings: dict) -> str:
+        """
+        Hash isi semua input yang menentukan file hasil
+
+        Args:
+            source_file: File Excel asli (bytes, file-like atau path)
+            df_grid: DataFrame grid (sebaiknya sudah ber-skema)
+            slot_str: List slot waktu
+            settings: Pengaturan writer yang mempengaruhi output
+
+        Returns:
+            Hex digest sha256
+        """
+        digest = hashlib.sha256()
+        digest.update(OutputCache._source_bytes(source_file))
+
+        digest.update(b"\0grid\0")
+        digest.update(OutputCache.grid_digest(df_grid, slot_str).encode("ascii"))
+
+        digest.update(b"\0settings\0")
+        digest.update(repr(sorted(settings.items())).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def grid_digest(df_grid: pd.DataFrame, slot_str: List[str]) -> str:
+        """
+        Hash isi grid + sumbu slot (versi grid yang tidak bergantung identitas objek)
+
+        Args:
+            df_grid: DataFrame grid
+            slot_str: List slot waktu
+
+        Returns:
+            Hex digest sha256
+        """
+        digest = hashlib.sha256()
+        if df_grid is not None:
+            digest.update("|".join(map(str, df_grid.columns)).encode("utf-8"))
+            digest.update(str(df_grid.shape).encode("utf-8"))
+            if not df_grid.empty:
+                hashed = pd.util.hash_pandas_object(df_grid, index=False).to_numpy(dtype=np.uint64)
+                digest.update(hashed.tobytes())
+
+        digest.update(b"\0slots\0")
+        digest.update("|".join(slot_str or []).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _source_bytes(source_file) -> bytes:
+        """Isi file sumber sebagai bytes (posisi file-like dikembalikan ke awal)"""
+        if source_file is None:
+            return b""
+        if isinstance(source_file, (bytes, bytearray)):
+            return bytes(source_file)
+        if isinstance(source_file, (str, os.PathLike)):
+            with open(source_file, "rb") as f:
+                return f.read()
+        if hasattr(source_file, "getvalue"):
+            return source_file.getvalue()
+        source_file.seek(0)
+        data = source_file.read()
+        source_file.seek(0)
+        return data
+
+    # ======================================================
+    # AKSES CACHE
+    # ======================================================
+
+    @classmethod
+    def get(cls, key: str) -> Optional[bytes]:
+        """Bytes file untuk kunci ini, atau None jika belum ada"""
+        with cls._lock:
+            data = cls._entries.get(key)
+            if data is not None:
+                cls._entries.move_to_end(key)
+            return data
+
+    @classmethod
+    def put(cls, key: str, data: bytes):
+        """Simpan bytes file; entri terlama dibuang jika melebihi MAX_BYTES"""
+        if len(data) > cls.MAX_BYTES:
+            return
+        with cls._lock:
+            old = cls._entries.pop(key, None)
+            if old is not None:
+                cls._total_bytes -= len(old)
+            cls._entries[key] = data
+            cls._total_bytes += len(data)
+            while cls._total_bytes > cls.MAX_BYTES:
+                _, evicted = cls._entries.popitem(last=False)
+                cls._total_bytes -= len(evicted)
+
+    @classmethod
+    def get_or_build(cls, key: str, build: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """
+        Ambil dari cache atau build sekali (build bersamaan untuk kunci yang
+        sama menunggu hasil build pertama)
+
+        Args:
+            key: Kunci dari make_key()
+            build: Fungsi tanpa argumen yang menghasilkan bytes file
+
+        Returns:
+            Tuple (bytes file, True jika dari cache)
+        """
+        data = cls.get(key)
+        if data is not None:
+            return data, True
+
+        with cls._lock:
+            build_lock = cls._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            data = cls.get(key)
+            if data is not None:
+                return data, True
+            try:
+                data = build()
+                cls.put(key, data)
+            finally:
+                with cls._lock:
+                    cls._build_locks.pop(key, None)
+        return data, False
+
+    @classmethod
+    def discard(cls, key: str):
+        """Buang satu entri (mis. hasil fallback yang tidak boleh dipakai ulang)"""
+        with cls._lock:
+            data = cls._entries.pop(key, None)
+            if data is not None:
+                cls._total_bytes -= len(data)
+
+    @classmethod
+    def clear(cls):
+        """Kosongkan cache"""
+        with cls._lock:
+            cls._entries.clear()
+            cls._total_bytes = 0
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Jumlah entri & total ukuran cache"""
+        with cls._lock:
+            return {"entries": len(cls._entries), "bytes": cls._total_bytes, "max_bytes": cls.MAX_BYTES}
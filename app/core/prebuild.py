@@ -0,0 +1,122 @@
+"""
+OutputPrebuilder - Build file Excel hasil di latar belakang
+Segera setelah grid selesai diproses, ExcelWriter.write dijalankan di
+worker thread sehingga hasilnya sudah ada di OutputCache saat pengguna
+menekan download. Build yang basi (grid diproses ulang / pengaturan
+berubah) dibatalkan lewat cancel event yang dicek ExcelWriter per sheet.
+"""
+
+import copy
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import pandas as pd
+
+from app.core.output_cache import OutputCache
+
+
+class WriteCancelled(Exception):
+    """Build file hasil dibatalkan sebelum selesai"""
+
+
+class PrebuildJob:
+    def __init__(self, signature: tuple, future, cancel_event: threading.Event):
+        """
+        Satu build file hasil di latar belakang
+
+        Args:
+            signature: Versi grid & pengaturan yang di-build (lihat OutputPrebuilder.signature)
+            future: Future dari executor
+            cancel_event: Event pembatalan yang dicek ExcelWriter
+        """
+        self.signature = signature
+        self.future = future
+        self.cancel_event = cancel_event
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def done(self) -> bool:
+        """True jika build selesai (berhasil, gagal, atau dibatalkan)"""
+        return self.future.done()
+
+    def cancel(self):
+        """Batalkan build (yang belum jalan tidak dijalankan sama sekali)"""
+        self.cancel_event.set()
+        self.future.cancel()
+
+    def result(self) -> Optional[bytes]:
+        """Bytes file hasil, atau None jika belum selesai / gagal / dibatalkan"""
+        if not self.future.done() or self.future.cancelled() or self.cancelled:
+            return None
+        if self.future.exception() is not None:
+            return None
+        return self.future.result()
+
+    def error(self) -> Optional[BaseException]:
+        """Exception build (selain pembatalan), jika ada"""
+        if not self.future.done() or self.future.cancelled():
+            return None
+        error = self.future.exception()
+        return None if isinstance(error, WriteCancelled) else error
+
+
+class OutputPrebuilder:
+    # Worker dipakai bersama semua sesi dalam satu proses
+    MAX_WORKERS = 2
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.MAX_WORKERS,
+                                                   thread_name_prefix="output-prebuild")
+            return cls._executor
+
+    @staticmethod
+    def signature(writer, grid_df: pd.DataFrame, slot_str: List[str]) -> tuple:
+        """
+        Versi grid (hash isi) + slot + pengaturan writer yang sama dengan
+        kunci OutputCache (ExcelWriter._cache_settings)
+        """
+        settings = writer._cache_settings(*writer._resolve_output(grid_df, slot_str))
+        return OutputCache.grid_digest(grid_df, slot_str), tuple(sorted(settings.items()))
+
+    @classmethod
+    def start(cls, writer, source_bytes: bytes, grid_df: pd.DataFrame, slot_str: List[str],
+              validation=None) -> PrebuildJob:
+        """
+        Mulai build file hasil di latar belakang
+
+        Args:
+            writer: ExcelWriter (di-copy agar pengaturannya tetap saat build berjalan)
+            source_bytes: Isi file Excel asli
+            grid_df: DataFrame grid hasil Scheduler
+            slot_str: List slot waktu
+            validation: Hasil validasi Scheduler (opsional)
+
+        Returns:
+            PrebuildJob
+        """
+        cancel_event = threading.Event()
+        job_writer = copy.copy(writer)
+        job_writer.cancel_event = cancel_event
+
+        def build():
+            buf = job_writer.write(
+                source_file=io.BytesIO(source_bytes),
+                df_grid=grid_df,
+                slot_str=slot_str,
+                validation=validation
+            )
+            return buf.getvalue()
+
+        future = cls._get_executor().submit(build)
+        print(f"🧵 Output prebuild started ({len(grid_df)} rows, {len(slot_str)} slots)")
+        return PrebuildJob(cls.signature(writer, grid_df, slot_str), future, cancel_event)
@@ -0,0 +1,439 @@
+"""
+ScheduleMatrix - Representasi jadwal in-memory berbasis matriks kode int8
+Setiap baris dokter-hari disimpan sebagai satu baris kode (0 = kosong,
+1 = Reguler, 2 = Poleks) di sepanjang sumbu slot, ditambah array indeks
+dokter/poli/hari sehingga hitungan bisa dilakukan dengan operasi NumPy.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+from app.core.slot_axis import SlotAxis
+from app.core.schema import SLOT_VALUES, apply_grid_schema, is_schema_slot, slot_categorical
+
+
+class ScheduleMatrix:
+    # Kode sel slot
+    CODE_EMPTY = 0
+    CODE_R = 1
+    CODE_E = 2
+    CODE_INVALID = -1
+
+    CODE_LABELS = {CODE_EMPTY: '', CODE_R: 'R', CODE_E: 'E'}
+    META_COLUMNS = ['POLI', 'JENIS', 'HARI', 'DOKTER', 'JAM']
+
+    def __init__(self, codes: np.ndarray, meta: pd.DataFrame, slot_strings: List[str],
+                 invalid_values: Optional[list] = None):
+        """
+        Inisialisasi ScheduleMatrix
+
+        Args:
+            codes: Matriks int8 (baris × slot) berisi kode sel
+            meta: DataFrame metadata per baris (POLI, JENIS, HARI, DOKTER, JAM)
+            slot_strings: List slot waktu sesuai kolom matriks
+            invalid_values: Nilai sel asli yang bukan '', 'R' atau 'E'
+        """
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.meta = meta.reset_index(drop=True)
+        self.slot_strings = list(slot_strings)
+        self.axis = SlotAxis.from_labels(self.slot_strings)
+        self.slot_index = self.axis.index
+        self.invalid_values = list(invalid_values or [])
+
+        # Indeks kategori (urutan kemunculan pertama, sama seperti unique())
+        self.doctor_idx, self.doctors = self._factorize('DOKTER')
+        self.poli_idx, self.polis = self._factorize('POLI')
+        self.day_idx, self.days = self._factorize('HARI')
+
+    def _factorize(self, column):
+        if column not in self.meta.columns:
+            return np.zeros(len(self.meta), dtype=np.int64), np.array([], dtype=object)
+        idx, labels = pd.factorize(self.meta[column], use_na_sentinel=False)
+        return idx, np.asarray(labels, dtype=object)
+
+    # ======================================================
+    # KONVERSI DARI / KE GRID DATAFRAME
+    # ======================================================
+
+    @classmethod
+    def from_grid(cls, grid_df: pd.DataFrame, slot_strings: Optional[List[str]] = None,
+                  keep_missing: bool = False) -> "ScheduleMatrix":
+        """
+        Bangun ScheduleMatrix dari grid_df (format output Scheduler)
+
+        Args:
+            grid_df: DataFrame grid dengan kolom metadata + kolom slot
+            slot_strings: List slot waktu; jika None, kolom "HH:MM" dideteksi otomatis
+            keep_missing: Jika True, slot yang tidak ada di grid_df tetap jadi kolom
+                kosong sehingga run tidak menyambung melewati slot yang hilang
+
+        Returns:
+            ScheduleMatrix
+        """
+        if slot_strings is None:
+            slot_strings = [c for c in grid_df.columns if re.match(r"^\d{2}:\d{2}$", str(c))]
+        meta_cols = [c for c in cls.META_COLUMNS if c in grid_df.columns]
+        meta = grid_df[meta_cols].reset_index(drop=True)
+
+        if keep_missing:
+            slots = list(slot_strings)
+        else:
+            slots = [s for s in slot_strings if s in grid_df.columns]
+        codes, invalid_values = cls._encode_grid(grid_df, slots)
+
+        return cls(codes, meta, slots, invalid_values)
+
+    @classmethod
+    def _encode_grid(cls, grid_df: pd.DataFrame, slots: List[str]):
+        """
+        Kode int8 untuk kolom slot grid; slot yang tidak ada di grid → kosong
+
+        Grid ber-skema (SLOT_DTYPE) langsung memakai kode kategorinya
+        ('' = 0, R = 1, E = 2, NaN = -1) tanpa konversi ke object.
+        """
+        columns = [grid_df[s] if s in grid_df.columns else None for s in slots]
+        if all(c is None or (isinstance(c, pd.Series) and is_schema_slot(c) and
+                             len(c.cat.categories) == len(SLOT_VALUES)) for c in columns):
+            codes = np.zeros((len(grid_df), len(slots)), dtype=np.int8)
+            for i, column in enumerate(columns):
+                if column is not None:
+                    codes[:, i] = column.cat.codes.to_numpy()
+            invalid_values = [np.nan] if (codes < 0).any() else []
+            return codes, invalid_values
+
+        if all(c is not None for c in columns):
+            block = grid_df[slots].to_numpy(dtype=object)
+        else:
+            block = grid_df.reindex(columns=slots, fill_value='').to_numpy(dtype=object)
+        return cls._encode(block)
+
+    @classmethod
+    def _encode(cls, block: np.ndarray):
+        """Ubah blok nilai slot (object) ke kode int8 lewat factorize"""
+        flat = block.ravel()
+        value_idx, uniques = pd.factorize(flat, use_na_sentinel=True)
+
+        lookup = np.full(len(uniques) + 1, cls.CODE_INVALID, dtype=np.int8)
+        invalid_values = []
+        for i, value in enumerate(uniques):
+            if value == 'R':
+                lookup[i] = cls.CODE_R
+            elif value == 'E':
+                lookup[i] = cls.CODE_E
+            elif value == '':
+                lookup[i] = cls.CODE_EMPTY
+            else:
+                invalid_values.append(value)
+
+        # Sentinel -1 (NaN/None) → indeks terakhir lookup
+        if (value_idx < 0).any():
+            invalid_values.append(np.nan)
+
+        codes = lookup[value_idx].reshape(block.shape)
+        return codes, invalid_values
+
+    def to_grid(self) -> pd.DataFrame:
+        """
+        Konversi kembali ke grid_df (kolom metadata lalu kolom slot)
+
+        Returns:
+            DataFrame grid ber-skema (lihat app.core.schema): metadata
+            category, nilai slot 'R', 'E' atau '' sebagai SLOT_DTYPE
+        """
+        slot_block = pd.DataFrame({
+            slot: slot_categorical(self.codes[:, i])  # kode -1 (invalid) → ''
+            for i, slot in enumerate(self.slot_strings)
+        }, index=self.meta.index)
+        return apply_grid_schema(pd.concat([self.meta, slot_block], axis=1), self.slot_strings)
+
+    # ======================================================
+    # OPERASI DASAR
+    # ======================================================
+
+    @property
+    def n_rows(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def n_slots(self) -> int:
+        return self.codes.shape[1]
+
+    def mask(self, *codes) -> np.ndarray:
+        """Boolean matrix sel yang berisi salah satu kode (default: R atau E)"""
+        if not codes:
+            codes = (self.CODE_R, self.CODE_E)
+        result = self.codes == codes[0]
+        for code in codes[1:]:
+            result |= self.codes == code
+        return result
+
+    def total(self, *codes) -> int:
+        """Jumlah sel dengan kode tertentu"""
+        return int(self.mask(*codes).sum())
+
+    def count_by(self, group_ids: np.ndarray, n_groups: int, *codes) -> np.ndarray:
+        """
+        Hitung sel per (grup, slot)
+
+        Args:
+            group_ids: Array id grup per baris (0..n_groups-1)
+            n_groups: Jumlah grup
+            codes: Kode yang dihitung (default: R atau E)
+
+        Returns:
+            Array int (n_groups × n_slots)
+        """
+        rows, cols = np.nonzero(self.mask(*codes))
+        flat = np.asarray(group_ids)[rows] * self.n_slots + cols
+        counts = np.bincount(flat, minlength=n_groups * self.n_slots)
+        return counts.reshape(n_groups, self.n_slots)
+
+    def counts_by_day(self, *codes) -> np.ndarray:
+        """Hitungan per (hari, slot); urutan baris mengikuti self.days"""
+        return self.count_by(self.day_idx, len(self.days), *codes)
+
+    def slot_positions(self, slots) -> List[int]:
+        """Indeks kolom untuk slot yang ada di matriks (slot lain diabaikan)"""
+        return [self.slot_index[s] for s in slots if s in self.slot_index]
+
+    def group_ids(self, *columns):
+        """
+        Nomori kombinasi kolom metadata (urutan kemunculan pertama)
+
+        Returns:
+            Tuple (ids per baris, list tuple kunci per grup)
+        """
+        ids, keys = pd.factorize(
+            pd.MultiIndex.from_arrays([self.meta[c] for c in columns]),
+            use_na_sentinel=False
+        )
+        return ids, list(keys)
+
+    def subset(self, rows: np.ndarray) -> "ScheduleMatrix":
+        """ScheduleMatrix baru berisi baris terpilih (mask boolean atau indeks)"""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return ScheduleMatrix(self.codes[rows], self.meta.iloc[rows], self.slot_strings,
+                              self.invalid_values)
+
+    # ======================================================
+    # RUN-LENGTH ENCODING (RENTANG WAKTU)
+    # ======================================================
+
+    RUN_COLUMNS = ['ROW', 'START', 'END', 'CODE', 'N_SLOTS', 'START_LABEL',
+                   'END_LABEL', 'END_TIME', 'DURASI']
+
+    @staticmethod
+    def encode_runs(codes: np.ndarray, axis, split_on_code: bool = False,
+                    interval: Optional[int] = None) -> pd.DataFrame:
+        """
+        Run-length encoding semua baris matriks kode sekaligus
+
+        Awal/akhir run dicari lewat diff pada mask aktif (kode > 0) yang
+        di-pad nol di kedua sisi, jadi tidak ada loop per baris atau per slot.
+
+        Args:
+            codes: Matriks kode (baris × slot); kode > 0 dianggap aktif
+            axis: SlotAxis atau list slot sesuai kolom matriks
+            split_on_code: Jika True, pergantian R ↔ E memulai run baru
+            interval: Durasi slot dalam menit (default: interval sumbu)
+
+        Returns:
+            DataFrame kolom ROW, START, END (indeks slot, inklusif), CODE,
+            N_SLOTS, START_LABEL, END_LABEL (label slot terakhir), END_TIME
+            (jam selesai sebenarnya = slot terakhir + interval) dan DURASI (jam).
+            Urut per baris lalu slot.
+        """
+        axis = SlotAxis.from_labels(axis)
+        codes = np.asarray(codes)
+        n_rows, n_slots = codes.shape
+        if interval is None:
+            interval = axis.interval
+
+        values = np.where(codes > 0, codes, 0) if split_on_code else (codes > 0)
+        padded = np.zeros((n_rows, n_slots + 2), dtype=np.int8)
+        padded[:, 1:-1] = values
+
+        # Batas run: posisi j di mana nilai berubah antara kolom j dan j+1
+        change = padded[:, 1:] != padded[:, :-1]
+        run_rows, run_starts = np.nonzero(change & (padded[:, 1:] > 0))
+        _, run_ends = np.nonzero(change & (padded[:, :-1] > 0))
+        run_ends = run_ends - 1
+
+        n_run = run_ends - run_starts + 1
+        labels = np.asarray(axis.labels, dtype=object)
+        end_minutes = axis.minutes[run_ends] + interval
+        end_times = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in end_minutes.tolist()],
+                             dtype=object)
+
+        return pd.DataFrame({
+            'ROW': run_rows,
+            'START': run_starts,
+            'END': run_ends,
+            'CODE': codes[run_rows, run_starts].astype(np.int8),
+            'N_SLOTS': n_run,
+            'START_LABEL': labels[run_starts],
+            'END_LABEL': labels[run_ends],
+            'END_TIME': end_times,
+            'DURASI': n_run * interval / 60
+        }, columns=ScheduleMatrix.RUN_COLUMNS)
+
+    def runs(self, split_on_code: bool = False, interval: Optional[int] = None) -> pd.DataFrame:
+        """Semua run per baris matriks (lihat encode_runs)"""
+        return self.encode_runs(self.codes, self.axis, split_on_code, interval)
+
+    def group_runs(self, group_ids: np.ndarray, n_groups: int,
+                   interval: Optional[int] = None) -> pd.DataFrame:
+        """
+        Run dari gabungan slot aktif per grup (mis. per dokter-hari lintas poli)
+
+        Returns:
+            DataFrame format encode_runs dengan ROW = id grup
+        """
+        active = (self.count_by(group_ids, n_groups) > 0).astype(np.int8)
+        return self.encode_runs(active, self.axis, interval=interval)
+
+    @staticmethod
+    def run_texts(runs: pd.DataFrame, collapse_single: bool = True,
+                  true_end: bool = False) -> np.ndarray:
+        """
+        Teks rentang per run
+
+        Args:
+            runs: DataFrame hasil encode_runs
+            collapse_single: Run satu slot ditulis "HH:MM" saja
+            true_end: Pakai jam selesai sebenarnya ("07:30-10:00") alih-alih
+                label slot terakhir ("07:30-09:30")
+
+        Returns:
+            Array object berisi teks per run
+        """
+        start = runs['START_LABEL'].to_numpy(dtype=object)
+        end = runs['END_TIME' if true_end else 'END_LABEL'].to_numpy(dtype=object)
+        texts = start + '-' + end
+        if collapse_single and len(runs) > 0:
+            single = (runs['N_SLOTS'] == 1).to_numpy()
+            texts = np.where(single, start, texts)
+        return texts
+
+    @staticmethod
+    def join_runs(runs: pd.DataFrame, texts: np.ndarray, n_rows: int,
+                  sep: str = ', ') -> List[str]:
+        """Gabungkan teks run per baris (baris tanpa run → '')"""
+        joined = np.full(n_rows, '', dtype=object)
+        run_rows = runs['ROW'].to_numpy()
+        if len(run_rows) > 0:
+            starts = np.r_[0, np.flatnonzero(np.diff(run_rows)) + 1]
+            ends = np.r_[starts[1:], len(run_rows)]
+            texts = list(texts)
+            joined[run_rows[starts]] = [sep.join(texts[a:b]) for a, b in zip(starts, ends)]
+        return joined.tolist()
+
+    # ======================================================
+    # VALIDASI (OVERLOAD POLEKS & KONFLIK DOKTER)
+    # ======================================================
+
+    def overload_table(self, max_poleks: int) -> pd.DataFrame:
+        """
+        Slot (hari, slot) dengan jumlah Poleks melebihi batas
+
+        Returns:
+            DataFrame kolom HARI, SLOT, POLEKS, BATAS (urut hari lalu slot)
+        """
+        counts = self.counts_by_day(self.CODE_E)
+        return self.overload_from_counts(counts, self.days, self.slot_strings, max_poleks)
+
+    @staticmethod
+    def overload_from_counts(counts: np.ndarray, days, slot_strings: List[str],
+                             max_poleks: int) -> pd.DataFrame:
+        """Bangun tabel overload dari hitungan poleks (hari × slot)"""
+        day_pos, slot_pos = np.nonzero(counts > max_poleks)
+        return pd.DataFrame({
+            'HARI': np.asarray(days, dtype=object)[day_pos],
+            'SLOT': np.asarray(slot_strings, dtype=object)[slot_pos],
+            'POLEKS': counts[day_pos, slot_pos],
+            'BATAS': np.full(len(day_pos), max_poleks, dtype=np.int64)
+        })
+
+    def conflict_table(self) -> pd.DataFrame:
+        """
+        Semua konflik dokter: dokter aktif di >1 baris (poli) pada hari dan
+        slot yang sama. Tidak dipotong; satu baris per (dokter, hari, slot).
+
+        Returns:
+            DataFrame kolom DOKTER, HARI, SLOT, POLIS (list), JUMLAH POLI,
+            REGULER, POLEKS, TINGKAT, KETERANGAN. Urutan: grup (dokter, hari)
+            sesuai kemunculan pertama, lalu slot.
+        """
+        columns = ['DOKTER', 'HARI', 'SLOT', 'POLIS', 'JUMLAH POLI',
+                   'REGULER', 'POLEKS', 'TINGKAT', 'KETERANGAN']
+        if self.n_rows == 0 or self.n_slots == 0:
+            return pd.DataFrame(columns=columns)
+
+        group_ids, group_keys = self.group_ids('DOKTER', 'HARI')
+        n_groups = len(group_keys)
+        r_counts = self.count_by(group_ids, n_groups, self.CODE_R)
+        e_counts = self.count_by(group_ids, n_groups, self.CODE_E)
+        active_counts = r_counts + e_counts
+
+        conflict_group, conflict_slot = np.nonzero(active_counts > 1)
+        if len(conflict_group) == 0:
+            return pd.DataFrame(columns=columns)
+
+        # Daftar poli per konflik (urutan baris asli)
+        active = self.mask()
+        in_conflict = active & (active_counts[group_ids] > 1)
+        cell_rows, cell_slots = np.nonzero(in_conflict)
+        cell_key = group_ids[cell_rows] * self.n_slots + cell_slots
+        order = np.argsort(cell_key, kind='stable')
+        cell_key = cell_key[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(cell_key)) + 1]
+        ends = np.r_[starts[1:], len(cell_key)]
+        poli_values = self.meta['POLI'].to_numpy(dtype=object)[cell_rows[order]].tolist()
+        polis = np.empty(len(starts), dtype=object)
+        polis[:] = [poli_values[a:b] for a, b in zip(starts, ends)]
+
+        keys = np.empty(n_groups, dtype=object)
+        keys[:] = group_keys
+        n_r = r_counts[conflict_group, conflict_slot]
+        n_e = e_counts[conflict_group, conflict_slot]
+        n_active = n_r + n_e
+        bentrok = (n_r > 0) & (n_e > 0)
+
+        table = pd.DataFrame({
+            'DOKTER': [k[0] for k in keys[conflict_group]],
+            'HARI': [k[1] for k in keys[conflict_group]],
+            'SLOT': np.asarray(self.slot_strings, dtype=object)[conflict_slot],
+            'POLIS': polis,
+            'JUMLAH POLI': n_active,
+            'REGULER': n_r,
+            'POLEKS': n_e,
+            'TINGKAT': np.where(bentrok, 'TINGGI', 'SEDANG'),
+            'KETERANGAN': np.where(
+                bentrok,
+                'Bentrok Reguler & Poleks',
+                pd.Series(n_active).astype(str).to_numpy(dtype=object) + ' poli bersamaan'
+            )
+        })
+        return table
+
+    def validate(self, max_poleks: int) -> dict:
+        """
+        Jalankan seluruh validasi sekali dan kembalikan hasil terstruktur
+
+        Returns:
+            Dictionary: poleks_counts (hari × slot), overload (DataFrame),
+            conflicts (DataFrame), invalid_values (list)
+        """
+        return {
+            'poleks_counts': self.counts_by_day(self.CODE_E),
+            'days': list(self.days),
+            'slot_strings': list(self.slot_strings),
+            'max_poleks': max_poleks,
+            'overload': self.overload_table(max_poleks),
+            'conflicts': self.conflict_table(),
+            'invalid_values': list(self.invalid_values)
+        }
@@ -10,9 +10,15 @@ from datetime import datetime, time
 import re
 import traceback
 
+from app.core.aggregates import ScheduleAggregates
+from app.core.schedule_matrix import ScheduleMatrix
+from app.core.slot_axis import SlotAxis
+from app.core.incremental import RosterRunCache, update_validation
+from app.core.schema import apply_grid_schema
+
 
 class Scheduler:
-    def __init__(self, parser, cleaner, config):
+    def __init__(self, parser, cleaner, config, run_cache: Optional[RosterRunCache] = None):
         """
         Inisialisasi Scheduler
         
@@ -20,10 +26,20 @@ class Scheduler:
             parser: TimeParser instance untuk parsing waktu
             cleaner: DataCleaner instance untuk cleaning data
             config: Config instance untuk konfigurasi
+            run_cache: RosterRunCache dari run sebelumnya (simpan di session
+                       agar re-upload roster yang direvisi diproses inkremental)
         """
         self.parser = parser
         self.cleaner = cleaner
         self.config = config
+        self.run_cache = run_cache if run_cache is not None else RosterRunCache()
+        
+        # Hasil validasi terakhir (tabel overload & konflik lengkap)
+        self.last_validation = None
+        
+        # Matriks grid & laporan perubahan run terakhir
+        self.last_matrix = None
+        self.last_changes = None
         
         # Debug info
         print(f"✅ Scheduler initialized")
@@ -41,6 +57,7 @@ class Scheduler:
                       1. BytesIO (file upload Streamlit)
                       2. DataFrame (data sudah dibaca)
                       3. String path ke file
+                      4. WorkbookSession (sheet yang sudah di-parse untuk validasi)
             
         Returns:
             Tuple: (grid_df, slot_strings, error_messages)
@@ -49,6 +66,8 @@ class Scheduler:
                    error_messages: List pesan error/warning
         """
         error_messages = []
+        self.last_matrix = None
+        self.last_changes = None
         
         try:
             print("=" * 50)
@@ -90,9 +109,13 @@ class Scheduler:
             print(f"   ✓ First 5 slots: {slot_strings[:5]}")
             print(f"   ✓ Last 5 slots: {slot_strings[-5:]}")
             
-            # 3. PARSE TIME TO SLOTS
+            # 3. PARSE TIME TO SLOTS (hanya baris yang berubah sejak run sebelumnya)
             print("\n3️⃣ PARSING TIME RANGES TO SLOTS...")
-            slot_df = self._parse_time_to_slots(cleaned_df, slot_strings)
+            signature = tuple(self.config.hari_list)
+            fingerprints = RosterRunCache.fingerprint_rows(cleaned_df, self.config.hari_list)
+            cells, slot_df, touched_keys = self._collect_slot_entries(
+                cleaned_df, slot_strings, signature, fingerprints
+            )
             
             if slot_df.empty:
                 error_msg = "❌ Tidak ada data waktu yang berhasil di-parse"
@@ -111,78 +134,247 @@ class Scheduler:
                 
                 return None, [], error_messages
             
-            print(f"   ✓ Parsed {len(slot_df)} time slot entries")
-            print(f"   ✓ Unique doctors: {slot_df['DOKTER'].nunique()}")
-            print(f"   ✓ Unique poli: {slot_df['POLI'].nunique()}")
-            print(f"   ✓ Slot types - R: {(slot_df['KODE'] == 'R').sum()}, E: {(slot_df['KODE'] == 'E').sum()}")
+            return self._build_grid(slot_df, slot_strings, touched_keys, error_messages,
+                                    signature, fingerprints, cells)
             
-            # 4. CREATE GRID FORMAT
-            print("\n4️⃣ CREATING GRID FORMAT...")
-            grid_df = self._create_grid_format(slot_df, slot_strings)
-            
-            if grid_df is None or grid_df.empty:
-                error_msg = "❌ Grid data kosong setelah diproses"
+        except Exception as e:
+            error_msg = f"❌ Error processing data: {str(e)}"
+            print(error_msg)
+            print(traceback.format_exc())
+            error_messages.append(error_msg)
+            self.run_cache.clear()
+            return None, [], error_messages
+    
+    def regrid(self) -> Tuple[Optional[pd.DataFrame], List[str], List[str]]:
+        """
+        Bangun ulang grid untuk interval / jam mulai terbaru tanpa membaca
+        ulang Excel. Rentang waktu setiap sel sudah tersimpan dalam menit di
+        self.run_cache, jadi cukup diekspansi ulang ke sumbu slot yang baru.
+        
+        Returns:
+            Tuple: (grid_df, slot_strings, error_messages) seperti process_dataframe
+        """
+        error_messages = []
+        self.last_matrix = None
+        self.last_changes = None
+        
+        try:
+            signature = tuple(self.config.hari_list)
+            if not self.run_cache.is_compatible(signature):
+                error_msg = "❌ Data jadwal untuk hari aktif belum diproses, silakan proses ulang file"
                 print(error_msg)
                 error_messages.append(error_msg)
                 return None, [], error_messages
             
-            print(f"   ✓ Grid created: {grid_df.shape[0]} rows × {grid_df.shape[1]} columns")
-            print(f"   ✓ Grid columns sample: {list(grid_df.columns)[:8]}...")
+            print("=" * 50)
+            print("🔁 REGRID FROM CACHED MINUTE RANGES")
+            print("=" * 50)
             
-            # 5. VALIDATE GRID
-            print("\n5️⃣ VALIDATING GRID...")
-            validation_errors = self._validate_grid(grid_df, slot_strings)
+            slot_strings = self._generate_slot_strings()
+            if not slot_strings:
+                error_msg = "❌ Gagal generate time slots"
+                print(error_msg)
+                error_messages.append(error_msg)
+                return None, [], error_messages
             
-            if validation_errors:
-                print(f"   ⚠️ Found {len(validation_errors)} validation warnings")
-                error_messages.extend(validation_errors)
-            else:
-                print(f"   ✓ Grid validation passed")
+            print(f"   ✓ Generated {len(slot_strings)} time slots")
             
-            # 6. FINAL CHECK
-            print("\n6️⃣ FINAL CHECK...")
-            stats = self._calculate_statistics(grid_df, slot_strings)
+            fingerprints = self.run_cache.fingerprints
+            self.last_changes = {
+                'mode': 'regrid',
+                'rows_total': len(fingerprints),
+                'rows_reused': len(fingerprints),
+                'rows_parsed': 0,
+                'rows_removed': 0,
+            }
             
-            print(f"   ✓ Statistics:")
-            print(f"     - Total rows: {stats['total_rows']}")
-            print(f"     - Total R slots: {stats['total_r']}")
-            print(f"     - Total E slots: {stats['total_e']}")
-            print(f"     - Total doctors: {stats['total_doctors']}")
-            print(f"     - Total poli: {stats['total_poli']}")
+            cells = self.run_cache.reused_cells(fingerprints, np.ones(len(fingerprints), dtype=bool))
+            slot_df = self._slot_entries_from_cells(cells, slot_strings)
             
-            print("\n" + "=" * 50)
-            print("✅ PROCESSING COMPLETE SUCCESSFULLY")
-            print("=" * 50)
+            if slot_df.empty:
+                error_msg = "❌ Tidak ada jadwal yang masuk rentang slot waktu saat ini"
+                print(error_msg)
+                error_messages.append(error_msg)
+                return None, [], error_messages
             
-            return grid_df, slot_strings, error_messages
+            return self._build_grid(slot_df, slot_strings, None, error_messages,
+                                    signature, fingerprints, cells)
             
         except Exception as e:
-            error_msg = f"❌ Error processing data: {str(e)}"
+            error_msg = f"❌ Error regrid data: {str(e)}"
             print(error_msg)
             print(traceback.format_exc())
             error_messages.append(error_msg)
+            self.run_cache.clear()
+            return None, [], error_messages
+    
+    def _build_grid(self, slot_df: pd.DataFrame, slot_strings: List[str],
+                    touched_keys: Optional[pd.MultiIndex], error_messages: List[str],
+                    signature, fingerprints: np.ndarray, cells: pd.DataFrame):
+        """
+        Langkah 4-6 (grid, validasi, statistik) lalu simpan state ke run_cache
+        
+        Returns:
+            Tuple: (grid_df, slot_strings, error_messages)
+        """
+        print(f"   ✓ Parsed {len(slot_df)} time slot entries")
+        print(f"   ✓ Unique doctors: {slot_df['DOKTER'].nunique()}")
+        print(f"   ✓ Unique poli: {slot_df['POLI'].nunique()}")
+        print(f"   ✓ Slot types - R: {(slot_df['KODE'] == 'R').sum()}, E: {(slot_df['KODE'] == 'E').sum()}")
+        
+        # 4. CREATE GRID FORMAT
+        print("\n4️⃣ CREATING GRID FORMAT...")
+        grid_df = self._create_grid_format(slot_df, slot_strings, touched_keys)
+        
+        if grid_df is None or grid_df.empty:
+            error_msg = "❌ Grid data kosong setelah diproses"
+            print(error_msg)
+            error_messages.append(error_msg)
             return None, [], error_messages
+        
+        print(f"   ✓ Grid created: {grid_df.shape[0]} rows × {grid_df.shape[1]} columns")
+        print(f"   ✓ Grid columns sample: {list(grid_df.columns)[:8]}...")
+        
+        # 5. VALIDATE GRID
+        print("\n5️⃣ VALIDATING GRID...")
+        validation = None
+        if touched_keys is not None and self.last_matrix is not None:
+            validation = update_validation(
+                self.last_matrix, self.run_cache, touched_keys,
+                self.config.max_poleks_per_slot
+            )
+        elif self.last_matrix is not None:
+            validation = self.last_matrix.validate(self.config.max_poleks_per_slot)
+        validation_errors = self._validate_grid(grid_df, slot_strings, validation)
+        
+        if validation_errors:
+            print(f"   ⚠️ Found {len(validation_errors)} validation warnings")
+            error_messages.extend(validation_errors)
+        else:
+            print(f"   ✓ Grid validation passed")
+        
+        # 6. FINAL CHECK
+        print("\n6️⃣ FINAL CHECK...")
+        stats = self._calculate_statistics(grid_df, slot_strings)
+        
+        print(f"   ✓ Statistics:")
+        print(f"     - Total rows: {stats['total_rows']}")
+        print(f"     - Total R slots: {stats['total_r']}")
+        print(f"     - Total E slots: {stats['total_e']}")
+        print(f"     - Total doctors: {stats['total_doctors']}")
+        print(f"     - Total poli: {stats['total_poli']}")
+        
+        # Simpan state untuk re-proses inkremental / regrid berikutnya
+        if self.last_matrix is not None:
+            self.run_cache.store(signature, slot_strings, fingerprints, cells,
+                                 self.last_matrix, self.last_validation)
+        self._print_change_report()
+        
+        print("\n" + "=" * 50)
+        print("✅ PROCESSING COMPLETE SUCCESSFULLY")
+        print("=" * 50)
+        
+        return grid_df, slot_strings, error_messages
+    
+    def _collect_slot_entries(self, df: pd.DataFrame, slot_strings: List[str],
+                              signature, fingerprints: np.ndarray):
+        """
+        Kumpulkan entri slot; sel dari baris yang tidak berubah sejak run
+        sebelumnya diambil dari self.run_cache, hanya baris baru/berubah
+        yang di-parse
+        
+        Args:
+            df: DataFrame yang sudah dibersihkan
+            slot_strings: List slot waktu
+            signature: Tuple hari_list run ini
+            fingerprints: Fingerprint per baris df
+            
+        Returns:
+            Tuple (cells, slot_df, touched_keys):
+                cells: Sel hasil parse (menit) dengan kolom _FP/_POS
+                slot_df: Entri slot dengan kolom tambahan _FP/_POS
+                touched_keys: MultiIndex kombinasi yang berubah, atau None jika
+                              grid harus dibangun penuh (run pertama / sumbu slot berubah)
+        """
+        cache = self.run_cache
+        incremental = cache.is_compatible(signature)
+        
+        if incremental:
+            reuse, removed = cache.diff(fingerprints)
+        else:
+            reuse, removed = np.zeros(len(df), dtype=bool), np.array([], dtype=np.uint64)
+        
+        new_pos = np.flatnonzero(~reuse)
+        self.last_changes = {
+            'mode': 'inkremental' if incremental else 'penuh',
+            'rows_total': len(df),
+            'rows_reused': int(reuse.sum()),
+            'rows_parsed': len(new_pos),
+            'rows_removed': len(removed),
+        }
+        
+        # Parse hanya baris baru/berubah
+        parsed = self._parse_cells(df.iloc[new_pos])
+        parsed['_FP'] = fingerprints[new_pos][parsed['_ROW'].to_numpy(dtype=np.int64)]
+        parsed['_POS'] = new_pos[parsed['_ROW'].to_numpy(dtype=np.int64)]
+        parsed = parsed.drop(columns='_ROW')
+        
+        cells = parsed
+        if incremental:
+            # Gabungkan dengan sel tersimpan, urut sesuai posisi baris
+            # (hasil sama persis dengan parse penuh)
+            parts = [part for part in [cache.reused_cells(fingerprints, reuse), parsed] if not part.empty]
+            if parts:
+                cells = pd.concat(parts, ignore_index=True)
+                order = np.argsort(cells['_POS'].to_numpy(dtype=np.int64), kind='stable')
+                cells = cells.iloc[order].reset_index(drop=True)
+        
+        slot_df = self._slot_entries_from_cells(cells, slot_strings)
+        
+        if not incremental:
+            return cells, slot_df, None
+        
+        key_cols = ['POLI', 'JENIS', 'HARI', 'DOKTER']
+        touched = pd.concat([cache.removed_keys(removed), parsed[key_cols]], ignore_index=True)
+        touched_keys = pd.MultiIndex.from_frame(touched.astype(object)).unique()
+        self.last_changes['changed_doctors'] = sorted(set(touched_keys.get_level_values('DOKTER')))
+        
+        # Baris grid lama hanya bisa dipakai ulang jika sumbu slot sama
+        if cache.slot_strings != list(slot_strings):
+            return cells, slot_df, None
+        return cells, slot_df, touched_keys
+    
+    def _slot_entries_from_cells(self, cells: pd.DataFrame, slot_strings: List[str]) -> pd.DataFrame:
+        """Ekspansi sel ke entri slot, membawa kolom _FP/_POS sel asalnya"""
+        slot_df, entry_cell = self._expand_cells(cells, slot_strings)
+        if not slot_df.empty:
+            slot_df['_FP'] = cells['_FP'].to_numpy()[entry_cell]
+            slot_df['_POS'] = cells['_POS'].to_numpy(dtype=np.int64)[entry_cell]
+        return slot_df
+    
+    def _print_change_report(self):
+        """Cetak ringkasan perubahan dibanding run sebelumnya"""
+        changes = self.last_changes
+        if not changes:
+            return
+        print(f"\n🔁 CHANGE REPORT ({changes['mode']})")
+        print(f"   - Rows: {changes['rows_total']} total, {changes['rows_reused']} reused, "
+              f"{changes['rows_parsed']} parsed, {changes['rows_removed']} removed")
+        if 'grid_rows_rebuilt' in changes:
+            print(f"   - Grid rows: {changes['grid_rows_rebuilt']} rebuilt, "
+                  f"{changes['grid_rows_reused']} reused")
+        if changes.get('changed_doctors'):
+            print(f"   - Changed doctors: {changes['changed_doctors'][:10]}")
     
     def _generate_slot_strings(self) -> List[str]:
         """
         Generate list slot waktu berdasarkan konfigurasi
         
         Returns:
-            List string format "HH:MM" dari start_time sampai 14:30
+            List string format "HH:MM" dari start_time sampai end_time (default 14:30)
         """
         try:
-            slot_strings = []
-            current_time = self.config.start_hour * 60 + self.config.start_minute
-            end_time = 14 * 60 + 30  # Hard stop at 14:30
-            
-            while current_time < end_time:
-                hours = current_time // 60
-                minutes = current_time % 60
-                time_str = f"{hours:02d}:{minutes:02d}"
-                slot_strings.append(time_str)
-                current_time += self.config.interval_minutes
-            
-            return slot_strings
+            return SlotAxis.from_config(self.config).to_list()
             
         except Exception as e:
             print(f"❌ Error in _generate_slot_strings: {e}")
@@ -191,7 +383,11 @@ class Scheduler:
     def _parse_time_to_slots(self, df: pd.DataFrame, slot_strings: List[str]) -> pd.DataFrame:
         """
         Parse waktu dari kolom hari ke dalam slot-slot waktu
-        
+
+        Semua sel hari di-melt sekaligus, di-parse secara vektor menjadi
+        menit mulai/selesai, lalu diekspansi ke indeks slot dengan NumPy
+        (repeat/arange) tanpa loop per baris.
+
         Args:
             df: DataFrame yang sudah dibersihkan
             slot_strings: List slot waktu
@@ -200,63 +396,8 @@ class Scheduler:
             DataFrame dengan kolom: POLI, JENIS, HARI, DOKTER, SLOT, KODE
         """
         try:
-            result_rows = []
-            hari_list = self.config.hari_list
-            
-            print(f"   Parsing time for {len(df)} rows")
-            print(f"   Days to parse: {hari_list}")
-            
-            for idx, row in df.iterrows():
-                nama_dokter = str(row.get('Nama Dokter', '')).strip()
-                poli_asal = str(row.get('Poli Asal', '')).strip()
-                jenis_poli = str(row.get('Jenis Poli', '')).strip()
-                
-                # Skip jika data penting kosong
-                if not nama_dokter or nama_dokter.lower() in ['nan', 'null', '']:
-                    continue
-                if not poli_asal or poli_asal.lower() in ['nan', 'null', '']:
-                    continue
-                
-                for hari in hari_list:
-                    if hari in row and pd.notna(row[hari]):
-                        time_range = str(row[hari]).strip()
-                        
-                        # Skip jika kosong
-                        if not time_range or time_range.lower() in ['nan', 'null', 'none', '']:
-                            continue
-                        
-                        # Parse waktu
-                        slots = self.parser.parse_time_range(time_range, slot_strings)
-                        
-                        if slots:
-                            # Tentukan kode berdasarkan jenis poli
-                            if 'poleks' in jenis_poli.lower():
-                                kode = 'E'
-                            else:
-                                kode = 'R'
-                            
-                            for slot in slots:
-                                result_rows.append({
-                                    'POLI': poli_asal,
-                                    'JENIS': jenis_poli,
-                                    'HARI': hari,
-                                    'DOKTER': nama_dokter,
-                                    'SLOT': slot,
-                                    'KODE': kode
-                                })
-                        else:
-                            # Debug: waktu tidak bisa di-parse
-                            print(f"   ⚠️ Could not parse time: '{time_range}' for Dr. {nama_dokter} on {hari}")
-            
-            result_df = pd.DataFrame(result_rows)
-            
-            if not result_df.empty:
-                print(f"   ✓ Successfully parsed {len(result_df)} time slots")
-                print(f"   ✓ Sample entries:")
-                for i in range(min(3, len(result_df))):
-                    entry = result_df.iloc[i]
-                    print(f"     - {entry['HARI']} {entry['SLOT']}: Dr. {entry['DOKTER']} ({entry['KODE']})")
-            
+            cells = self._parse_cells(df)
+            result_df, _ = self._expand_cells(cells, slot_strings)
             return result_df
             
         except Exception as e:
@@ -264,16 +405,170 @@ class Scheduler:
             print(traceback.format_exc())
             return pd.DataFrame()
     
-    def _create_grid_format(self, slot_df: pd.DataFrame, slot_strings: List[str]) -> pd.DataFrame:
+    def _parse_cells(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Melt kolom hari dan parse setiap sel terisi ke menit mulai/selesai
+        
+        Hasilnya tidak bergantung pada interval atau jam mulai, sehingga bisa
+        disimpan dan diekspansi ulang ke sumbu slot mana pun.
+        
+        Args:
+            df: DataFrame yang sudah dibersihkan
+            
+        Returns:
+            DataFrame sel dengan kolom: POLI, JENIS, HARI, DOKTER, KODE, TEXT,
+            START, END (menit, -1 jika gagal parse), _ROW (posisi baris di df).
+            Urutan: baris, lalu hari sesuai hari_list.
+        """
+        hari_list = self.config.hari_list
+        empty = pd.DataFrame(columns=['POLI', 'JENIS', 'HARI', 'DOKTER', 'KODE',
+                                      'TEXT', 'START', 'END', '_ROW'])
+        
+        print(f"   Parsing time for {len(df)} rows")
+        print(f"   Days to parse: {hari_list}")
+        
+        if df.empty or 'Nama Dokter' not in df.columns or 'Poli Asal' not in df.columns:
+            return empty
+        
+        # 1. Kolom metadata sebagai teks (setara str(x).strip())
+        dokter = self._as_text(df['Nama Dokter'])
+        poli = self._as_text(df['Poli Asal'])
+        if 'Jenis Poli' in df.columns:
+            jenis = self._as_text(df['Jenis Poli'])
+        else:
+            jenis = np.full(len(df), '', dtype=object)
+        
+        # Skip baris dengan data penting kosong
+        empty_values = ['nan', 'null', '']
+        row_ok = (
+            ~pd.Series(dokter).str.lower().isin(empty_values).to_numpy() &
+            ~pd.Series(poli).str.lower().isin(empty_values).to_numpy()
+        )
+        
+        # Tentukan kode berdasarkan jenis poli
+        kode = np.where(pd.Series(jenis).str.lower().str.contains('poleks', regex=False).to_numpy(), 'E', 'R')
+        
+        # 2. Melt kolom hari (urutan: baris, lalu hari sesuai hari_list)
+        hari_cols = [hari for hari in hari_list if hari in df.columns]
+        if not hari_cols:
+            return empty
+        
+        cells = df[hari_cols].to_numpy(dtype=object).ravel()
+        cell_row = np.repeat(np.arange(len(df)), len(hari_cols))
+        cell_day = np.tile(np.arange(len(hari_cols)), len(df))
+        
+        present = pd.notna(cells) & row_ok[cell_row]
+        cells, cell_row, cell_day = cells[present], cell_row[present], cell_day[present]
+        
+        time_ranges = pd.Series(cells.astype(str)).str.strip()
+        filled = ~time_ranges.str.lower().isin(['nan', 'null', 'none', '']).to_numpy()
+        time_ranges = time_ranges[filled].reset_index(drop=True)
+        cell_row, cell_day = cell_row[filled], cell_day[filled]
+        
+        # 3. Parse semua range sekaligus ke menit (string unik sekali, lewat memo)
+        before = self.parser.cache_stats()
+        start_min, end_min = self.parser.parse_minutes(time_ranges)
+        after = self.parser.cache_stats()
+        print(f"   ✓ Parsed {len(time_ranges)} cells: {after['unique'] - before['unique']} unique strings, "
+              f"{after['hits'] - before['hits']} from memo, {after['parsed'] - before['parsed']} parsed")
+        
+        return pd.DataFrame({
+            'POLI': poli[cell_row],
+            'JENIS': jenis[cell_row],
+            'HARI': np.asarray(hari_cols, dtype=object)[cell_day],
+            'DOKTER': dokter[cell_row],
+            'KODE': kode.astype(object)[cell_row],
+            'TEXT': time_ranges.to_numpy(dtype=object),
+            'START': start_min,
+            'END': end_min,
+            '_ROW': cell_row
+        })
+    
+    def _expand_cells(self, cells: pd.DataFrame, slot_strings: List[str]) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Ekspansi sel (menit mulai/selesai) ke indeks slot (slot berurutan naik)
+        
+        Args:
+            cells: DataFrame dari _parse_cells
+            slot_strings: List slot waktu
+            
+        Returns:
+            Tuple (DataFrame kolom POLI, JENIS, HARI, DOKTER, SLOT, KODE,
+                   posisi sel asal untuk setiap entri)
+        """
+        no_cells = np.array([], dtype=np.int64)
+        if cells.empty:
+            return pd.DataFrame(), no_cells
+        
+        start_min = cells['START'].to_numpy(dtype=np.int64)
+        end_min = cells['END'].to_numpy(dtype=np.int64)
+        
+        slot_minutes = self._slot_minutes(slot_strings)
+        lo = np.searchsorted(slot_minutes, start_min, side='left')
+        hi = np.searchsorted(slot_minutes, end_min, side='left')
+        counts = np.where(start_min >= 0, np.maximum(hi - lo, 0), 0)
+        
+        # Debug: waktu tidak bisa di-parse
+        texts = cells['TEXT'].to_numpy(dtype=object)
+        dokter = cells['DOKTER'].to_numpy(dtype=object)
+        hari = cells['HARI'].to_numpy(dtype=object)
+        for i in np.flatnonzero(counts == 0):
+            print(f"   ⚠️ Could not parse time: '{texts[i]}' for Dr. {dokter[i]} on {hari[i]}")
+        
+        total = int(counts.sum())
+        if total == 0:
+            return pd.DataFrame(), no_cells
+        
+        entry_cell = np.repeat(np.arange(len(counts)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        entry_slot = lo[entry_cell] + offsets
+        
+        result_df = pd.DataFrame({
+            'POLI': cells['POLI'].to_numpy(dtype=object)[entry_cell],
+            'JENIS': cells['JENIS'].to_numpy(dtype=object)[entry_cell],
+            'HARI': hari[entry_cell],
+            'DOKTER': dokter[entry_cell],
+            'SLOT': np.asarray(slot_strings, dtype=object)[entry_slot],
+            'KODE': cells['KODE'].to_numpy(dtype=object)[entry_cell]
+        })
+        
+        print(f"   ✓ Successfully parsed {len(result_df)} time slots")
+        print(f"   ✓ Sample entries:")
+        for i in range(min(3, len(result_df))):
+            entry = result_df.iloc[i]
+            print(f"     - {entry['HARI']} {entry['SLOT']}: Dr. {entry['DOKTER']} ({entry['KODE']})")
+        
+        return result_df, entry_cell
+    
+    @staticmethod
+    def _as_text(series: pd.Series) -> np.ndarray:
+        """Konversi kolom ke array teks (setara str(value).strip() per sel)"""
+        text = series.to_numpy(dtype=object).astype(str)
+        return pd.Series(text).str.strip().to_numpy(dtype=object)
+    
+    @staticmethod
+    def _slot_minutes(slot_strings: List[str]) -> np.ndarray:
+        """Konversi slot "HH:MM" ke array menit sejak 00:00"""
+        return SlotAxis.from_labels(slot_strings).minutes
+    
+    def _create_grid_format(self, slot_df: pd.DataFrame, slot_strings: List[str],
+                            touched_keys: Optional[pd.MultiIndex] = None) -> pd.DataFrame:
         """
         Ubah format slot menjadi grid (pivot format)
+
+        Setiap kombinasi POLI/JENIS/HARI/DOKTER diberi nomor sekali lewat
+        groupby, lalu KODE di-scatter langsung ke matriks (baris × slot).
+        Kolom JAM dihitung dari matriks yang sama.
         
         Args:
             slot_df: DataFrame dari _parse_time_to_slots
             slot_strings: List slot waktu
+            touched_keys: Kombinasi yang berubah sejak run sebelumnya; jika
+                          diberikan, baris lain diambil dari self.run_cache
             
         Returns:
             DataFrame grid dengan kolom: POLI, JENIS, HARI, DOKTER, JAM, [slot1], [slot2], ...
+            (dtype sesuai app.core.schema: metadata category, slot '', 'R', 'E')
         """
         try:
             if slot_df.empty:
@@ -282,52 +577,46 @@ class Scheduler:
             
             print(f"   Creating grid from {len(slot_df)} slot entries")
             
-            # Group by kombinasi unik
-            unique_combos = slot_df[['POLI', 'JENIS', 'HARI', 'DOKTER']].drop_duplicates()
-            print(f"   Found {len(unique_combos)} unique doctor-day combinations")
-            
-            grid_rows = []
-            
-            for idx, combo in unique_combos.iterrows():
-                poli = combo['POLI']
-                jenis = combo['JENIS']
-                hari = combo['HARI']
-                dokter = combo['DOKTER']
-                
-                # Filter data untuk kombinasi ini
-                mask = (
-                    (slot_df['POLI'] == poli) &
-                    (slot_df['JENIS'] == jenis) &
-                    (slot_df['HARI'] == hari) &
-                    (slot_df['DOKTER'] == dokter)
-                )
-                combo_data = slot_df[mask]
-                
-                if combo_data.empty:
-                    continue
-                
-                # Buat dictionary untuk row ini
-                row_data = {
-                    'POLI': poli,
-                    'JENIS': jenis,
-                    'HARI': hari,
-                    'DOKTER': dokter,
-                    'JAM': self._get_time_range(combo_data, slot_strings)
-                }
-                
-                # Tambahkan kolom untuk setiap slot
-                for slot in slot_strings:
-                    slot_mask = combo_data['SLOT'] == slot
-                    if slot_mask.any():
-                        kode = combo_data[slot_mask]['KODE'].iloc[0]
-                        row_data[slot] = kode
-                    else:
-                        row_data[slot] = ''
-                
-                grid_rows.append(row_data)
-            
-            # Buat DataFrame
-            grid_df = pd.DataFrame(grid_rows)
+            # Nomori kombinasi unik sesuai urutan kemunculan pertama
+            key_cols = ['POLI', 'JENIS', 'HARI', 'DOKTER']
+            combo_id = slot_df.groupby(key_cols, sort=False, dropna=False).ngroup().to_numpy()
+            n_combos = int(combo_id.max()) + 1
+            print(f"   Found {n_combos} unique doctor-day combinations")
+            
+            _, first_pos = np.unique(combo_id, return_index=True)
+            meta = slot_df[key_cols].iloc[first_pos].reset_index(drop=True)
+            
+            # Scatter KODE ke matriks kode int8 (baris kombinasi × slot)
+            slot_idx = pd.Index(slot_strings).get_indexer(slot_df['SLOT'])
+            known = slot_idx >= 0
+            kode = np.where(slot_df['KODE'].to_numpy(dtype=object) == 'E',
+                            ScheduleMatrix.CODE_E, ScheduleMatrix.CODE_R)
+            
+            # Kombinasi yang tidak tersentuh disalin dari grid sebelumnya
+            rebuild = np.ones(n_combos, dtype=bool)
+            if touched_keys is not None:
+                keys = pd.MultiIndex.from_frame(meta.astype(object))
+                prev_idx = self.run_cache.grid_keys.get_indexer(keys)
+                rebuild = (prev_idx < 0) | keys.isin(touched_keys)
+            
+            codes = np.zeros((n_combos, len(slot_strings)), dtype=np.int8)
+            fill = known & rebuild[combo_id]
+            codes[combo_id[fill], slot_idx[fill]] = kode[fill]
+            
+            jam = np.empty(n_combos, dtype=object)
+            if touched_keys is not None:
+                kept = ~rebuild
+                codes[kept] = self.run_cache.codes[prev_idx[kept]]
+                jam[kept] = self.run_cache.jam[prev_idx[kept]]
+            jam[rebuild] = self._ranges_from_codes(codes[rebuild], slot_strings)
+            meta['JAM'] = jam.tolist()
+            
+            if self.last_changes is not None:
+                self.last_changes['grid_rows_rebuilt'] = int(rebuild.sum())
+                self.last_changes['grid_rows_reused'] = int(n_combos - rebuild.sum())
+            
+            self.last_matrix = ScheduleMatrix(codes, meta, slot_strings)
+            grid_df = self.last_matrix.to_grid()
             
             # Urutkan kolom: metadata dulu, lalu slot waktu
             meta_columns = ['POLI', 'JENIS', 'HARI', 'DOKTER', 'JAM']
@@ -347,69 +636,41 @@ class Scheduler:
             print(traceback.format_exc())
             return pd.DataFrame()
     
-    def _get_time_range(self, df: pd.DataFrame, slot_strings: List[str]) -> str:
+    def _ranges_from_codes(self, codes: np.ndarray, slot_strings: List[str]) -> List[str]:
         """
-        Dapatkan range waktu dari slot yang aktif (untuk kolom JAM)
+        Hitung kolom JAM untuk semua baris sekaligus dari matriks kode
         
         Args:
-            df: DataFrame untuk satu dokter di satu hari
+            codes: Matriks kode int8 (baris × slot), 0 = kosong
             slot_strings: List semua slot waktu
             
         Returns:
-            String format "HH:MM-HH:MM, HH:MM-HH:MM, ..."
-        """
-        if df.empty:
-            return ''
-        
-        # Dapatkan slot yang aktif
-        active_slots = sorted(df['SLOT'].tolist())
-        if not active_slots:
-            return ''
-        
-        # Gabungkan slot berurutan menjadi ranges
-        ranges = []
-        start = active_slots[0]
-        end = active_slots[0]
-        
-        for i in range(1, len(active_slots)):
-            current_slot = active_slots[i]
-            current_idx = slot_strings.index(current_slot)
-            prev_idx = slot_strings.index(end)
-            
-            # Jika slot berurutan (berdasarkan index)
-            if current_idx == prev_idx + 1:
-                end = current_slot
-            else:
-                # Tambahkan range saat ini
-                if start == end:
-                    ranges.append(start)
-                else:
-                    ranges.append(f"{start}-{end}")
-                
-                # Mulai range baru
-                start = current_slot
-                end = current_slot
-        
-        # Tambahkan range terakhir
-        if start == end:
-            ranges.append(start)
-        else:
-            ranges.append(f"{start}-{end}")
-        
-        return ", ".join(ranges)
+            List string format "HH:MM-HH:MM, HH:MM, ..." per baris
+        """
+        runs = ScheduleMatrix.encode_runs(codes, slot_strings)
+        texts = ScheduleMatrix.run_texts(runs)
+        return ScheduleMatrix.join_runs(runs, texts, codes.shape[0])
     
-    def _validate_grid(self, grid_df: pd.DataFrame, slot_strings: List[str]) -> List[str]:
+    def _validate_grid(self, grid_df: pd.DataFrame, slot_strings: List[str],
+                       validation: Optional[dict] = None) -> List[str]:
         """
         Validasi grid untuk konflik dan batasan
         
+        Hitungan Poleks per (hari, slot) dan baris aktif per (dokter, hari, slot)
+        dihitung sekali di ScheduleMatrix. Hasil lengkap (tabel overload & tabel
+        konflik, tidak dipotong) disimpan di self.last_validation agar bisa
+        dipakai ulang oleh ExcelWriter.
+        
         Args:
             grid_df: DataFrame grid
             slot_strings: List slot waktu
+            validation: Hasil validasi yang sudah dihitung (mis. inkremental)
             
         Returns:
             List pesan error/warning
         """
         errors = []
+        self.last_validation = None
         
         try:
             print(f"   Validating grid with {len(grid_df)} rows...")
@@ -418,85 +679,46 @@ class Scheduler:
                 errors.append("Grid data kosong")
                 return errors
             
+            if validation is None:
+                matrix = ScheduleMatrix.from_grid(grid_df, slot_strings)
+                validation = matrix.validate(self.config.max_poleks_per_slot)
+            self.last_validation = validation
+            
+            # Urutkan sesuai urutan hari di konfigurasi
+            hari_order = {hari: i for i, hari in enumerate(self.config.hari_list)}
+            
             # 1. Validasi max_poleks_per_slot per hari
-            hari_list = self.config.hari_list
+            overload = validation['overload']
+            overload = overload[overload['HARI'].isin(hari_order)]
+            overload = overload.iloc[np.argsort(overload['HARI'].map(hari_order).to_numpy(), kind='stable')]
             
-            for hari in hari_list:
-                hari_data = grid_df[grid_df['HARI'] == hari]
-                
-                if hari_data.empty:
-                    continue
-                
-                for slot in slot_strings:
-                    if slot not in hari_data.columns:
-                        continue
-                    
-                    # Hitung poleks di slot ini
-                    poleks_count = (hari_data[slot] == 'E').sum()
-                    
-                    if poleks_count > self.config.max_poleks_per_slot:
-                        errors.append(
-                            f"⚠️ Hari {hari}, Slot {slot}: "
-                            f"Poleks melebihi batas ({poleks_count} > {self.config.max_poleks_per_slot})"
-                        )
-            
-            print(f"   ✓ Max poleks validation: {len([e for e in errors if 'Poleks melebihi batas' in e])} warnings")
+            for hari, slot, poleks_count in overload[['HARI', 'SLOT', 'POLEKS']].itertuples(index=False):
+                errors.append(
+                    f"⚠️ Hari {hari}, Slot {slot}: "
+                    f"Poleks melebihi batas ({poleks_count} > {self.config.max_poleks_per_slot})"
+                )
+            
+            print(f"   ✓ Max poleks validation: {len(overload)} warnings")
             
             # 2. Validasi konflik dokter (dokter yang sama di poli berbeda di slot yang sama)
-            doctor_conflicts = []
+            conflicts = validation['conflicts']
+            conflicts = conflicts[conflicts['HARI'].isin(hari_order)]
+            conflicts = conflicts.iloc[np.argsort(conflicts['HARI'].map(hari_order).to_numpy(), kind='stable')]
             
-            for hari in hari_list:
-                hari_data = grid_df[grid_df['HARI'] == hari]
-                
-                if hari_data.empty:
-                    continue
-                
-                doctors = hari_data['DOKTER'].unique()
-                
-                for dokter in doctors:
-                    doc_data = hari_data[hari_data['DOKTER'] == dokter]
-                    
-                    # Jika dokter muncul di lebih dari 1 baris (berarti di poli berbeda)
-                    if len(doc_data) > 1:
-                        for slot in slot_strings:
-                            if slot not in doc_data.columns:
-                                continue
-                            
-                            # Cek slot yang aktif untuk dokter ini
-                            active_rows = doc_data[doc_data[slot].isin(['R', 'E'])]
-                            
-                            if len(active_rows) > 1:
-                                # Dokter aktif di lebih dari 1 poli di slot yang sama
-                                active_polis = active_rows['POLI'].tolist()
-                                doctor_conflicts.append({
-                                    'dokter': dokter,
-                                    'hari': hari,
-                                    'slot': slot,
-                                    'polis': active_polis
-                                })
-            
-            # Format conflict messages
-            for conflict in doctor_conflicts[:5]:  # Limit to 5 conflicts
+            # Tabel lengkap ada di self.last_validation; pesan cukup ringkasan
+            for conflict in conflicts.head(5).itertuples(index=False):
                 errors.append(
-                    f"⚠️ Konflik: Dr. {conflict['dokter']} di {conflict['hari']} jam {conflict['slot']} "
-                    f"berada di {len(conflict['polis'])} poli: {', '.join(conflict['polis'])}"
+                    f"⚠️ Konflik: Dr. {conflict.DOKTER} di {conflict.HARI} jam {conflict.SLOT} "
+                    f"berada di {len(conflict.POLIS)} poli: {', '.join(conflict.POLIS)}"
                 )
             
-            if len(doctor_conflicts) > 5:
-                errors.append(f"⚠️ ... dan {len(doctor_conflicts) - 5} konflik dokter lainnya")
+            if len(conflicts) > 5:
+                errors.append(f"⚠️ ... dan {len(conflicts) - 5} konflik dokter lainnya")
             
-            print(f"   ✓ Doctor conflict validation: {len(doctor_conflicts)} conflicts found")
+            print(f"   ✓ Doctor conflict validation: {len(conflicts)} conflicts found")
             
             # 3. Validasi data kosong/tidak valid
-            invalid_codes = []
-            valid_codes = ['', 'R', 'E']
-            
-            for slot in slot_strings:
-                if slot in grid_df.columns:
-                    invalid_mask = ~grid_df[slot].isin(valid_codes)
-                    if invalid_mask.any():
-                        invalid_rows = grid_df[invalid_mask]
-                        invalid_codes.extend(invalid_rows[slot].unique())
+            invalid_codes = validation['invalid_values']
             
             if invalid_codes:
                 errors.append(f"⚠️ Kode tidak valid ditemukan: {set(invalid_codes)}")
@@ -527,16 +749,13 @@ class Scheduler:
         
         try:
             if not grid_df.empty:
-                # Hitung R dan E
-                for slot in slot_strings:
-                    if slot in grid_df.columns:
-                        stats['total_r'] += (grid_df[slot] == 'R').sum()
-                        stats['total_e'] += (grid_df[slot] == 'E').sum()
-                
-                # Hitung unik
-                stats['total_doctors'] = grid_df['DOKTER'].nunique()
-                stats['total_poli'] = grid_df['POLI'].nunique()
-                stats['total_slots'] = len(grid_df) * len(slot_strings)
+                # Agregat bersama (dipakai ulang oleh ExcelWriter & UI)
+                aggregates = ScheduleAggregates.for_grid(grid_df, slot_strings)
+                stats['total_r'] = aggregates.total_r
+                stats['total_e'] = aggregates.total_e
+                stats['total_doctors'] = aggregates.total_doctors
+                stats['total_poli'] = aggregates.total_poli
+                stats['total_slots'] = aggregates.total_slots
             
         except Exception as e:
             print(f"⚠️ Error calculating statistics: {e}")
@@ -590,7 +809,7 @@ class Scheduler:
                     row[slot] = 'R' if data['JENIS'] == 'Reguler' else 'E'
                 sample_rows.append(row)
             
-            return pd.DataFrame(sample_rows)
+            return apply_grid_schema(pd.DataFrame(sample_rows), slot_strings)
             
         except Exception as e:
             print(f"Error generating sample: {e}")
@@ -615,80 +834,46 @@ class Scheduler:
             if grid_df.empty:
                 return result
             
-            # 1. Rekap Layanan
-            rekap_rows = []
-            for _, row in grid_df.iterrows():
-                active_slots = []
-                for slot in slot_strings:
-                    if slot in row and row[slot] in ['R', 'E']:
-                        active_slots.append(slot)
-                
-                if active_slots:
-                    # Gabungkan slot berurutan
-                    time_ranges = self._combine_slots_to_ranges(active_slots, slot_strings)
-                    for time_range in time_ranges:
-                        rekap_rows.append({
-                            'POLI': row['POLI'],
-                            'HARI': row['HARI'],
-                            'DOKTER': row['DOKTER'],
-                            'JENIS': row['JENIS'],
-                            'WAKTU LAYANAN': time_range
-                        })
-            
-            if rekap_rows:
-                result['rekap_layanan'] = pd.DataFrame(rekap_rows)
-            
-            # 2. Rekap Poli
-            poli_rows = []
-            for (poli, hari), group in grid_df.groupby(['POLI', 'HARI']):
-                total_r = total_e = 0
-                for slot in slot_strings:
-                    if slot in group.columns:
-                        total_r += (group[slot] == 'R').sum()
-                        total_e += (group[slot] == 'E').sum()
-                
-                # Konversi ke jam
-                interval_hours = self.config.interval_minutes / 60
-                jam_r = round(total_r * interval_hours, 2)
-                jam_e = round(total_e * interval_hours, 2)
-                total_jam = jam_r + jam_e
-                
-                poli_rows.append({
-                    'POLI': poli,
-                    'HARI': hari,
-                    'REGULER (JAM)': jam_r,
-                    'POLEKS (JAM)': jam_e,
-                    'TOTAL': total_jam
+            # Satu run-length encoding untuk Rekap Layanan & Rekap Dokter
+            aggregates = ScheduleAggregates.for_grid(grid_df, slot_strings)
+            matrix = aggregates.matrix
+            interval = self.config.interval_minutes
+            
+            # 1. Rekap Layanan (satu baris per run per baris grid)
+            runs = matrix.runs(interval=interval)
+            if not runs.empty:
+                rows = runs['ROW'].to_numpy()
+                result['rekap_layanan'] = pd.DataFrame({
+                    col: grid_df[col].to_numpy(dtype=object)[rows]
+                    for col in ['POLI', 'HARI', 'DOKTER', 'JENIS']
                 })
+                result['rekap_layanan']['WAKTU LAYANAN'] = ScheduleMatrix.run_texts(
+                    runs, collapse_single=False
+                )
             
-            if poli_rows:
-                result['rekap_poli'] = pd.DataFrame(poli_rows)
-            
-            # 3. Rekap Dokter
-            dokter_rows = []
-            for (dokter, hari), group in grid_df.groupby(['DOKTER', 'HARI']):
-                active_slots = []
-                for slot in slot_strings:
-                    if slot in group.columns:
-                        if (group[slot].isin(['R', 'E'])).any():
-                            active_slots.append(slot)
-                
-                if active_slots:
-                    time_ranges = self._combine_slots_to_ranges(active_slots, slot_strings)
-                    for time_range in time_ranges:
-                        # Hitung durasi
-                        slots_in_range = self._get_slots_in_range(time_range, slot_strings)
-                        durasi = len(slots_in_range) * (self.config.interval_minutes / 60)
-                        
-                        dokter_rows.append({
-                            'DOKTER': dokter,
-                            'HARI': hari,
-                            'SHIFT': time_range,
-                            'TOTAL JAM': round(durasi, 2)
-                        })
-            
-            if dokter_rows:
-                result['rekap_dokter'] = pd.DataFrame(dokter_rows)
+            # 2. Rekap Poli (urut seperti groupby POLI, HARI)
+            poli_hours = aggregates.poli_hours(interval, sort=True)
+            if not poli_hours.empty:
+                result['rekap_poli'] = poli_hours.rename(columns={'TOTAL JAM': 'TOTAL'})
+            
+            # 3. Rekap Dokter (gabungan slot aktif per dokter-hari, urut seperti groupby)
+            grouper = grid_df.groupby(['DOKTER', 'HARI'], observed=True)
+            group_ids = grouper.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+            group_keys = list(grouper.size().index)
+            valid = group_ids >= 0
+            dokter_runs = matrix.subset(valid).group_runs(
+                group_ids[valid], len(group_keys), interval=interval
+            )
+            if not dokter_runs.empty:
+                keys = np.empty(len(group_keys), dtype=object)
+                keys[:] = group_keys
+                run_keys = keys[dokter_runs['ROW'].to_numpy()]
+                result['rekap_dokter'] = pd.DataFrame({
+                    'DOKTER': [k[0] for k in run_keys],
+                    'HARI': [k[1] for k in run_keys],
+                    'SHIFT': ScheduleMatrix.run_texts(dokter_runs, collapse_single=False),
+                    'TOTAL JAM': dokter_runs['DURASI'].round(2).to_numpy()
+                })
             
         except Exception as e:
             print(f"⚠️ Error in export formatting: {e}")
@@ -697,40 +882,9 @@ class Scheduler:
     
     def _combine_slots_to_ranges(self, slots: List[str], slot_strings: List[str]) -> List[str]:
         """Gabungkan slot menjadi range waktu"""
-        if not slots:
-            return []
-        
-        # Sort slots berdasarkan urutan di slot_strings
-        slots_sorted = sorted(slots, key=lambda x: slot_strings.index(x))
-        
-        ranges = []
-        start = slots_sorted[0]
-        end = slots_sorted[0]
-        
-        for i in range(1, len(slots_sorted)):
-            current_idx = slot_strings.index(slots_sorted[i])
-            prev_idx = slot_strings.index(end)
-            
-            if current_idx == prev_idx + 1:
-                end = slots_sorted[i]
-            else:
-                ranges.append(f"{start}-{end}")
-                start = slots_sorted[i]
-                end = slots_sorted[i]
-        
-        ranges.append(f"{start}-{end}")
-        return ranges
+        axis = SlotAxis.from_labels(slot_strings)
+        return [axis.format_run(start, end, collapse_single=False) for start, end in axis.runs(slots)]
     
     def _get_slots_in_range(self, time_range: str, slot_strings: List[str]) -> List[str]:
         """Dapatkan semua slot dalam range waktu"""
-        if '-' not in time_range:
-            return [time_range] if time_range in slot_strings else []
-        
-        start_str, end_str = time_range.split('-')
-        start_idx = slot_strings.index(start_str) if start_str in slot_strings else -1
-        end_idx = slot_strings.index(end_str) if end_str in slot_strings else -1
-        
-        if start_idx == -1 or end_idx == -1:
-            return []
-        
-        return slot_strings[start_idx:end_idx + 1]
+        return SlotAxis.from_labels(slot_strings).slots_in_range(time_range)
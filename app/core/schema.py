@@ -0,0 +1,150 @@
+"""
+Schema - Skema dtype eksplisit untuk grid jadwal & frame format panjang
+Kolom metadata (POLI, JENIS, HARI, DOKTER) disimpan sebagai category dan
+setiap kolom slot sebagai category dengan kategori tetap '', 'R', 'E'
+sehingga kode kategorinya (0/1/2, -1 = NaN) sama dengan kode ScheduleMatrix.
+Perbandingan seperti df[slot] == 'R' dan .isin(['R', 'E']) tetap berlaku.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+META_CATEGORY_COLUMNS = ['POLI', 'JENIS', 'HARI', 'DOKTER']
+SLOT_VALUES = ['', 'R', 'E']
+SLOT_DTYPE = pd.CategoricalDtype(SLOT_VALUES)
+
+# Frame format panjang: satu baris per (kombinasi, slot) terisi
+LONG_COLUMNS = META_CATEGORY_COLUMNS + ['SLOT', 'KODE']
+
+_SLOT_PATTERN = re.compile(r"^\d{2}:\d{2}$")
+
+
+def slot_columns(df: pd.DataFrame, slot_strings: Optional[List[str]] = None) -> List[str]:
+    """Kolom slot "HH:MM" yang ada di df (urut sesuai slot_strings jika diberikan)"""
+    if slot_strings is None:
+        return [c for c in df.columns if _SLOT_PATTERN.match(str(c))]
+    return [s for s in slot_strings if s in df.columns]
+
+
+def slot_categorical(codes: np.ndarray) -> pd.Categorical:
+    """Kolom slot dari kode int8 ScheduleMatrix (kode invalid -1 → '')"""
+    codes = np.asarray(codes, dtype=np.int8)
+    return pd.Categorical.from_codes(np.where(codes < 0, 0, codes), dtype=SLOT_DTYPE)
+
+
+def is_schema_slot(series: pd.Series) -> bool:
+    """True jika kolom slot sudah memakai SLOT_DTYPE (kode = kode matriks)"""
+    dtype = series.dtype
+    return (isinstance(dtype, pd.CategoricalDtype) and
+            list(dtype.categories[:len(SLOT_VALUES)]) == SLOT_VALUES)
+
+
+def apply_grid_schema(grid_df: pd.DataFrame, slot_strings: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Terapkan skema dtype ke grid (format output Scheduler)
+
+    Nilai slot di luar '', 'R', 'E' (mis. hasil edit manual) ditambahkan
+    sebagai kategori ekstra agar tidak hilang.
+
+    Args:
+        grid_df: DataFrame grid (object atau sudah ber-skema)
+        slot_strings: List slot waktu; jika None, kolom "HH:MM" dideteksi otomatis
+
+    Returns:
+        DataFrame baru dengan metadata category dan slot SLOT_DTYPE
+    """
+    if grid_df is None or grid_df.empty:
+        return grid_df
+
+    columns = {}
+    for col in META_CATEGORY_COLUMNS:
+        if col in grid_df.columns and not isinstance(grid_df[col].dtype, pd.CategoricalDtype):
+            columns[col] = grid_df[col].astype('category')
+
+    for slot in slot_columns(grid_df, slot_strings):
+        series = grid_df[slot]
+        if is_schema_slot(series):
+            continue
+        values = series.to_numpy(dtype=object)
+        extras = pd.unique(values[pd.notna(values)])
+        extras = [v for v in extras if v not in SLOT_VALUES]
+        columns[slot] = pd.Categorical(values, categories=SLOT_VALUES + extras)
+
+    if not columns:
+        return grid_df
+    result = grid_df.copy(deep=False)
+    for col, values in columns.items():
+        result[col] = values
+    return result
+
+
+def to_legacy(grid_df: pd.DataFrame) -> pd.DataFrame:
+    """Grid dengan semua kolom object (format sebelum skema, untuk diedit bebas)"""
+    if grid_df is None or grid_df.empty:
+        return grid_df
+    return grid_df.astype(object)
+
+
+def to_long(grid_df: pd.DataFrame, slot_strings: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Ubah grid ke format panjang ber-skema (sel kosong dilewati)
+
+    Returns:
+        DataFrame kolom POLI, JENIS, HARI, DOKTER (category), SLOT (category
+        urut slot) dan KODE (int8: 1 = R, 2 = E, -1 = nilai lain/NaN)
+    """
+    slots = slot_columns(grid_df, slot_strings)
+    grid_df = apply_grid_schema(grid_df, slots)
+    if grid_df is None or grid_df.empty or not slots:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+
+    codes = np.column_stack([grid_df[s].cat.codes.to_numpy() for s in slots]).astype(np.int16)
+    # Kategori ekstra (kode >= 3) dan NaN (-1) bukan R/E
+    codes = np.where((codes == 1) | (codes == 2) | (codes == 0), codes, -1).astype(np.int8)
+    rows, cols = np.nonzero(codes)
+
+    long_df = pd.DataFrame({
+        col: grid_df[col].iloc[rows].reset_index(drop=True)
+        for col in META_CATEGORY_COLUMNS if col in grid_df.columns
+    })
+    long_df['SLOT'] = pd.Categorical.from_codes(cols, categories=slots)
+    long_df['KODE'] = codes[rows, cols]
+    return long_df
+
+
+def memory_report(grid_df: pd.DataFrame, slot_strings: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Bandingkan memori grid ber-skema dengan grid object (format lama)
+
+    Returns:
+        DataFrame kolom BAGIAN (Metadata, JAM, Slot, Total), LAMA (byte),
+        SKEMA (byte) dan HEMAT (%)
+    """
+    slots = slot_columns(grid_df, slot_strings)
+    schema_df = apply_grid_schema(grid_df, slots)
+    legacy_df = to_legacy(grid_df)
+
+    parts = {
+        'Metadata': [c for c in META_CATEGORY_COLUMNS if c in grid_df.columns],
+        'JAM': [c for c in ['JAM'] if c in grid_df.columns],
+        'Slot': slots
+    }
+    rows = []
+    for name, cols in parts.items():
+        legacy = int(legacy_df[cols].memory_usage(index=False, deep=True).sum()) if cols else 0
+        schema = int(schema_df[cols].memory_usage(index=False, deep=True).sum()) if cols else 0
+        rows.append({'BAGIAN': name, 'LAMA': legacy, 'SKEMA': schema})
+
+    total_legacy = int(legacy_df.memory_usage(deep=True).sum())
+    total_schema = int(schema_df.memory_usage(deep=True).sum())
+    rows.append({'BAGIAN': 'Total', 'LAMA': total_legacy, 'SKEMA': total_schema})
+
+    report = pd.DataFrame(rows)
+    report['HEMAT'] = np.where(
+        report['LAMA'] > 0,
+        (1 - report['SKEMA'] / report['LAMA'].where(report['LAMA'] > 0, 1)) * 100,
+        0.0
+    ).round(1)
+    return report
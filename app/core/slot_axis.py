@@ -0,0 +1,200 @@
+"""
+SlotAxis - Sumbu slot waktu tunggal (immutable) untuk scheduler, writer & UI
+Menyimpan label "HH:MM", menit sejak 00:00 dan dict label → indeks sehingga
+lookup slot O(1) dan pemetaan rentang menit ke slot O(log n) lewat bisect.
+"""
+
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class SlotAxis:
+    __slots__ = ('labels', 'minutes', 'index', 'start', 'end', 'interval', '_minute_list')
+
+    def __init__(self, labels: Iterable[str], start: Optional[int] = None,
+                 end: Optional[int] = None, interval: Optional[int] = None):
+        """
+        Inisialisasi SlotAxis (pakai from_config / from_labels agar ter-cache)
+
+        Args:
+            labels: Label slot "HH:MM" berurutan naik
+            start: Menit awal sumbu (default: slot pertama)
+            end: Menit akhir sumbu, eksklusif (default: slot terakhir + interval)
+            interval: Durasi slot dalam menit (default: selisih dua slot pertama)
+        """
+        labels = tuple(labels)
+        minute_list = tuple(int(s[:2]) * 60 + int(s[3:5]) for s in labels)
+        minutes = np.array(minute_list, dtype=np.int64)
+        minutes.flags.writeable = False
+
+        if interval is None:
+            interval = minute_list[1] - minute_list[0] if len(minute_list) > 1 else 0
+        if start is None:
+            start = minute_list[0] if minute_list else 0
+        if end is None:
+            end = minute_list[-1] + interval if minute_list else start
+
+        object.__setattr__(self, 'labels', labels)
+        object.__setattr__(self, 'minutes', minutes)
+        object.__setattr__(self, '_minute_list', minute_list)
+        object.__setattr__(self, 'index', {label: i for i, label in enumerate(labels)})
+        object.__setattr__(self, 'start', start)
+        object.__setattr__(self, 'end', end)
+        object.__setattr__(self, 'interval', interval)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SlotAxis bersifat immutable")
+
+    # ======================================================
+    # PEMBUATAN (TER-CACHE)
+    # ======================================================
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def generate(start: int, interval: int, end: int) -> "SlotAxis":
+        """
+        Sumbu slot dari menit awal sampai sebelum menit akhir
+
+        Args:
+            start: Menit awal (contoh 7*60+30)
+            interval: Durasi slot dalam menit
+            end: Menit akhir, eksklusif (contoh 14*60+30)
+        """
+        step = max(int(interval), 1)
+        labels = [f"{m // 60:02d}:{m % 60:02d}" for m in range(int(start), int(end), step)]
+        return SlotAxis(labels, start=int(start), end=int(end), interval=int(interval))
+
+    @classmethod
+    def from_config(cls, config) -> "SlotAxis":
+        """Sumbu slot sesuai Config (jam mulai, interval, jam selesai)"""
+        end_hour = getattr(config, 'end_hour', 14)
+        end_minute = getattr(config, 'end_minute', 30)
+        return cls.generate(
+            config.start_hour * 60 + config.start_minute,
+            config.interval_minutes,
+            end_hour * 60 + end_minute
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _from_tuple(labels: Tuple[str, ...]) -> "SlotAxis":
+        return SlotAxis(labels)
+
+    @classmethod
+    def from_labels(cls, slot_strings) -> "SlotAxis":
+        """Sumbu slot dari list label yang sudah ada (mis. slot_strings di session)"""
+        if isinstance(slot_strings, SlotAxis):
+            return slot_strings
+        return cls._from_tuple(tuple(slot_strings))
+
+    # ======================================================
+    # AKSES DASAR
+    # ======================================================
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __getitem__(self, i):
+        return self.labels[i]
+
+    def __contains__(self, label) -> bool:
+        return label in self.index
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SlotAxis):
+            return self.labels == other.labels
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.labels)
+
+    def __repr__(self) -> str:
+        first = self.labels[0] if self.labels else '-'
+        return f"SlotAxis({first}..{self.end_label}, {len(self)} slot)"
+
+    def to_list(self) -> List[str]:
+        """Label slot sebagai list (format slot_strings lama)"""
+        return list(self.labels)
+
+    @property
+    def end_label(self) -> str:
+        """Jam selesai sumbu dalam format "HH:MM" """
+        return f"{self.end // 60:02d}:{self.end % 60:02d}"
+
+    def position(self, label) -> int:
+        """Indeks slot untuk label, -1 jika tidak ada (O(1))"""
+        return self.index.get(label, -1)
+
+    def minute_of(self, label) -> int:
+        """Menit sejak 00:00 untuk label slot, -1 jika tidak ada"""
+        i = self.index.get(label, -1)
+        return self._minute_list[i] if i >= 0 else -1
+
+    # ======================================================
+    # PEMETAAN RENTANG
+    # ======================================================
+
+    def span(self, start_minute: int, end_minute: int) -> Tuple[int, int]:
+        """
+        Rentang indeks slot [lo, hi) yang mulai di dalam [start_minute, end_minute)
+
+        Returns:
+            Tuple (lo, hi); kosong jika lo >= hi
+        """
+        lo = bisect_left(self._minute_list, start_minute)
+        hi = bisect_left(self._minute_list, end_minute)
+        return lo, max(lo, hi)
+
+    def slots_between(self, start_minute: int, end_minute: int) -> List[str]:
+        """Label slot yang mulai di dalam [start_minute, end_minute)"""
+        lo, hi = self.span(start_minute, end_minute)
+        return list(self.labels[lo:hi])
+
+    def slots_in_range(self, time_range: str) -> List[str]:
+        """
+        Semua slot dalam teks range "HH:MM-HH:MM" (inklusif kedua ujung) atau
+        satu label "HH:MM"; kosong jika ada ujung yang bukan slot
+        """
+        if '-' not in time_range:
+            return [time_range] if time_range in self.index else []
+
+        start_str, end_str = time_range.split('-')
+        start_idx = self.index.get(start_str, -1)
+        end_idx = self.index.get(end_str, -1)
+        if start_idx == -1 or end_idx == -1:
+            return []
+        return list(self.labels[start_idx:end_idx + 1])
+
+    def runs(self, slots) -> List[Tuple[int, int]]:
+        """
+        Kelompokkan slot menjadi run berurutan (slot asing diabaikan,
+        duplikat digabung)
+
+        Returns:
+            List tuple (indeks awal, indeks akhir) inklusif, urut naik
+        """
+        positions = sorted({self.index[s] for s in slots if s in self.index})
+        if not positions:
+            return []
+
+        result = []
+        run_start = prev = positions[0]
+        for pos in positions[1:]:
+            if pos != prev + 1:
+                result.append((run_start, prev))
+                run_start = pos
+            prev = pos
+        result.append((run_start, prev))
+        return result
+
+    def format_run(self, start_idx: int, end_idx: int, collapse_single: bool = True) -> str:
+        """Teks run: "HH:MM" untuk satu slot (jika collapse_single) atau "HH:MM-HH:MM" """
+        if collapse_single and start_idx == end_idx:
+            return self.labels[start_idx]
+        return f"{self.labels[start_idx]}-{self.labels[end_idx]}"
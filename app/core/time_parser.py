@@ -1,12 +1,27 @@
 import re
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
-from datetime import time, datetime
+from datetime import time
+
+from app.core.slot_axis import SlotAxis
 
 class TimeParser:
-    def __init__(self, start_hour=7, start_minute=30, interval_minutes=30):
+    # Memo hasil parse per string unik (LRU terbatas). Disimpan di level
+    # class agar bertahan antar run, karena TimeParser dibuat ulang setiap
+    # rerun Streamlit.
+    MEMO_MAXSIZE = 4096
+    _memo = OrderedDict()
+    _memo_lock = threading.Lock()
+    _stats = {'calls': 0, 'values': 0, 'unique': 0, 'hits': 0, 'parsed': 0}
+
+    def __init__(self, start_hour=7, start_minute=30, interval_minutes=30, end_hour=14, end_minute=30):
         self.start_hour = start_hour
         self.start_minute = start_minute
         self.interval_minutes = interval_minutes
+        self.end_hour = end_hour
+        self.end_minute = end_minute
     
     @staticmethod
     def parse(time_str):
@@ -14,50 +29,168 @@ class TimeParser:
         if pd.isna(time_str) or str(time_str).strip() == "":
             return None, None
 
-        s = str(time_str).strip().replace(" ", "").replace(".", ":")
-
-        m = re.search(r"(\d{1,2}:\d{2})-(\d{1,2}:\d{2})", s)
-        if not m:
+        start, end = TimeParser._lookup(str(time_str))
+        if start < 0:
             return None, None
+        return time(start // 60, start % 60), time(end // 60, end % 60)
+
+    @classmethod
+    def _lookup(cls, text):
+        """Parse satu string lewat memo (dipakai parse())"""
+        with cls._memo_lock:
+            hit = cls._memo.get(text)
+            if hit is not None:
+                cls._memo.move_to_end(text)
+                cls._stats['calls'] += 1
+                cls._stats['values'] += 1
+                cls._stats['unique'] += 1
+                cls._stats['hits'] += 1
+                return hit
+
+        start, end = cls.parse_minutes([text])
+        return int(start[0]), int(end[0])
+
+    @classmethod
+    def parse_minutes(cls, time_strs):
+        """
+        Versi vektor dari parse(): ubah banyak string waktu sekaligus ke menit
+
+        Nilai di-factorize dulu sehingga setiap string unik hanya di-parse
+        sekali; string yang pernah di-parse diambil dari memo LRU.
+
+        Args:
+            time_strs: Series/array string waktu (contoh: "07.30-10.00")
+
+        Returns:
+            Tuple (start_minutes, end_minutes) berupa numpy array int64.
+            Nilai -1 berarti string tidak bisa di-parse (sama seperti parse()
+            yang mengembalikan None, None).
+        """
+        s = pd.Series(time_strs, dtype=object)
+        n = len(s)
+        start = np.full(n, -1, dtype=np.int64)
+        end = np.full(n, -1, dtype=np.int64)
+
+        if n == 0:
+            return start, end
+
+        # 1. Factorize: NaN/None → -1, nilai lain → indeks string unik
+        codes, uniques = pd.factorize(s.to_numpy(dtype=object), use_na_sentinel=True)
+        keys = np.asarray(uniques, dtype=object).astype(str)
+        u_start = np.full(len(keys), -1, dtype=np.int64)
+        u_end = np.full(len(keys), -1, dtype=np.int64)
+
+        # 2. Ambil yang sudah ada di memo
+        missing = []
+        with cls._memo_lock:
+            memo = cls._memo
+            for i, key in enumerate(keys.tolist()):
+                hit = memo.get(key)
+                if hit is None:
+                    missing.append(i)
+                else:
+                    memo.move_to_end(key)
+                    u_start[i], u_end[i] = hit
+
+        # 3. Parse sisanya sekali (vektor) lalu simpan ke memo
+        if missing:
+            missing = np.array(missing, dtype=np.int64)
+            parsed_start, parsed_end = cls._parse_unique(keys[missing])
+            u_start[missing] = parsed_start
+            u_end[missing] = parsed_end
+
+            with cls._memo_lock:
+                memo = cls._memo
+                for key, a, b in zip(keys[missing].tolist(), parsed_start.tolist(), parsed_end.tolist()):
+                    memo[key] = (a, b)
+                while len(memo) > cls.MEMO_MAXSIZE:
+                    memo.popitem(last=False)
+
+        with cls._memo_lock:
+            cls._stats['calls'] += 1
+            cls._stats['values'] += n
+            cls._stats['unique'] += len(keys)
+            cls._stats['hits'] += len(keys) - len(missing)
+            cls._stats['parsed'] += len(missing)
+
+        # 4. Broadcast hasil per string unik kembali ke setiap nilai
+        valid = codes >= 0
+        start[valid] = u_start[codes[valid]]
+        end[valid] = u_end[codes[valid]]
+
+        return start, end
+
+    @staticmethod
+    def _parse_unique(texts):
+        """Parse array string (tanpa memo) ke menit mulai/selesai, -1 jika gagal"""
+        n = len(texts)
+        start = np.full(n, -1, dtype=np.int64)
+        end = np.full(n, -1, dtype=np.int64)
+
+        text = pd.Series(np.asarray(texts, dtype=object))
+        text = text.str.strip().str.replace(" ", "", regex=False).str.replace(".", ":", regex=False)
+        parts = text.str.extract(r"(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})")
+
+        matched = parts.notna().all(axis=1).to_numpy()
+        if not matched.any():
+            return start, end
+
+        nums = parts[matched].astype(np.int64).to_numpy()
+        sh, sm, eh, em = nums[:, 0], nums[:, 1], nums[:, 2], nums[:, 3]
+
+        # datetime.time() menolak jam > 23 atau menit > 59
+        valid = (sh <= 23) & (sm <= 59) & (eh <= 23) & (em <= 59)
+        idx = np.flatnonzero(matched)[valid]
+        start[idx] = sh[valid] * 60 + sm[valid]
+        end[idx] = eh[valid] * 60 + em[valid]
+
+        return start, end
+
+    @classmethod
+    def cache_stats(cls):
+        """
+        Statistik memo parse untuk tuning
+
+        Returns:
+            Dictionary: calls, values (jumlah sel), unique (string unik per
+            panggilan), hits, parsed, hit_rate (hits / unique), dedup_rate
+            (1 - unique / values), memo_size, memo_maxsize
+        """
+        with cls._memo_lock:
+            stats = dict(cls._stats)
+            stats['memo_size'] = len(cls._memo)
+        stats['memo_maxsize'] = cls.MEMO_MAXSIZE
+        stats['hit_rate'] = stats['hits'] / stats['unique'] if stats['unique'] else 0.0
+        stats['dedup_rate'] = 1 - stats['unique'] / stats['values'] if stats['values'] else 0.0
+        return stats
+
+    @classmethod
+    def clear_cache(cls):
+        """Kosongkan memo parse dan reset statistik"""
+        with cls._memo_lock:
+            cls._memo.clear()
+            for key in cls._stats:
+                cls._stats[key] = 0
 
-        try:
-            sh, sm = map(int, m.group(1).split(":"))
-            eh, em = map(int, m.group(2).split(":"))
-            return time(sh, sm), time(eh, em)
-        except:
-            return None, None
-    
     def parse_time_range(self, time_range_str, slot_strings):
         """
         Parse string waktu ke list slot berdasarkan konfigurasi
         """
-        start_time, end_time = self.parse(time_range_str)
-        if not start_time or not end_time:
+        if pd.isna(time_range_str) or str(time_range_str).strip() == "":
+            return []
+
+        start, end = self._lookup(str(time_range_str))
+        if start < 0:
             return []
         
-        result_slots = []
-        for slot in slot_strings:
-            slot_time = datetime.strptime(slot, "%H:%M").time()
-            if start_time <= slot_time < end_time:
-                result_slots.append(slot)
-        
-        return result_slots
+        return SlotAxis.from_labels(slot_strings).slots_between(start, end)
     
     def generate_slot_strings(self):
         """
-        Generate list slot berdasarkan konfigurasi start time dan interval
+        Generate list slot berdasarkan konfigurasi start time, interval dan end time
         """
-        slot_strings = []
-        current_time = self.start_hour * 60 + self.start_minute
-        
-        # Generate sampai jam 14:30
-        end_time = 14 * 60 + 30
-        
-        while current_time < end_time:
-            hours = current_time // 60
-            minutes = current_time % 60
-            time_str = f"{hours:02d}:{minutes:02d}"
-            slot_strings.append(time_str)
-            current_time += self.interval_minutes
-        
-        return slot_strings
+        return SlotAxis.generate(
+            self.start_hour * 60 + self.start_minute,
+            self.interval_minutes,
+            self.end_hour * 60 + self.end_minute
+        ).to_list()
@@ -2,6 +2,9 @@ import pandas as pd
 import re
 from io import BytesIO
 
+from app.core.cleaner import DataCleaner
+from app.core.workbook_session import WorkbookSession
+
 
 class Validator:
 
@@ -12,12 +15,15 @@ class Validator:
     VALID_DAYS = ["Senin", "Selasa", "Rabu", "Kamis", "Jum'at", "Jumat", "Sabtu"]
 
     @staticmethod
-    def validate_excel_file(file):
+    def validate_excel_file(file, sheet_pattern=None):
         """
         Validasi file excel upload user dengan format sheet Reguler dan Poleks.
         
         Args:
-            file: Uploaded file dari Streamlit
+            file: Uploaded file dari Streamlit (BytesIO) atau WorkbookSession
+                  (sheet yang sudah di-parse dipakai ulang oleh DataCleaner)
+            sheet_pattern: Regex nama sheet jadwal (Config.schedule_sheet_pattern);
+                           None = sheet Reguler & Poleks wajib ada
             
         Returns:
             (is_valid: bool, message: str)
@@ -26,30 +32,30 @@ class Validator:
             if file is None:
                 return False, "Tidak ada file yang diupload"
 
-            # Streamlit uploader menghasilkan BytesIO → reset posisi
-            file.seek(0)
+            workbook = WorkbookSession.from_file(file)
+
+            # Cek cepat: workbook.xml + header & baris data pertama tiap sheet
+            result = Validator._validate_headers(workbook, sheet_pattern)
+            if result is not None:
+                return result
 
             # Baca sheet names untuk validasi
             try:
-                excel_file = pd.ExcelFile(file)
-                sheet_names = excel_file.sheet_names
+                sheet_names = workbook.sheet_names
                 
                 # Cek sheet required
-                required_sheets = ["Reguler", "Poleks"]
-                missing_sheets = [s for s in required_sheets if s not in sheet_names]
-                
-                if missing_sheets:
-                    available_sheets = ", ".join(sheet_names)
-                    return False, f"Sheet wajib tidak ditemukan: {missing_sheets}. Sheet yang ada: {available_sheets}"
+                required_sheets, error = Validator._required_sheets(sheet_names, sheet_pattern)
+                if error:
+                    return False, error
                 
                 # Validasi setiap sheet
                 for sheet_name in required_sheets:
-                    df = pd.read_excel(excel_file, sheet_name=sheet_name)
+                    df = workbook.sheet(sheet_name)
                     
-                    # Validasi kolom required
-                    df.columns = [str(c).strip() for c in df.columns]
+                    # Validasi kolom required (frame sesi tidak diubah)
+                    columns = [str(c).strip() for c in df.columns]
                     missing = [c for c in Validator.REQUIRED_COLS_UPLOAD 
-                              if c not in df.columns]
+                              if c not in columns]
                     
                     if missing:
                         return False, f"Sheet '{sheet_name}': Kolom wajib tidak ditemukan: {missing}"
@@ -60,27 +66,95 @@ class Validator:
                         
             except Exception as e:
                 # Fallback: coba baca sebagai single sheet
-                file.seek(0)
-                df = pd.read_excel(file)
+                df = workbook.sheet(0)
                 
                 # Validasi kolom untuk single sheet
-                df.columns = [str(c).strip() for c in df.columns]
+                columns = [str(c).strip() for c in df.columns]
                 missing = [c for c in Validator.REQUIRED_COLS_UPLOAD 
-                          if c not in df.columns]
+                          if c not in columns]
                 
                 if missing:
                     return False, f"Kolom wajib tidak ditemukan: {missing}. Format file tidak sesuai."
                 
                 # Cek kolom hari
-                hari_cols = [col for col in df.columns if col in Validator.VALID_DAYS]
+                hari_cols = [col for col in columns if col in Validator.VALID_DAYS]
                 if not hari_cols:
-                    return False, f"Tidak ditemukan kolom hari. Kolom yang ada: {list(df.columns)}"
+                    return False, f"Tidak ditemukan kolom hari. Kolom yang ada: {columns}"
 
             return True, "File valid"
 
         except Exception as e:
             return False, f"Gagal membaca file: {str(e)}"
 
+    @staticmethod
+    def _required_sheets(sheet_names, sheet_pattern=None):
+        """
+        Sheet jadwal yang wajib divalidasi
+        
+        Args:
+            sheet_names: Nama sheet di workbook
+            sheet_pattern: Regex nama sheet jadwal, None = Reguler & Poleks
+            
+        Returns:
+            (list nama sheet, pesan error atau None)
+        """
+        available_sheets = ", ".join(sheet_names)
+        if not sheet_pattern:
+            required_sheets = ["Reguler", "Poleks"]
+            missing_sheets = [s for s in required_sheets if s not in sheet_names]
+            if missing_sheets:
+                return [], f"Sheet wajib tidak ditemukan: {missing_sheets}. Sheet yang ada: {available_sheets}"
+            return required_sheets, None
+        
+        try:
+            required_sheets = [sheet for sheet, _ in DataCleaner.schedule_sheets(sheet_names, sheet_pattern)]
+        except ValueError as e:
+            return [], str(e)
+        if not required_sheets:
+            return [], f"Tidak ada sheet yang cocok dengan pola '{sheet_pattern}'. Sheet yang ada: {available_sheets}"
+        return required_sheets, None
+
+    @staticmethod
+    def _validate_headers(workbook, sheet_pattern=None):
+        """
+        Validasi sheet, kolom wajib & sheet kosong dari header dan baris data
+        pertama saja (waktu tidak bergantung pada panjang sheet)
+        
+        Args:
+            workbook: WorkbookSession
+            sheet_pattern: Regex nama sheet jadwal, None = Reguler & Poleks
+            
+        Returns:
+            (is_valid, message) sama dengan validasi penuh, atau None jika
+            file tidak bisa dicek cepat (mis. bukan xlsx) → validasi penuh
+        """
+        try:
+            sheet_names = workbook.sheet_names
+            required_sheets, error = Validator._required_sheets(sheet_names, sheet_pattern)
+            
+            if error:
+                return False, error
+            
+            for sheet_name in required_sheets:
+                header, has_data = workbook.sheet_head(sheet_name)
+                
+                # Header kosong jadi "Unnamed: n" di pandas (tidak pernah cocok)
+                columns = [str(c).strip() for c in header if c is not None]
+                missing = [c for c in Validator.REQUIRED_COLS_UPLOAD 
+                          if c not in columns]
+                
+                if missing:
+                    return False, f"Sheet '{sheet_name}': Kolom wajib tidak ditemukan: {missing}"
+                
+                if not has_data:
+                    return False, f"Sheet '{sheet_name}' kosong"
+            
+            return True, "File valid"
+        
+        except Exception as e:
+            print(f"⚠️ Fast header validation unavailable, reading full sheets: {e}")
+            return None
+
     @staticmethod
     def validate_time_format(time_str):
         """
@@ -0,0 +1,433 @@
+"""
+WorkbookSession - File Excel upload yang di-parse sekali per isi file
+Preview upload, Validator dan DataCleaner membaca sheet dari objek yang sama
+(dikunci hash isi file), sehingga satu upload cukup di-parse sekali walau
+Streamlit menjalankan ulang script berkali-kali.
+
+Frame sheet dipakai bersama: pemakai tidak boleh mengubahnya in-place
+(buat frame baru, mis. lewat assign / kolom lokal).
+
+File xlsx besar dibaca streaming (openpyxl read-only): hanya kolom yang
+diminta, langsung sebagai teks, per blok baris (lihat iter_text_chunks).
+Teks per sel mengikuti nilai selnya; kolom yang oleh pd.read_excel dibaca
+sebagai angka / tanggal (mis. angka dengan sel kosong → '101.0') dikoreksi
+setelah sheet selesai dibaca (lihat text_fixes).
+"""
+
+import datetime
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+
+from app.core.xlsx_merge import sheet_head, sheet_names
+
+
+class WorkbookSession:
+    # Jumlah file (isi berbeda) yang disimpan di memo (LRU)
+    MEMO_MAXSIZE = 4
+    _memo = OrderedDict()
+    _memo_lock = threading.Lock()
+
+    # Teks sel yang dibaca pd.read_excel sebagai NaN (na_values bawaan pandas)
+    NA_STRINGS = frozenset([
+        "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+        "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+        "n/a", "nan", "null",
+    ])
+
+    def __init__(self, data: bytes, key: str = None):
+        """
+        Inisialisasi WorkbookSession (file belum dibuka sampai dibutuhkan)
+
+        Args:
+            data: Isi file Excel
+            key: Hash isi file (dihitung jika None)
+        """
+        self.data = bytes(data)
+        self.key = key or self.content_key(self.data)
+        self._excel = None
+        self._names = None
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._heads: Dict[str, Tuple[list, bool]] = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    # ======================================================
+    # MEMO PER ISI FILE
+    # ======================================================
+
+    @staticmethod
+    def content_key(data: bytes) -> str:
+        """Hash sha256 isi file"""
+        return hashlib.sha256(data).hexdigest()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WorkbookSession":
+        """
+        Sesi untuk isi file ini (objek yang sama untuk isi yang sama)
+
+        Args:
+            data: Isi file Excel
+
+        Returns:
+            WorkbookSession
+        """
+        key = cls.content_key(data)
+        with cls._memo_lock:
+            session = cls._memo.get(key)
+            if session is not None:
+                cls._memo.move_to_end(key)
+                return session
+            session = cls(data, key)
+            cls._memo[key] = session
+            while len(cls._memo) > cls.MEMO_MAXSIZE:
+                cls._memo.popitem(last=False)
+        return session
+
+    @classmethod
+    def from_file(cls, file) -> "WorkbookSession":
+        """
+        Sesi dari input file apa pun (WorkbookSession, bytes, file-like, path)
+
+        Args:
+            file: WorkbookSession, bytes, BytesIO / UploadedFile, atau path
+
+        Returns:
+            WorkbookSession
+        """
+        if isinstance(file, WorkbookSession):
+            return file
+        if isinstance(file, (bytes, bytearray)):
+            return cls.from_bytes(bytes(file))
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "rb") as f:
+                return cls.from_bytes(f.read())
+        if hasattr(file, "getvalue"):
+            return cls.from_bytes(file.getvalue())
+        file.seek(0)
+        data = file.read()
+        file.seek(0)
+        return cls.from_bytes(data)
+
+    @classmethod
+    def clear_memo(cls):
+        """Kosongkan memo sesi"""
+        with cls._memo_lock:
+            cls._memo.clear()
+
+    # ======================================================
+    # AKSES SHEET
+    # ======================================================
+
+    @property
+    def is_xlsx(self) -> bool:
+        """True jika file berupa paket xlsx (bisa dibaca streaming)"""
+        return zipfile.is_zipfile(io.BytesIO(self.data))
+
+    def cached(self, key, build: Callable):
+        """
+        Hasil turunan isi file (mis. data hasil DataCleaner) yang dihitung
+        sekali per sesi
+
+        Args:
+            key: Kunci hasil (sertakan pengaturan yang mempengaruhi hasil)
+            build: Fungsi tanpa argumen yang menghitung hasil
+
+        Returns:
+            Hasil build (dipakai bersama, jangan diubah in-place)
+        """
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+        result = build()
+        with self._lock:
+            return self._results.setdefault(key, result)
+
+    def _excel_file(self) -> pd.ExcelFile:
+        """ExcelFile yang dibuka sekali (panggil dengan self._lock)"""
+        if self._excel is None:
+            self._excel = pd.ExcelFile(io.BytesIO(self.data))
+        return self._excel
+
+    @property
+    def sheet_names(self) -> List[str]:
+        """Nama semua sheet (urutan file); xlsx cukup dari workbook.xml"""
+        with self._lock:
+            if self._names is None:
+                try:
+                    self._names = sheet_names(self.data)
+                except Exception:
+                    self._names = list(self._excel_file().sheet_names)
+            return list(self._names)
+
+    def has_sheet(self, name: str) -> bool:
+        return name in self.sheet_names
+
+    def sheet_head(self, name: str) -> Tuple[list, bool]:
+        """
+        Header sheet + ada/tidaknya baris data tanpa mem-parse isi sheet
+        (lihat xlsx_merge.sheet_head; hanya untuk xlsx)
+
+        Args:
+            name: Nama sheet
+
+        Returns:
+            Tuple (nilai header per kolom, True jika ada baris data)
+        """
+        with self._lock:
+            head = self._heads.get(name)
+            if head is None:
+                head = sheet_head(self.data, name)
+                self._heads[name] = head
+            return head
+
+    def sheet(self, name: Union[str, int]) -> pd.DataFrame:
+        """
+        Frame satu sheet (di-parse sekali, lalu dari cache)
+
+        Args:
+            name: Nama sheet atau indeks posisi
+
+        Returns:
+            DataFrame sheet (dipakai bersama, jangan diubah in-place)
+        """
+        with self._lock:
+            excel = self._excel_file()
+            if isinstance(name, int):
+                name = excel.sheet_names[name]
+            frame = self._frames.get(name)
+            if frame is None:
+                print(f"   📖 Parsing sheet '{name}' ({self.key[:8]})")
+                frame = pd.read_excel(excel, sheet_name=name)
+                self._frames[name] = frame
+            return frame
+
+    # ======================================================
+    # BACA STREAMING (XLSX)
+    # ======================================================
+
+    @classmethod
+    def _text(cls, value):
+        """Nilai sel sebagai teks seperti pd.read_excel + astype(str); kosong = NaN"""
+        if value is None:
+            return np.nan
+        if isinstance(value, str):
+            return np.nan if value in cls.NA_STRINGS else value
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value)
+
+    @classmethod
+    def _sample_kind(cls, value) -> str:
+        """Jenis nilai sel yang menentukan dtype kolom di pd.read_excel"""
+        if value is None:
+            return "na"
+        if isinstance(value, str):
+            if value in cls.NA_STRINGS:
+                return "na"
+            try:
+                number = float(value)
+            except ValueError:
+                return "str"
+            return "str_int" if number.is_integer() else "str_float"
+        if isinstance(value, bool):
+            return "bool"
+        if isinstance(value, (int, float)):
+            return "int" if float(value).is_integer() else "float"
+        if isinstance(value, datetime.datetime):
+            return "datetime" if value.time() == datetime.time() else "datetime_time"
+        return "other"
+
+    def iter_text_chunks(self, name: str, columns: List[str], chunk_rows: int,
+                         samples: Optional[Dict[str, dict]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Baris sheet dibaca streaming (openpyxl read-only) per blok, hanya
+        kolom yang diminta, langsung sebagai teks
+
+        Args:
+            name: Nama sheet
+            columns: Nama header (setelah strip) yang dibaca; kolom lain dilewati
+            chunk_rows: Jumlah baris per blok
+            samples: Dict (opsional) yang diisi contoh nilai per jenis sel tiap
+                     kolom {header: {jenis: nilai}} untuk text_fixes; kolom
+                     berhenti dicontoh setelah ada teks bukan angka
+
+        Yields:
+            DataFrame object (sel kosong = NaN) dengan kolom yang ditemukan di
+            header (baris 1), urut seperti di sheet
+        """
+        wanted = set(columns)
+        wb = load_workbook(io.BytesIO(self.data), read_only=True, data_only=True)
+        try:
+            rows = wb[name].iter_rows(values_only=True)
+            positions = {}
+            for i, value in enumerate(next(rows, ())):
+                key = str(value).strip() if value is not None else None
+                if key in wanted and key not in positions:
+                    positions[key] = i
+            selected = list(positions.items())
+            pending = []
+            if samples is not None:
+                for key, _ in selected:
+                    samples[key] = {}
+                pending = selected
+
+            buffers = {key: [] for key, _ in selected}
+            count = 0
+            for row in rows:
+                width = len(row)
+                for key, i in selected:
+                    buffers[key].append(self._text(row[i]) if i < width else np.nan)
+                if pending:
+                    pending = self._sample_row(row, width, pending, samples)
+                count += 1
+                if count == chunk_rows:
+                    yield pd.DataFrame(buffers, index=pd.RangeIndex(count), dtype=object)
+                    buffers = {key: [] for key, _ in selected}
+                    count = 0
+            if count:
+                yield pd.DataFrame(buffers, index=pd.RangeIndex(count), dtype=object)
+        finally:
+            wb.close()
+
+    @classmethod
+    def _sample_row(cls, row, width, pending, samples):
+        """Catat contoh nilai pertama per jenis; kembalikan kolom yang masih dicontoh"""
+        still = []
+        for key, i in pending:
+            value = row[i] if i < width else None
+            kind = cls._sample_kind(value)
+            found = samples[key]
+            if kind not in found:
+                found[kind] = None if kind == "na" else value
+            if kind not in ("str", "other"):
+                still.append((key, i))
+        return still
+
+    @staticmethod
+    def text_fixes(sheet_samples: List[Tuple[Dict[str, dict], dict]]) -> List[Dict[str, str]]:
+        """
+        Koreksi teks kolom agar sama dengan pd.read_excel per sheet → pd.concat
+        → astype(str): dtype tiap kolom ditentukan pandas (TextParser) dari
+        contoh nilai iter_text_chunks, lalu digabung seperti pd.concat
+
+        Args:
+            sheet_samples: List per sheet (urutan gabung) berisi tuple
+                           (samples dari iter_text_chunks, kolom konstanta
+                           yang ditambahkan ke sheet, mis. {'Jenis Poli': 'Reguler'})
+
+        Returns:
+            List per sheet {header: "float" | "int" | "date"} untuk apply_text_fix
+        """
+        frames = []
+        for samples, constants in sheet_samples:
+            names = list(samples)
+            values = [list(found.values()) for found in samples.values()]
+            length = max([len(v) for v in values] + [0])
+            # Nilai diulang (bukan dikosongkan) agar tidak mengubah dtype hasil
+            columns = [v + [v[0]] * (length - len(v)) if v else [None] * length for v in values]
+            data = [names] + [["" if c[r] is None else c[r] for c in columns] for r in range(length)]
+            frame = TextParser(data, header=0, skip_blank_lines=False).read() if names else pd.DataFrame()
+            frames.append(frame.assign(**constants))
+
+        combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        fixes = []
+        for frame in frames:
+            fix = {}
+            for name in frame.columns:
+                if name not in combined.columns:
+                    continue
+                target = combined[name]
+                kind = target.dtype.kind
+                if kind == "O" or isinstance(target.dtype, pd.StringDtype):
+                    # Kolom object hasil gabung menyimpan nilai dtype sheet asal
+                    kind = frame[name].dtype.kind
+                    if kind == "M":
+                        continue
+                if kind == "f":
+                    fix[name] = "float"
+                elif kind in "iu":
+                    fix[name] = "int"
+                elif kind == "M":
+                    dates = target.dropna()
+                    if (dates == dates.dt.normalize()).all():
+                        fix[name] = "date"
+            fixes.append(fix)
+        return fixes
+
+    @staticmethod
+    def apply_text_fix(series: pd.Series, kind: str) -> pd.Series:
+        """
+        Teks sel (hasil _text, sudah di-strip) sebagai teks kolom dtype pandas
+
+        Args:
+            series: Kolom teks
+            kind: "float", "int" atau "date" (lihat text_fixes)
+
+        Returns:
+            Kolom teks baru dengan dtype yang sama
+        """
+        def fixed(text):
+            if kind == "date":
+                return text[:10]
+            if text in ("True", "False"):
+                number = int(text == "True")
+            elif kind == "int" and text.lstrip("-").isdigit():
+                number = int(text)
+            else:
+                try:
+                    number = float(text)
+                except ValueError:
+                    return text
+            return str(float(number)) if kind == "float" else str(int(number))
+
+        mapping = {text: fixed(text) for text in series.dropna().unique()}
+        return series.map(mapping).astype(series.dtype)
+
+    def preview(self, name: str, rows: int = 3) -> Tuple[pd.DataFrame, Optional[int]]:
+        """
+        Beberapa baris pertama sheet tanpa membaca seluruh sheet
+
+        Args:
+            name: Nama sheet
+            rows: Jumlah baris data
+
+        Returns:
+            Tuple (DataFrame baris pertama, perkiraan jumlah baris data dari
+            dimensi sheet atau None jika tidak diketahui)
+        """
+        if not self.is_xlsx:
+            frame = self.sheet(name)
+            return frame.head(rows), len(frame)
+
+        wb = load_workbook(io.BytesIO(self.data), read_only=True, data_only=True)
+        try:
+            ws = wb[name]
+            values = ws.iter_rows(values_only=True)
+            header = list(next(values, ()))
+            data = [list(row) for _, row in zip(range(rows), values)]
+            total = ws.max_row - 1 if ws.max_row else None
+        finally:
+            wb.close()
+
+        width = max([len(header)] + [len(row) for row in data])
+        names, seen = [], {}
+        for i, value in enumerate(header + [None] * (width - len(header))):
+            label = f"Unnamed: {i}" if value is None else str(value)
+            if label in seen:
+                seen[label] += 1
+                label = f"{label}.{seen[label]}"
+            else:
+                seen[label] = 0
+            names.append(label)
+        data = [row + [None] * (width - len(row)) for row in data]
+        return pd.DataFrame(data, columns=names), total
@@ -0,0 +1,609 @@
+"""
+XlsxMerge - Gabungkan sheet hasil ExcelWriter dengan sheet asli di level
+paket xlsx (zip/XML). Paket file sumber menjadi dasar: part sheet asli
+(beserta drawing/rels-nya) disalin byte demi byte tanpa di-parse openpyxl,
+sedangkan sheet hasil dipindahkan ke paket tersebut dengan indeks style,
+shared string dan dxf yang dipetakan ulang ke styles.xml & sharedStrings.
+"""
+
+import io
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr, unescape
+
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+SST_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+
+_ATTR = re.compile(r'([\w:]+)="([^"]*)"')
+
+
+# ======================================================
+# UTILITAS PAKET
+# ======================================================
+
+def _rels_path(part: str) -> str:
+    """Path part .rels milik sebuah part"""
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+def _resolve(source_part: str, target: str) -> str:
+    """Path absolut (tanpa '/') dari Target relationship"""
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def _attrs(tag: str) -> Dict[str, str]:
+    return {k: unescape(v, {"&quot;": '"', "&apos;": "'"}) for k, v in _ATTR.findall(tag)}
+
+
+def _set_attr(tag: str, name: str, value) -> str:
+    """Ganti (atau tambahkan) atribut di string start tag"""
+    pattern = re.compile(r'(\s%s=")[^"]*(")' % re.escape(name))
+    if pattern.search(tag):
+        return pattern.sub(lambda m: f'{m.group(1)}{value}{m.group(2)}', tag, count=1)
+    end = -2 if tag.endswith("/>") else -1
+    return f'{tag[:end]} {name}="{value}"{tag[end:]}'
+
+
+def _read_rels(zf: zipfile.ZipFile, part: str) -> List[Dict[str, str]]:
+    path = _rels_path(part)
+    if path not in zf.namelist():
+        return []
+    root = ET.fromstring(zf.read(path))
+    return [dict(rel.attrib) for rel in root.findall(f"{{{REL_NS}}}Relationship")]
+
+
+def _content_types(zf: zipfile.ZipFile) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """(defaults per ekstensi, overrides per part) dari [Content_Types].xml"""
+    root = ET.fromstring(zf.read("[Content_Types].xml"))
+    defaults = {d.get("Extension", "").lower(): d.get("ContentType") for d in root.findall(f"{{{CT_NS}}}Default")}
+    overrides = {o.get("PartName", "").lstrip("/"): o.get("ContentType") for o in root.findall(f"{{{CT_NS}}}Override")}
+    return defaults, overrides
+
+
+def _workbook_part(zf: zipfile.ZipFile) -> str:
+    for rel in _read_rels(zf, ""):
+        if rel.get("Type", "").endswith("/officeDocument"):
+            return _resolve("", rel["Target"])
+    return "xl/workbook.xml"
+
+
+_SHEETS_BLOCK = re.compile(r'(<(?:\w+:)?sheets\b[^>]*>)(.*?)(</(?:\w+:)?sheets>)', re.S)
+_SHEET_ELEMENT = re.compile(r'<(?:\w+:)?sheet\s[^>]*?/>')
+
+
+def _workbook_sheets(workbook_xml: str) -> List[Dict[str, str]]:
+    """Daftar sheet (urut) dari workbook.xml: name, sheetId, rid, element"""
+    block = _SHEETS_BLOCK.search(workbook_xml)
+    sheets = []
+    for element in _SHEET_ELEMENT.findall(block.group(2) if block else ""):
+        attrs = _attrs(element)
+        rid = next((v for k, v in attrs.items() if k.endswith(":id")), None)
+        sheets.append({"name": attrs.get("name"), "sheetId": attrs.get("sheetId"),
+                       "rid": rid, "element": element})
+    return sheets
+
+
+def sheet_names(data) -> List[str]:
+    """
+    Nama sheet workbook xlsx tanpa memuat isi sheet (hanya workbook.xml)
+
+    Args:
+        data: bytes atau file-like berisi file xlsx
+    """
+    if hasattr(data, "read"):
+        data.seek(0)
+        data = data.read()
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        workbook_xml = zf.read(_workbook_part(zf)).decode("utf-8")
+    return [sheet["name"] for sheet in _workbook_sheets(workbook_xml)]
+
+
+def _local(tag: str) -> str:
+    """Nama elemen tanpa namespace"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _column_index(ref: Optional[str], default: int) -> int:
+    """Indeks kolom 0-based dari referensi sel ("C7" → 2)"""
+    letters = re.match(r"[A-Z]*", ref or "").group(0)
+    if not letters:
+        return default
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+class _SharedStrings:
+    """sharedStrings.xml dibaca streaming hanya sampai indeks yang diminta"""
+
+    def __init__(self, zf: zipfile.ZipFile, part: Optional[str]):
+        self._items = []
+        self._stream = zf.open(part) if part else None
+        self._events = ET.iterparse(self._stream, events=("end",)) if part else iter(())
+
+    def get(self, index: int) -> str:
+        while len(self._items) <= index:
+            _, elem = next(self._events, (None, None))
+            if elem is None:
+                return ""
+            if _local(elem.tag) == "si":
+                self._items.append("".join(t.text or "" for t in elem.iter() if _local(t.tag) == "t"))
+                elem.clear()
+        return self._items[index]
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+
+
+def _cell_value(cell, shared: _SharedStrings):
+    """Nilai sel XML seperti dibaca openpyxl (None = kosong)"""
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter() if _local(t.tag) == "t")
+    value = next((child.text for child in cell if _local(child.tag) == "v"), None)
+    if value is None:
+        return None
+    if kind == "s":
+        return shared.get(int(value))
+    if kind == "n":
+        return float(value) if any(ch in value for ch in ".Ee") else int(value)
+    if kind == "b":
+        return bool(int(value))
+    return value
+
+
+def sheet_head(data, sheet_name: str) -> Tuple[list, bool]:
+    """
+    Header (baris 1) sebuah sheet dan ada/tidaknya baris data, dibaca
+    streaming dari XML sheet sampai baris data pertama (shared strings hanya
+    sampai indeks yang dipakai), sehingga waktunya tidak bergantung pada
+    panjang sheet
+
+    Args:
+        data: bytes atau file-like berisi file xlsx
+        sheet_name: Nama sheet
+
+    Returns:
+        Tuple (nilai header per kolom, True jika ada sel terisi di bawah header)
+    """
+    if hasattr(data, "read"):
+        data.seek(0)
+        data = data.read()
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        wb_part = _workbook_part(zf)
+        sheets = _workbook_sheets(zf.read(wb_part).decode("utf-8"))
+        sheet = next((s for s in sheets if s["name"] == sheet_name), None)
+        if sheet is None:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        rels = _read_rels(zf, wb_part)
+        target = next(rel["Target"] for rel in rels if rel.get("Id") == sheet["rid"])
+        sst_part = next((_resolve(wb_part, rel["Target"]) for rel in rels
+                         if rel.get("Type", "").endswith("/sharedStrings")), None)
+
+        shared = _SharedStrings(zf, sst_part if sst_part in zf.namelist() else None)
+        header, has_data, row_number = [], False, 0
+        try:
+            with zf.open(_resolve(wb_part, target)) as stream:
+                for _, elem in ET.iterparse(stream, events=("end",)):
+                    if _local(elem.tag) != "row":
+                        continue
+                    row_number = int(elem.get("r", row_number + 1))
+                    cells = [child for child in elem if _local(child.tag) == "c"]
+                    if row_number == 1:
+                        for position, cell in enumerate(cells):
+                            col = _column_index(cell.get("r"), position)
+                            header.extend([None] * (col + 1 - len(header)))
+                            header[col] = _cell_value(cell, shared)
+                    elif any(_cell_value(cell, shared) not in (None, "") for cell in cells):
+                        has_data = True
+                        break
+                    elem.clear()
+        finally:
+            shared.close()
+    return header, has_data
+
+
+def _unique_part(name: str, used: set) -> str:
+    """Nama part yang belum dipakai (sheet1.xml → sheet2.xml, ...)"""
+    if name not in used:
+        return name
+    folder, base = posixpath.split(name)
+    match = re.match(r'^(.*?)(\d*)(\.[^.]+)$', base)
+    stem, ext = (match.group(1), match.group(3)) if match else (base, "")
+    number = 1
+    while True:
+        candidate = posixpath.join(folder, f"{stem}{number}{ext}")
+        if candidate not in used:
+            return candidate
+        number += 1
+
+
+# ======================================================
+# STYLES & SHARED STRINGS
+# ======================================================
+
+def _section(xml: str, tag: str):
+    """Match elemen seksi styles.xml (mis. fonts) tanpa prefix"""
+    return re.search(r'<%s\b([^>]*?)(?:/>|>(.*?)</%s>)' % (tag, tag), xml, re.S)
+
+
+def _children(inner: Optional[str], tag: str) -> List[str]:
+    if not inner:
+        return []
+    return re.findall(r'<%s\b[^>]*?/>|<%s\b[^>]*>.*?</%s>' % (tag, tag, tag), inner, re.S)
+
+
+def _replace_section(xml: str, match, tag: str, children: List[str]) -> str:
+    start_tag = _set_attr(f"<{tag}{match.group(1)}>", "count", len(children))
+    return xml[:match.start()] + start_tag + "".join(children) + f"</{tag}>" + xml[match.end():]
+
+
+def _merge_styles(source_xml: str, generated_xml: str) -> Tuple[str, int, int]:
+    """
+    Tambahkan style sheet hasil ke styles.xml sumber
+
+    Returns:
+        (styles.xml gabungan, offset indeks cellXfs, offset indeks dxfs)
+    """
+    if re.search(r'<\w+:styleSheet\b', source_xml):
+        raise ValueError("styles.xml sumber memakai prefix namespace")
+
+    result = source_xml
+    offsets = {}
+    for section, child in [("fonts", "font"), ("fills", "fill"), ("borders", "border")]:
+        source_match = _section(result, section)
+        if source_match is None:
+            raise ValueError(f"styles.xml sumber tanpa <{section}>")
+        existing = _children(source_match.group(2), child)
+        offsets[child] = len(existing)
+        added = _children((_section(generated_xml, section) or [None, None, None])[2], child)
+        result = _replace_section(result, source_match, section, existing + added)
+
+    # Number format custom (id >= 164) dipetakan ke id bebas di sumber
+    numfmt_map = {}
+    generated_numfmts = _children((_section(generated_xml, "numFmts") or [None, None, None])[2], "numFmt")
+    if generated_numfmts:
+        source_match = _section(result, "numFmts")
+        existing = _children(source_match.group(2), "numFmt") if source_match else []
+        by_code = {_attrs(e).get("formatCode"): int(_attrs(e).get("numFmtId", 0)) for e in existing}
+        next_id = max([163] + list(by_code.values())) + 1
+        added = []
+        for element in generated_numfmts:
+            attrs = _attrs(element)
+            code = attrs.get("formatCode")
+            if code not in by_code:
+                by_code[code] = next_id
+                added.append(f'<numFmt numFmtId="{next_id}" formatCode={quoteattr(code)}/>')
+                next_id += 1
+            numfmt_map[int(attrs.get("numFmtId", 0))] = by_code[code]
+        if source_match:
+            result = _replace_section(result, source_match, "numFmts", existing + added)
+        elif added:
+            head = re.search(r'<styleSheet\b[^>]*>', result)
+            block = f'<numFmts count="{len(added)}">{"".join(added)}</numFmts>'
+            result = result[:head.end()] + block + result[head.end():]
+
+    def remap_xf(element: str) -> str:
+        start = re.match(r'<xf\b[^>]*?/?>', element).group(0)
+        new_start = start
+        for attr, child in [("fontId", "font"), ("fillId", "fill"), ("borderId", "border")]:
+            value = _attrs(start).get(attr)
+            if value is not None:
+                new_start = _set_attr(new_start, attr, int(value) + offsets[child])
+        numfmt = _attrs(start).get("numFmtId")
+        if numfmt is not None and int(numfmt) in numfmt_map:
+            new_start = _set_attr(new_start, "numFmtId", numfmt_map[int(numfmt)])
+        new_start = _set_attr(new_start, "xfId", 0)
+        return new_start + element[len(start):]
+
+    source_match = _section(result, "cellXfs")
+    if source_match is None:
+        raise ValueError("styles.xml sumber tanpa <cellXfs>")
+    existing = _children(source_match.group(2), "xf")
+    xf_offset = len(existing)
+    added = [remap_xf(e) for e in _children(_section(generated_xml, "cellXfs")[2], "xf")]
+    result = _replace_section(result, source_match, "cellXfs", existing + added)
+
+    # Dxf untuk conditional formatting
+    dxf_offset = 0
+    added = _children((_section(generated_xml, "dxfs") or [None, None, None])[2], "dxf")
+    source_match = _section(result, "dxfs")
+    existing = _children(source_match.group(2), "dxf") if source_match else []
+    dxf_offset = len(existing)
+    if source_match:
+        result = _replace_section(result, source_match, "dxfs", existing + added)
+    elif added:
+        anchor = re.search(r'</cellStyles>|</cellXfs>', result)
+        block = f'<dxfs count="{len(added)}">{"".join(added)}</dxfs>'
+        result = result[:anchor.end()] + block + result[anchor.end():]
+
+    return result, xf_offset, dxf_offset
+
+
+_SI = re.compile(rb'<si\b[^>]*?/>|<si\b[^>]*>.*?</si>', re.S)
+
+
+def _merge_shared_strings(source_sst: Optional[bytes], generated_sst: Optional[bytes]) -> Tuple[bytes, int]:
+    """
+    Tambahkan string sheet hasil di akhir sharedStrings sumber
+
+    Returns:
+        (sharedStrings.xml gabungan, offset indeks string hasil)
+    """
+    added = _SI.findall(generated_sst) if generated_sst else []
+    if source_sst is None:
+        header = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<sst xmlns="{REL_TYPE.replace("officeDocument/2006/relationships", "spreadsheetml/2006/main")}" count="{len(added)}" uniqueCount="{len(added)}">'
+        return header.encode("utf-8") + b"".join(added) + b"</sst>", 0
+
+    root = re.search(rb'<((?:\w+:)?)sst\b[^>]*>', source_sst)
+    prefix = root.group(1)
+    offset = len(re.findall(rb'<%ssi[\s>/]' % re.escape(prefix), source_sst))
+    if prefix:
+        namespace = b'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+        added = [re.sub(rb'^<si\b', b'<si ' + namespace, s, count=1) for s in added]
+    total = offset + len(added)
+
+    start_tag = root.group(0).decode("utf-8")
+    start_tag = _set_attr(start_tag, "uniqueCount", total)
+    count = _attrs(start_tag).get("count")
+    if count is not None:
+        start_tag = _set_attr(start_tag, "count", int(count) + len(added))
+    end = source_sst.rindex(b"</%ssst>" % prefix)
+    merged = (source_sst[:root.start()] + start_tag.encode("utf-8") +
+              source_sst[root.end():end] + b"".join(added) + source_sst[end:])
+    return merged, offset
+
+
+def _rewrite_generated_sheet(xml: bytes, xf_offset: int, sst_offset: int,
+                             dxf_offset: int, deselect: bool) -> bytes:
+    """Petakan ulang indeks style/string/dxf di XML sheet hasil openpyxl"""
+    def fix_style(m):
+        return b'%s%d"' % (m.group(1), int(m.group(2)) + xf_offset)
+
+    def fix_cell(m):
+        attrs, closed, value = m.group(1), m.group(2), m.group(3)
+        attrs = re.sub(rb'(\ss=")(\d+)"', fix_style, attrs)
+        out = b'<c' + attrs + closed + b'>'
+        if value is not None:
+            if b' t="s"' in attrs:
+                value = b'%d' % (int(value) + sst_offset)
+            out += b'<v>' + value + b'</v>'
+        return out
+
+    xml = re.sub(rb'<c\b([^>]*?)(/?)>(?:<v>(\d+)</v>)?', fix_cell, xml)
+    xml = re.sub(rb'(<row\b[^>]*?\ss=")(\d+)"', fix_style, xml)
+    xml = re.sub(rb'(<col\b[^>]*?\sstyle=")(\d+)"', fix_style, xml)
+    xml = re.sub(rb'(\sdxfId=")(\d+)"', lambda m: b'%s%d"' % (m.group(1), int(m.group(2)) + dxf_offset), xml)
+    if deselect:
+        xml = re.sub(rb'\stabSelected="(?:1|true)"', b'', xml)
+    return xml
+
+
+# ======================================================
+# MERGE
+# ======================================================
+
+def merge_source_sheets(generated, source, keep_sheets: List[str]) -> io.BytesIO:
+    """
+    Gabungkan workbook hasil dengan sheet asli dari file sumber
+
+    Workbook hasil berisi sheet placeholder (kosong) bernama sama dengan
+    keep_sheets di posisi akhirnya; placeholder diganti part sheet asli
+    yang disalin byte demi byte. Sheet sumber lain (versi lama sheet hasil)
+    dibuang. calcChain.xml sumber dihapus agar dihitung ulang oleh Excel.
+
+    Args:
+        generated: bytes atau BytesIO workbook hasil
+        source: bytes atau BytesIO file Excel asli
+        keep_sheets: Nama sheet asli yang dipertahankan
+
+    Returns:
+        BytesIO buffer berisi file Excel gabungan
+    """
+    if hasattr(generated, "getvalue"):
+        generated = generated.getvalue()
+    if hasattr(source, "read"):
+        source.seek(0)
+        source = source.read()
+    keep = set(keep_sheets)
+
+    src = zipfile.ZipFile(io.BytesIO(source))
+    gen = zipfile.ZipFile(io.BytesIO(generated))
+    src_names = set(src.namelist())
+
+    # --- workbook sumber & hasil
+    src_wb_part = _workbook_part(src)
+    src_wb_xml = src.read(src_wb_part).decode("utf-8")
+    src_wb_rels_part = _rels_path(src_wb_part)
+    src_wb_rels_xml = src.read(src_wb_rels_part).decode("utf-8")
+    src_rels = {rel["Id"]: rel for rel in _read_rels(src, src_wb_part)}
+    src_sheets = _workbook_sheets(src_wb_xml)
+
+    gen_wb_part = _workbook_part(gen)
+    gen_wb_xml = gen.read(gen_wb_part).decode("utf-8")
+    gen_rels = {rel["Id"]: rel for rel in _read_rels(gen, gen_wb_part)}
+    gen_sheets = _workbook_sheets(gen_wb_xml)
+    gen_defaults, gen_overrides = _content_types(gen)
+
+    def rel_part(rels, wb_part, rid):
+        return _resolve(wb_part, rels[rid]["Target"])
+
+    def rel_of_type(rels, suffix):
+        return next((rel for rel in rels.values() if rel.get("Type", "").endswith(suffix)), None)
+
+    removed_parts = set()
+    removed_rids = set()
+    for sheet in src_sheets:
+        if sheet["name"] not in keep:
+            part = rel_part(src_rels, src_wb_part, sheet["rid"])
+            removed_parts.update({part, _rels_path(part)})
+            removed_rids.add(sheet["rid"])
+    calc_chain = rel_of_type(src_rels, "/calcChain")
+    if calc_chain:
+        removed_parts.add(_resolve(src_wb_part, calc_chain["Target"]))
+        removed_rids.add(calc_chain["Id"])
+
+    # --- styles & shared strings
+    src_styles_part = _resolve(src_wb_part, rel_of_type(src_rels, "/styles")["Target"])
+    gen_styles_part = _resolve(gen_wb_part, rel_of_type(gen_rels, "/styles")["Target"])
+    styles_xml, xf_offset, dxf_offset = _merge_styles(
+        src.read(src_styles_part).decode("utf-8"), gen.read(gen_styles_part).decode("utf-8")
+    )
+
+    src_sst_rel = rel_of_type(src_rels, "/sharedStrings")
+    gen_sst_rel = rel_of_type(gen_rels, "/sharedStrings")
+    src_sst_part = _resolve(src_wb_part, src_sst_rel["Target"]) if src_sst_rel else None
+    gen_sst = gen.read(_resolve(gen_wb_part, gen_sst_rel["Target"])) if gen_sst_rel else None
+    sst_xml, sst_offset = _merge_shared_strings(src.read(src_sst_part) if src_sst_part else None, gen_sst)
+
+    # Sheet asli yang aktif (tabSelected) tetap jadi tab aktif
+    kept_sheets = {s["name"]: s for s in src_sheets if s["name"] in keep}
+    selected_source = None
+    for name, sheet in kept_sheets.items():
+        part = rel_part(src_rels, src_wb_part, sheet["rid"])
+        with src.open(part) as handle:
+            if re.search(rb'tabSelected="(?:1|true)"', handle.read(8192)):
+                selected_source = name
+                break
+
+    # --- salin part sheet hasil (dan drawing/chart-nya) dengan nama unik
+    used = set(src_names) - removed_parts
+    new_parts: Dict[str, bytes] = {}
+    new_overrides: Dict[str, str] = {}
+    part_map: Dict[str, str] = {}
+
+    def content_type(part):
+        return gen_overrides.get(part) or gen_defaults.get(posixpath.splitext(part)[1][1:].lower())
+
+    def copy_tree(part, data=None):
+        if part in part_map:
+            return part_map[part]
+        new_name = _unique_part(part, used)
+        used.add(new_name)
+        part_map[part] = new_name
+        relations = _read_rels(gen, part)
+        new_parts[new_name] = data if data is not None else gen.read(part)
+        if content_type(part):
+            new_overrides[new_name] = content_type(part)
+        if relations:
+            rels_xml = gen.read(_rels_path(part)).decode("utf-8")
+            for rel in relations:
+                if rel.get("TargetMode") == "External":
+                    continue
+                target = copy_tree(_resolve(part, rel["Target"]))
+                element = re.search(r'<Relationship\b[^>]*\sId="%s"[^>]*/>' % re.escape(rel["Id"]), rels_xml).group(0)
+                rels_xml = rels_xml.replace(element, _set_attr(element, "Target", "/" + target))
+            new_name_rels = _rels_path(new_name)
+            used.add(new_name_rels)
+            new_parts[new_name_rels] = rels_xml.encode("utf-8")
+        return new_name
+
+    rids = [int(m) for m in re.findall(r'Id="rId(\d+)"', src_wb_rels_xml)]
+    next_rid = max(rids + [0]) + 1
+    next_sheet_id = max([int(s["sheetId"]) for s in src_sheets if s["sheetId"]] + [0]) + 1
+
+    sheet_prefix = re.match(r'<((?:\w+:)?)sheet\b', src_sheets[0]["element"]).group(1) if src_sheets else ""
+    rel_attr = next((k for k in _attrs(src_sheets[0]["element"]) if k.endswith(":id")), "r:id") if src_sheets else "r:id"
+
+    new_sheet_elements = []
+    new_rel_elements = []
+    order = []
+    for sheet in gen_sheets:
+        name = sheet["name"]
+        if name in kept_sheets:
+            new_sheet_elements.append(kept_sheets[name]["element"])
+            order.append(name)
+            continue
+        part = rel_part(gen_rels, gen_wb_part, sheet["rid"])
+        data = _rewrite_generated_sheet(gen.read(part), xf_offset, sst_offset, dxf_offset,
+                                        deselect=selected_source is not None)
+        new_part = copy_tree(part, data)
+        rid = f"rId{next_rid}"
+        next_rid += 1
+        new_rel_elements.append(
+            f'<Relationship Id="{rid}" Type="{gen_rels[sheet["rid"]]["Type"]}" Target="/{new_part}"/>'
+        )
+        new_sheet_elements.append(
+            f'<{sheet_prefix}sheet name={quoteattr(name)} sheetId="{next_sheet_id}" {rel_attr}="{rid}"/>'
+        )
+        next_sheet_id += 1
+        order.append(name)
+
+    # --- workbook.xml: urutan sheet, definedNames, tab aktif
+    block = _SHEETS_BLOCK.search(src_wb_xml)
+    wb_xml = src_wb_xml[:block.start()] + block.group(1) + "".join(new_sheet_elements) + block.group(3) + src_wb_xml[block.end():]
+
+    old_index = {s["name"]: i for i, s in enumerate(src_sheets)}
+    new_index = {name: i for i, name in enumerate(order)}
+    index_map = {old_index[name]: new_index[name] for name in kept_sheets}
+
+    def fix_defined_name(m):
+        local = _attrs(m.group(2)).get("localSheetId")
+        if local is None:
+            return m.group(0)
+        if int(local) not in index_map:
+            return ""
+        return m.group(0).replace(f'localSheetId="{local}"', f'localSheetId="{index_map[int(local)]}"', 1)
+
+    wb_xml = re.sub(r'<((?:\w+:)?)definedName\b([^>]*)>(.*?)</\1definedName>', fix_defined_name, wb_xml, flags=re.S)
+
+    gen_view = re.search(r'<(?:\w+:)?workbookView\b[^>]*>', gen_wb_xml)
+    active = int(_attrs(gen_view.group(0)).get("activeTab", 0)) if gen_view else 0
+    if selected_source is not None:
+        active = new_index[selected_source]
+    wb_xml = re.sub(r'<(?:\w+:)?workbookView\b[^>]*>',
+                    lambda m: _set_attr(_set_attr(m.group(0), "activeTab", active), "firstSheet", 0),
+                    wb_xml, count=1)
+
+    # --- workbook rels & content types
+    rels_xml = src_wb_rels_xml
+    for rid in removed_rids:
+        rels_xml = re.sub(r'<Relationship\b[^>]*\sId="%s"[^>]*/>' % re.escape(rid), "", rels_xml)
+    if src_sst_part is None:
+        src_sst_part = _unique_part("xl/sharedStrings.xml", used)
+        new_rel_elements.append(f'<Relationship Id="rId{next_rid}" Type="{REL_TYPE}/sharedStrings" Target="/{src_sst_part}"/>')
+        new_overrides[src_sst_part] = SST_CONTENT_TYPE
+    end = rels_xml.rindex("</Relationships>")
+    rels_xml = rels_xml[:end] + "".join(new_rel_elements) + rels_xml[end:]
+
+    types_xml = src.read("[Content_Types].xml").decode("utf-8")
+    for part in removed_parts:
+        types_xml = re.sub(r'<Override\b[^>]*\sPartName="/%s"[^>]*/>' % re.escape(part), "", types_xml)
+    end = types_xml.rindex("</Types>")
+    types_xml = types_xml[:end] + "".join(
+        f'<Override PartName="/{escape(part)}" ContentType="{ctype}"/>' for part, ctype in new_overrides.items()
+    ) + types_xml[end:]
+
+    replaced = {
+        src_wb_part: wb_xml.encode("utf-8"),
+        src_wb_rels_part: rels_xml.encode("utf-8"),
+        "[Content_Types].xml": types_xml.encode("utf-8"),
+        src_styles_part: styles_xml.encode("utf-8"),
+        src_sst_part: sst_xml,
+    }
+
+    # --- tulis paket: part sumber disalin apa adanya kecuali yang diganti
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as out:
+        for info in src.infolist():
+            if info.filename in removed_parts:
+                continue
+            data = replaced.pop(info.filename, None)
+            out.writestr(info, data if data is not None else src.read(info.filename), compress_type=zipfile.ZIP_DEFLATED)
+        for name, data in list(replaced.items()) + list(new_parts.items()):
+            out.writestr(name, data)
+
+    src.close()
+    gen.close()
+    buf.seek(0)
+    return buf
@@ -1,5 +1,8 @@
 import streamlit as st
 
+from app.core.excel_writer import ExcelWriter
+from app.core.slot_axis import SlotAxis
+
 def render_sidebar(config):
     with st.sidebar:
         st.title("⚙️ Pengaturan Jadwal")
@@ -24,6 +27,14 @@ def render_sidebar(config):
             help="Otomatis perbaiki format waktu yang tidak standar"
         )
 
+        config.schedule_sheet_pattern = st.text_input(
+            "Pola Sheet Jadwal",
+            value=config.schedule_sheet_pattern or "",
+            placeholder="Reguler & Poleks",
+            help="Kosong = sheet Reguler & Poleks. Isi regex nama sheet (mis. 'Poli .*' atau '.*') "
+                 "untuk membaca banyak sheet sekaligus; Jenis Poli diambil dari kolom sheet."
+        ).strip() or None
+
         # ======================
         # Jam & Interval Slot
         # ======================
@@ -49,6 +60,26 @@ def render_sidebar(config):
                 help="Menit mulai praktek pertama"
             )
 
+        col3, col4 = st.columns(2)
+
+        with col3:
+            config.end_hour = st.number_input(
+                "Jam Selesai",
+                min_value=1,
+                max_value=23,
+                value=int(config.end_hour),
+                step=1,
+                help="Slot terakhir dimulai sebelum jam ini"
+            )
+
+        with col4:
+            config.end_minute = st.select_slider(
+                "Menit Selesai",
+                options=[0, 15, 30, 45],
+                value=int(config.end_minute),
+                help="Menit jam selesai praktek"
+            )
+
         config.interval_minutes = st.selectbox(
             "Durasi per Slot (menit)",
             options=[10, 15, 20, 30, 60],
@@ -70,6 +101,72 @@ def render_sidebar(config):
             help="Jumlah maksimal dokter poleks di slot waktu yang sama"
         )
 
+        coloring_options = ["fill", "conditional"]
+        config.slot_coloring = st.selectbox(
+            "Pewarnaan Slot Excel",
+            options=coloring_options,
+            index=coloring_options.index(config.slot_coloring)
+            if config.slot_coloring in coloring_options else 0,
+            format_func=lambda x: "Warna per sel" if x == "fill" else "Conditional formatting",
+            help="Conditional formatting: warna R/E/overload dihitung Excel dan ikut berubah saat file diedit"
+        )
+
+        # ======================
+        # Sheet Output Excel
+        # ======================
+        st.subheader("📑 Sheet Output Excel")
+
+        preset_labels = {
+            "lengkap": "Lengkap (semua sheet)",
+            "harian": "Harian (Jadwal + Rekap Poli)",
+            "jadwal": "Jadwal saja (tercepat)",
+            "custom": "Pilih sendiri",
+        }
+        preset_options = list(preset_labels.keys())
+        current = config.output_sheets
+        if current is None:
+            current_preset = "lengkap"
+        elif isinstance(current, str) and current in ExcelWriter.SHEET_PRESETS:
+            current_preset = current
+        else:
+            current_preset = "custom"
+
+        sheet_preset = st.selectbox(
+            "Preset Sheet",
+            options=preset_options,
+            index=preset_options.index(current_preset),
+            format_func=lambda x: preset_labels[x],
+            help="Sheet yang tidak dipilih tidak dibuat sama sekali (export lebih cepat)"
+        )
+
+        if sheet_preset == "custom":
+            default_sheets = (list(current) if isinstance(current, (list, tuple))
+                              else list(ExcelWriter.SHEET_PRESETS.get(current_preset, ExcelWriter.OUTPUT_SHEETS)))
+            config.output_sheets = st.multiselect(
+                "Sheet yang dibuat",
+                options=ExcelWriter.OUTPUT_SHEETS,
+                default=[s for s in default_sheets if s in ExcelWriter.OUTPUT_SHEETS],
+                help="Grafik Poli memakai data Rekap Poli tanpa harus membuat sheet Rekap Poli"
+            )
+        else:
+            config.output_sheets = None if sheet_preset == "lengkap" else sheet_preset
+
+        partition_labels = {
+            "none": "Satu sheet",
+            "hari": "Satu sheet per hari",
+            "poli": "Satu sheet per poli",
+        }
+        partition_options = ExcelWriter.JADWAL_PARTITIONS
+        config.jadwal_partition = st.selectbox(
+            "Pisah Sheet Jadwal",
+            options=partition_options,
+            index=partition_options.index(config.jadwal_partition)
+            if config.jadwal_partition in partition_options else 0,
+            format_func=lambda x: partition_labels[x],
+            help="Untuk roster besar: sheet Jadwal dipecah dan sheet 'Jadwal' berisi indeks ber-hyperlink. "
+                 "Jadwal di atas batas baris/kolom Excel selalu dipecah otomatis."
+        )
+
         # ======================
         # Info & Actions
         # ======================
@@ -78,14 +175,9 @@ def render_sidebar(config):
         with st.expander("ℹ️ Info Aplikasi"):
             st.write(f"**Versi:** 1.0.0")
             st.write(f"**Hari aktif:** {len(config.hari_list)} hari")
-            st.write(f"**Slot waktu:** {config.start_hour:02d}:{config.start_minute:02d} - 14:30")
-            
-            # Hitung jumlah slot
-            from datetime import time
-            start_total = config.start_hour * 60 + config.start_minute
-            end_total = 14 * 60 + 30  # 14:30
-            total_slots = (end_total - start_total) // config.interval_minutes
-            st.write(f"**Total slot/hari:** {total_slots}")
+            axis = SlotAxis.from_config(config)
+            st.write(f"**Slot waktu:** {config.start_hour:02d}:{config.start_minute:02d} - {axis.end_label}")
+            st.write(f"**Total slot/hari:** {len(axis)}")
         
         # Reset button
         if st.button("🔄 Reset Aplikasi", use_container_width=True):
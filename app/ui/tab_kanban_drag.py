@@ -8,6 +8,9 @@ from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
 
+from app.core.aggregates import ScheduleAggregates
+from app.core.schedule_matrix import ScheduleMatrix
+
 # ============================================================
 # DEFAULT KANBAN UNTUK JADWAL DOKTER
 # ============================================================
@@ -175,104 +178,120 @@ def analyze_overload_slots(df, slot_strings, start_id):
     issues = []
     max_poleks = st.session_state.get("config", type('obj', (object,), {'max_poleks_per_slot': 7})).max_poleks_per_slot
     
-    for hari in df["HARI"].unique():
-        hari_data = df[df["HARI"] == hari]
-        
-        for slot in slot_strings[:15]:
-            if slot in hari_data.columns:
-                poleks_count = (hari_data[slot] == "E").sum()
-                
-                if poleks_count > max_poleks:
-                    issues.append({
-                        "id": f"overload_{start_id + len(issues)}",
-                        "text": f"{hari} {slot}: {int(poleks_count)} Poleks (batas {max_poleks})",
-                        "label": "Overload",
-                        "priority": "High",
-                        "created": datetime.now().strftime("%Y-%m-%d"),
-                        "due_date": (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d"),
-                        "assignee": "Admin",
-                        "data": {
-                            "hari": hari,
-                            "slot": slot,
-                            "count": int(poleks_count),
-                            "max": max_poleks,
-                            "type": "overload"
-                        }
-                    })
-    
-    return issues
-
-def analyze_doctor_conflicts(df, slot_strings, start_id):
-    """Analyze doctors with schedule conflicts"""
-    issues = []
+    aggregates = ScheduleAggregates.for_grid(df, slot_strings)
+    poleks_counts = aggregates.counts_e
+    slot_index = aggregates.matrix.slot_index
+    check_slots = [s for s in slot_strings[:15] if s in df.columns]
     
-    for (dokter, hari), group in df.groupby(["DOKTER", "HARI"]):
-        if len(group) > 1:
-            conflict_slots = []
-            
-            for slot in slot_strings[:10]:
-                if slot in group.columns:
-                    active_polis = group[group[slot].isin(["R", "E"])]["POLI"].tolist()
-                    if len(active_polis) > 1:
-                        conflict_slots.append({
-                            "slot": slot,
-                            "polis": active_polis
-                        })
+    for day_pos, hari in enumerate(aggregates.days):
+        for slot in check_slots:
+            poleks_count = poleks_counts[day_pos, slot_index[slot]]
             
-            if conflict_slots:
+            if poleks_count > max_poleks:
                 issues.append({
-                    "id": f"conflict_{start_id + len(issues)}",
-                    "text": f"Dr. {dokter} - {hari}: konflik di {len(conflict_slots)} slot",
-                    "label": "Konflik",
+                    "id": f"overload_{start_id + len(issues)}",
+                    "text": f"{hari} {slot}: {int(poleks_count)} Poleks (batas {max_poleks})",
+                    "label": "Overload",
                     "priority": "High",
                     "created": datetime.now().strftime("%Y-%m-%d"),
-                    "due_date": (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d"),
-                    "assignee": "Manager",
+                    "due_date": (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d"),
+                    "assignee": "Admin",
                     "data": {
-                        "dokter": dokter,
                         "hari": hari,
-                        "conflicts": conflict_slots,
-                        "type": "conflict"
+                        "slot": slot,
+                        "count": int(poleks_count),
+                        "max": max_poleks,
+                        "type": "overload"
                     }
                 })
     
     return issues
 
+def analyze_doctor_conflicts(df, slot_strings, start_id):
+    """Analyze doctors with schedule conflicts"""
+    issues = []
+    
+    matrix = ScheduleMatrix.from_grid(df, slot_strings)
+    check_pos = matrix.slot_positions(slot_strings[:10])
+    if matrix.n_rows == 0 or not check_pos:
+        return issues
+    
+    # Grup (dokter, hari) dan hitungan baris aktif per slot
+    group_ids, group_keys = pd.factorize(
+        pd.MultiIndex.from_arrays([matrix.meta["DOKTER"], matrix.meta["HARI"]])
+    )
+    active_counts = matrix.count_by(group_ids, len(group_keys))[:, check_pos]
+    active = matrix.mask()[:, check_pos]
+    polis = matrix.meta["POLI"].to_numpy(dtype=object)
+    
+    conflict_groups = np.flatnonzero((active_counts > 1).any(axis=1))
+    for group in sorted(conflict_groups, key=lambda g: group_keys[g]):
+        dokter, hari = group_keys[group]
+        rows = np.flatnonzero(group_ids == group)
+        conflict_slots = []
+        
+        for col in np.flatnonzero(active_counts[group] > 1):
+            conflict_slots.append({
+                "slot": matrix.slot_strings[check_pos[col]],
+                "polis": polis[rows[active[rows, col]]].tolist()
+            })
+        
+        issues.append({
+            "id": f"conflict_{start_id + len(issues)}",
+            "text": f"Dr. {dokter} - {hari}: konflik di {len(conflict_slots)} slot",
+            "label": "Konflik",
+            "priority": "High",
+            "created": datetime.now().strftime("%Y-%m-%d"),
+            "due_date": (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d"),
+            "assignee": "Manager",
+            "data": {
+                "dokter": dokter,
+                "hari": hari,
+                "conflicts": conflict_slots,
+                "type": "conflict"
+            }
+        })
+    
+    return issues
+
 def analyze_empty_slots(df, slot_strings, start_id):
     """Analyze empty slots during peak hours"""
     issues = []
     
-    peak_slots = [s for s in slot_strings if "10:00" <= s <= "12:00"]
+    matrix = ScheduleMatrix.from_grid(df, slot_strings)
+    peak_pos = matrix.slot_positions([s for s in slot_strings if "10:00" <= s <= "12:00"])
+    if matrix.n_rows == 0:
+        return issues
+    
+    # Grup (hari, poli) sesuai urutan kemunculan
+    group_ids, group_keys = pd.factorize(
+        pd.MultiIndex.from_arrays([matrix.day_idx, matrix.meta["POLI"]])
+    )
+    group_active = matrix.count_by(group_ids, len(group_keys))[:, peak_pos] > 0
+    empty_counts = (~group_active).sum(axis=1)
     
-    for hari in df["HARI"].unique():
-        hari_data = df[df["HARI"] == hari]
+    order = sorted(range(len(group_keys)), key=lambda g: group_keys[g][0])
+    for group in order:
+        day_pos, poli = group_keys[group]
+        hari = matrix.days[day_pos]
+        empty_in_peak = int(empty_counts[group])
         
-        for poli in hari_data["POLI"].unique():
-            poli_data = hari_data[hari_data["POLI"] == poli]
-            
-            empty_in_peak = 0
-            for slot in peak_slots:
-                if slot in poli_data.columns:
-                    slot_values = poli_data[slot].values
-                    if not any(val in ["R", "E"] for val in slot_values):
-                        empty_in_peak += 1
-            
-            if empty_in_peak >= 2:
-                issues.append({
-                    "id": f"empty_{start_id + len(issues)}",
-                    "text": f"{poli} - {hari}: {empty_in_peak} slot kosong di jam sibuk",
-                    "label": "Kosong",
-                    "priority": "Medium",
-                    "created": datetime.now().strftime("%Y-%m-%d"),
-                    "due_date": (datetime.now() + timedelta(days=5)).strftime("%Y-%m-%d"),
-                    "assignee": "Staff",
-                    "data": {
-                        "poli": poli,
-                        "hari": hari,
-                        "empty_slots": int(empty_in_peak),
-                        "type": "empty"
-                    }
-                })
+        if empty_in_peak >= 2:
+            issues.append({
+                "id": f"empty_{start_id + len(issues)}",
+                "text": f"{poli} - {hari}: {empty_in_peak} slot kosong di jam sibuk",
+                "label": "Kosong",
+                "priority": "Medium",
+                "created": datetime.now().strftime("%Y-%m-%d"),
+                "due_date": (datetime.now() + timedelta(days=5)).strftime("%Y-%m-%d"),
+                "assignee": "Staff",
+                "data": {
+                    "poli": poli,
+                    "hari": hari,
+                    "empty_slots": int(empty_in_peak),
+                    "type": "empty"
+                }
+            })
     
     return issues
 
@@ -280,24 +299,15 @@ def analyze_distribution(df, slot_strings, start_id):
     """Analyze distribution issues"""
     issues = []
     
-    for poli in df["POLI"].unique():
-        poli_data = df[df["POLI"] == poli]
-        
-        morning_slots = [s for s in slot_strings if s < "12:00"]
-        afternoon_slots = [s for s in slot_strings if s >= "12:00"]
-        
-        morning_count = 0
-        afternoon_count = 0
-        
-        for slot in morning_slots:
-            if slot in poli_data.columns:
-                morning_count += int((poli_data[slot] == "R").sum())
-                morning_count += int((poli_data[slot] == "E").sum())
-        
-        for slot in afternoon_slots:
-            if slot in poli_data.columns:
-                afternoon_count += int((poli_data[slot] == "R").sum())
-                afternoon_count += int((poli_data[slot] == "E").sum())
+    matrix = ScheduleMatrix.from_grid(df, slot_strings)
+    morning_pos = matrix.slot_positions([s for s in slot_strings if s < "12:00"])
+    afternoon_pos = matrix.slot_positions([s for s in slot_strings if s >= "12:00"])
+    
+    poli_counts = matrix.count_by(matrix.poli_idx, len(matrix.polis))
+    
+    for poli_pos, poli in enumerate(matrix.polis):
+        morning_count = int(poli_counts[poli_pos, morning_pos].sum())
+        afternoon_count = int(poli_counts[poli_pos, afternoon_pos].sum())
         
         total = morning_count + afternoon_count
         if total > 0:
@@ -327,29 +337,30 @@ def find_optimal_schedules(df, slot_strings, start_id):
     """Find optimal schedules to highlight"""
     issues = []
     
-    for hari in df["HARI"].unique():
-        hari_data = df[df["HARI"] == hari]
-        
-        for slot in ["10:00", "11:00", "13:00"]:
-            if slot in hari_data.columns:
-                doctor_count = (hari_data[slot].isin(["R", "E"])).sum()
-                
-                if 3 <= doctor_count <= 5:
-                    issues.append({
-                        "id": f"opt_{start_id + len(issues)}",
-                        "text": f"{hari} {slot}: {int(doctor_count)} dokter (optimal)",
-                        "label": "Optimal",
-                        "priority": "Low",
-                        "created": datetime.now().strftime("%Y-%m-%d"),
-                        "due_date": "",
-                        "assignee": "System",
-                        "data": {
-                            "hari": hari,
-                            "slot": slot,
-                            "doctor_count": int(doctor_count),
-                            "type": "optimal"
-                        }
-                    })
+    matrix = ScheduleMatrix.from_grid(df)
+    day_counts = matrix.counts_by_day()
+    check_slots = [s for s in ["10:00", "11:00", "13:00"] if s in matrix.slot_index]
+    
+    for day_pos, hari in enumerate(matrix.days):
+        for slot in check_slots:
+            doctor_count = day_counts[day_pos, matrix.slot_index[slot]]
+            
+            if 3 <= doctor_count <= 5:
+                issues.append({
+                    "id": f"opt_{start_id + len(issues)}",
+                    "text": f"{hari} {slot}: {int(doctor_count)} dokter (optimal)",
+                    "label": "Optimal",
+                    "priority": "Low",
+                    "created": datetime.now().strftime("%Y-%m-%d"),
+                    "due_date": "",
+                    "assignee": "System",
+                    "data": {
+                        "hari": hari,
+                        "slot": slot,
+                        "doctor_count": int(doctor_count),
+                        "type": "optimal"
+                    }
+                })
     
     return issues
 
@@ -38,6 +38,7 @@ def render_settings_tab(config):
 
     with col2:
         st.write("**Jam Mulai**:", f"{config.start_hour:02d}:{config.start_minute:02d}")
+        st.write("**Jam Selesai**:", f"{config.end_hour:02d}:{config.end_minute:02d}")
         st.write("**Interval (menit)**:", config.interval_minutes)
         st.write("**Maks Poleks per Slot**:", config.max_poleks_per_slot)
 
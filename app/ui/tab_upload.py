@@ -5,6 +5,11 @@ import io
 import traceback
 from datetime import datetime  # ✅ IMPORT datetime di sini
 
+from app.core.cleaner import DataCleaner
+from app.core.prebuild import OutputPrebuilder
+from app.core.schema import memory_report
+from app.core.workbook_session import WorkbookSession
+
 def render_upload_tab(scheduler, writer, analyzer, validator, config):
     st.subheader("📤 Upload & Proses Jadwal")
     
@@ -26,8 +31,13 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
         if ("uploaded_file_bytes" not in st.session_state or 
             st.session_state.get("uploaded_file_name") != uploaded_file.name):
             
+            _cancel_prebuild()
             st.session_state["uploaded_file_bytes"] = uploaded_file.getvalue()
             st.session_state["uploaded_file_name"] = uploaded_file.name
+            # Satu parse per isi file untuk preview, validasi & cleaning
+            st.session_state["uploaded_workbook"] = WorkbookSession.from_bytes(
+                st.session_state["uploaded_file_bytes"]
+            )
             st.session_state["processed_data"] = None
             st.session_state["slot_strings"] = None
             print(f"✅ File saved to session: {uploaded_file.name}")
@@ -35,19 +45,20 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
         # Tampilkan file info
         st.success(f"✅ File terupload: **{uploaded_file.name}**")
         
-        # Preview file
+        workbook = _uploaded_workbook()
+        
+        # Preview file (hanya baris pertama tiap sheet, tanpa membaca seluruh sheet)
         with st.expander("📄 Preview File Upload", expanded=False):
             try:
-                file_stream = io.BytesIO(st.session_state["uploaded_file_bytes"])
-                excel_data = pd.ExcelFile(file_stream)
-                st.write(f"**Sheet yang ditemukan:** {excel_data.sheet_names}")
+                st.write(f"**Sheet yang ditemukan:** {workbook.sheet_names}")
                 
-                for sheet in ['Reguler', 'Poleks']:
-                    if sheet in excel_data.sheet_names:
-                        file_stream.seek(0)
-                        df_sheet = pd.read_excel(file_stream, sheet_name=sheet)
-                        st.write(f"**Sheet {sheet}:** {len(df_sheet)} baris")
-                        st.dataframe(df_sheet.head(3), width='stretch')
+                schedule_sheets = DataCleaner.schedule_sheets(workbook.sheet_names,
+                                                              config.schedule_sheet_pattern)
+                for sheet, _ in schedule_sheets:
+                    df_head, total_rows = workbook.preview(sheet, rows=3)
+                    count = f"±{total_rows} baris" if total_rows is not None else "jumlah baris tidak diketahui"
+                    st.write(f"**Sheet {sheet}:** {count}")
+                    st.dataframe(df_head, width='stretch')
             except Exception as e:
                 st.warning(f"Tidak bisa preview file: {e}")
         
@@ -57,33 +68,64 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
         if st.button("🚀 Proses Jadwal", type="primary", width='stretch', 
                     key="process_button"):
             
+            # Build Excel dari hasil proses sebelumnya sudah tidak relevan
+            _cancel_prebuild()
+            
             with st.spinner("Memproses data... Mohon tunggu"):
                 try:
                     # Validasi file
-                    file_stream = io.BytesIO(st.session_state["uploaded_file_bytes"])
-                    is_valid, message = validator.validate_excel_file(file_stream)
+                    is_valid, message = validator.validate_excel_file(
+                        workbook, sheet_pattern=config.schedule_sheet_pattern
+                    )
                     
                     if not is_valid:
                         st.error(f"❌ File tidak valid: {message}")
                         st.stop()
                     
-                    # Proses data
-                    file_stream.seek(0)
-                    grid_df, slot_strings, errors = scheduler.process_dataframe(file_stream)
+                    # Proses data (sheet yang sama dengan validasi, tanpa parse ulang)
+                    grid_df, slot_strings, errors = scheduler.process_dataframe(workbook)
                     
                     if grid_df is not None:
                         # Simpan hasil ke session state
                         st.session_state["processed_data"] = grid_df
                         st.session_state["slot_strings"] = slot_strings
                         st.session_state["processing_errors"] = errors
+                        st.session_state["validation"] = scheduler.last_validation
                         
-                        st.success(f"✅ Data berhasil diproses! ({len(grid_df)} baris, {len(slot_strings)} slot waktu)")
+                        # Mulai buat file Excel di latar belakang selagi hasil ditampilkan
+                        _ensure_prebuild(writer, grid_df, slot_strings)
                         
+                        st.success(f"✅ Data berhasil diproses! ({len(grid_df)} baris, {len(slot_strings)} slot waktu)")
+
+                        # Laporan re-proses inkremental (roster yang di-upload ulang)
+                        changes = scheduler.last_changes
+                        if changes and changes.get('mode') == 'inkremental':
+                            st.info(
+                                f"🔁 Proses inkremental: {changes['rows_parsed']} baris di-parse ulang, "
+                                f"{changes['rows_reused']} baris dipakai ulang, "
+                                f"{changes['rows_removed']} baris dihapus/berubah; "
+                                f"{changes.get('grid_rows_rebuilt', 0)} baris grid dibangun ulang"
+                            )
+                            if changes.get('changed_doctors'):
+                                doctors = changes['changed_doctors']
+                                more = f" (+{len(doctors) - 10} lainnya)" if len(doctors) > 10 else ""
+                                st.caption(f"Dokter berubah: {', '.join(map(str, doctors[:10]))}{more}")
+
                         # Tampilkan preview
                         with st.expander("📋 Preview Hasil Proses", expanded=True):
                             st.write(f"**Dimensi data:** {grid_df.shape[0]} baris × {grid_df.shape[1]} kolom")
                             st.dataframe(grid_df.head(), width='stretch')
                         
+                        # Perbandingan memori skema category vs kolom object lama
+                        with st.expander("💾 Memori Grid (skema dtype)"):
+                            report = memory_report(grid_df, slot_strings)
+                            total = report.iloc[-1]
+                            st.caption(
+                                f"Skema category: {total['SKEMA'] / 1024:,.1f} KB vs "
+                                f"object: {total['LAMA'] / 1024:,.1f} KB (hemat {total['HEMAT']:.1f}%)"
+                            )
+                            st.dataframe(report, width='stretch', hide_index=True)
+                        
                         # Tampilkan errors jika ada
                         if errors:
                             st.warning(f"⚠️ **{len(errors)} peringatan:**")
@@ -121,6 +163,15 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
         # ======================================================
         st.subheader("💾 Download Hasil")
         
+        # File Excel hasil disiapkan di latar belakang; build lama dibatalkan
+        # jika grid diproses ulang atau pengaturan writer berubah
+        prebuild = _ensure_prebuild(writer, grid_df, slot_strings)
+        if prebuild is not None:
+            if prebuild.done():
+                _render_prebuild_download(prebuild)
+            else:
+                st.fragment(run_every=1.0)(_poll_prebuild)(prebuild)
+        
         col1, col2, col3 = st.columns(3)
         
         with col1:
@@ -133,7 +184,8 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
         
         with col3:
             if st.button("🔄 Proses Ulang", width='stretch', key="reprocess"):
-                for key in ["processed_data", "slot_strings", "processing_errors"]:
+                _cancel_prebuild()
+                for key in ["processed_data", "slot_strings", "processing_errors", "validation"]:
                     if key in st.session_state:
                         del st.session_state[key]
                 st.rerun()
@@ -155,7 +207,8 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
                     output_buffer = writer.write(
                         source_file=file_stream,
                         df_grid=grid_df,
-                        slot_str=slot_strings
+                        slot_str=slot_strings,
+                        validation=st.session_state.get("validation")
                     )
                     
                     # Buat nama file dengan timestamp
@@ -173,6 +226,15 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
                     )
                     
                     st.success("✅ File Excel siap di-download!")
+                    if writer.last_cache_hit:
+                        st.caption("⚡ File diambil dari cache (grid & pengaturan sama dengan export sebelumnya)")
+                    elif writer.last_timings:
+                        with st.expander("⏱️ Waktu per sheet"):
+                            timings = pd.DataFrame([
+                                {"SHEET": name, "DATA (s)": round(t["data"], 2), "TULIS (s)": round(t["tulis"], 2)}
+                                for name, t in writer.last_timings.items()
+                            ])
+                            st.dataframe(timings, width='stretch', hide_index=True)
             
             except Exception as e:
                 st.error(f"❌ Gagal membuat file Excel: {str(e)}")
@@ -212,6 +274,9 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
             1. **Sheet 'Reguler'** - Berisi jadwal reguler
             2. **Sheet 'Poleks'** - Berisi jadwal poleks
             
+            Atau beberapa sheet (mis. satu per poli / lokasi) yang cocok dengan
+            **Pola Sheet Jadwal** di sidebar; Jenis Poli diambil dari kolom sheet.
+            
             **Kolom yang harus ada di setiap sheet:**
             - `Nama Dokter` - Nama lengkap dokter
             - `Poli Asal` - Nama poli
@@ -222,3 +287,80 @@ def render_upload_tab(scheduler, writer, analyzer, validator, config):
             - `Kamis` - Format sama
             - `Jum'at` - Format sama
             """)
+
+
+# ======================================================
+# SESI WORKBOOK UPLOAD
+# ======================================================
+
+def _uploaded_workbook():
+    """WorkbookSession untuk file upload saat ini (dibuat sekali per isi file)"""
+    workbook = st.session_state.get("uploaded_workbook")
+    if workbook is None:
+        workbook = WorkbookSession.from_bytes(st.session_state["uploaded_file_bytes"])
+        st.session_state["uploaded_workbook"] = workbook
+    return workbook
+
+
+# ======================================================
+# PRE-GENERATE FILE EXCEL (LATAR BELAKANG)
+# ======================================================
+
+def _ensure_prebuild(writer, grid_df, slot_strings):
+    """Pastikan ada build latar belakang untuk grid & pengaturan saat ini"""
+    if st.session_state.get("uploaded_file_bytes") is None:
+        return None
+    
+    job = st.session_state.get("output_prebuild")
+    signature = OutputPrebuilder.signature(writer, grid_df, slot_strings)
+    if job is not None and job.signature == signature:
+        return job
+    
+    if job is not None:
+        job.cancel()
+    try:
+        job = OutputPrebuilder.start(
+            writer,
+            st.session_state["uploaded_file_bytes"],
+            grid_df,
+            slot_strings,
+            validation=st.session_state.get("validation")
+        )
+    except Exception as e:
+        print(f"⚠️ Output prebuild not started: {e}")
+        job = None
+    st.session_state["output_prebuild"] = job
+    return job
+
+
+def _cancel_prebuild():
+    """Batalkan build latar belakang yang sedang berjalan (jika ada)"""
+    job = st.session_state.pop("output_prebuild", None)
+    if job is not None:
+        job.cancel()
+
+
+def _poll_prebuild(job):
+    """Status build selama masih berjalan (fragment, dicek ulang tiap detik)"""
+    if job.done():
+        st.rerun()
+    st.info("⏳ File Excel sedang disiapkan di latar belakang... (halaman tetap bisa dipakai)")
+
+
+def _render_prebuild_download(job):
+    """Tombol download untuk file hasil build latar belakang"""
+    data = job.result()
+    if data is not None:
+        filename = f"jadwal_hasil_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        st.download_button(
+            label=f"⬇️ Download Excel (siap): {filename}",
+            data=data,
+            file_name=filename,
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            type="primary",
+            width='stretch',
+            key="prebuilt_download_button"
+        )
+    elif job.error() is not None:
+        st.warning(f"⚠️ File Excel gagal disiapkan di latar belakang: {job.error()}. "
+                   f"Gunakan tombol 📥 Download Excel Hasil.")
@@ -2,8 +2,12 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
+import numpy as np
 import re
 
+from app.core.aggregates import ScheduleAggregates
+from app.core.schema import to_long
+
 def render_visualization_tab(config):
 
     st.subheader("📊 Visualisasi Jadwal")
@@ -34,32 +38,23 @@ def render_visualization_tab(config):
     # ======================================================
     if viz == "Heatmap":
 
-        records = []
-        for _, r in df.iterrows():
-            for ts in time_slots:
-                val = 0
-                if r[ts] == "R":
-                    val = 1
-                elif r[ts] == "E":
-                    val = 2
-                elif r[ts] not in ["", None]:
-                    # warna lain (overload)
-                    val = 3
-
-                records.append({
-                    "Hari": r["HARI"],
-                    "Waktu": ts,
-                    "Val": val
-                })
+        # Format panjang ber-skema: hanya sel terisi, KODE 1 = R, 2 = E,
+        # -1 = nilai lain (warna overload)
+        long_df = to_long(df, time_slots)
+        long_df["Val"] = np.where(long_df["KODE"] < 0, 3, long_df["KODE"])
 
         pivot = (
-            pd.DataFrame(records)
-            .pivot_table(index="Hari", columns="Waktu", values="Val", aggfunc="max", fill_value=0)
+            long_df.groupby(["HARI", "SLOT"], observed=True)["Val"].max()
+            .unstack(fill_value=0)
+            .reindex(columns=time_slots, fill_value=0)
         )
+        pivot.columns.name = "Waktu"
 
         # urutkan hari sesuai config, tapi hanya yang ada
-        valid_order = [h for h in config.hari_list if h in pivot.index]
-        pivot = pivot.reindex(valid_order)
+        hari_ada = set(df["HARI"].dropna())
+        valid_order = [h for h in config.hari_list if h in hari_ada]
+        pivot = pivot.reindex(valid_order, fill_value=0)
+        pivot.index.name = "Hari"
 
         # BARU: warna heatmap sesuai sistem (Putih, Hijau, Biru, Merah)
         color_scale = [
@@ -93,9 +88,10 @@ def render_visualization_tab(config):
     # ======================================================
     elif viz == "Statistik":
 
-        total_slots = len(df) * len(time_slots)
-        total_r = (df[time_slots] == "R").sum().sum()
-        total_e = (df[time_slots] == "E").sum().sum()
+        aggregates = ScheduleAggregates.for_grid(df, time_slots)
+        total_slots = aggregates.total_slots
+        total_r = aggregates.total_r
+        total_e = aggregates.total_e
 
         colA, colB, colC = st.columns(3)
 
@@ -0,0 +1,108 @@
+# benchmarks/bench_grid_format.py
+"""
+Benchmark Scheduler._create_grid_format (pivot/scatter) vs implementasi lama
+(masking per kombinasi POLI/JENIS/HARI/DOKTER).
+
+Jalankan dari root repo:
+    python benchmarks/bench_grid_format.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.config import Config
+from app.core.scheduler import Scheduler
+
+
+def make_slot_df(n_combos, slot_strings, seed=0):
+    """Buat slot_df sintetis dengan n_combos kombinasi dokter-hari"""
+    rng = np.random.default_rng(seed)
+    hari = np.array(Config().hari_list, dtype=object)
+    n_slots = len(slot_strings)
+
+    combo_poli = rng.integers(0, max(2, n_combos // 20), n_combos)
+    combo_hari = rng.integers(0, len(hari), n_combos)
+    combo_jenis = rng.integers(0, 2, n_combos)
+    starts = rng.integers(0, n_slots - 1, n_combos)
+    lengths = rng.integers(1, n_slots // 2, n_combos)
+    ends = np.minimum(starts + lengths, n_slots)
+
+    counts = ends - starts
+    combo = np.repeat(np.arange(n_combos), counts)
+    slot = np.repeat(starts, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+
+    jenis = np.where(combo_jenis == 1, 'Poleks', 'Reguler').astype(object)
+    return pd.DataFrame({
+        'POLI': np.char.add('Poli ', combo_poli.astype(str)).astype(object)[combo],
+        'JENIS': jenis[combo],
+        'HARI': hari[combo_hari][combo],
+        'DOKTER': np.char.add('dr. ', np.arange(n_combos).astype(str)).astype(object)[combo],
+        'SLOT': np.asarray(slot_strings, dtype=object)[slot],
+        'KODE': np.where(jenis == 'Poleks', 'E', 'R').astype(object)[combo],
+    })
+
+
+def legacy_create_grid_format(slot_df, slot_strings):
+    """Implementasi lama: satu mask penuh per kombinasi dan per slot"""
+    unique_combos = slot_df[['POLI', 'JENIS', 'HARI', 'DOKTER']].drop_duplicates()
+    grid_rows = []
+    for _, combo in unique_combos.iterrows():
+        mask = (
+            (slot_df['POLI'] == combo['POLI']) &
+            (slot_df['JENIS'] == combo['JENIS']) &
+            (slot_df['HARI'] == combo['HARI']) &
+            (slot_df['DOKTER'] == combo['DOKTER'])
+        )
+        combo_data = slot_df[mask]
+        row_data = {col: combo[col] for col in ['POLI', 'JENIS', 'HARI', 'DOKTER']}
+        for slot in slot_strings:
+            slot_mask = combo_data['SLOT'] == slot
+            row_data[slot] = combo_data[slot_mask]['KODE'].iloc[0] if slot_mask.any() else ''
+        grid_rows.append(row_data)
+    return pd.DataFrame(grid_rows)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    config = Config()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scheduler = Scheduler(parser=None, cleaner=None, config=config)
+    slot_strings = scheduler.get_slot_strings()
+
+    print(f"{'combos':>8} {'entries':>9} {'legacy (s)':>11} {'pivot (s)':>10} {'speedup':>8}")
+    for n_combos in [100, 500, 1000, 2000, 5000, 20000]:
+        slot_df = make_slot_df(n_combos, slot_strings)
+
+        new_grid, new_time = timed(scheduler._create_grid_format, slot_df, slot_strings)
+
+        # Implementasi lama terlalu lambat untuk ukuran besar
+        if n_combos <= 2000:
+            old_grid, old_time = timed(legacy_create_grid_format, slot_df, slot_strings)
+            pd.testing.assert_frame_equal(
+                old_grid[slot_strings], new_grid[slot_strings], check_dtype=False
+            )
+            old_text = f"{old_time:11.3f}"
+            speedup = f"{old_time / new_time:7.0f}x"
+        else:
+            old_text = f"{'-':>11}"
+            speedup = f"{'-':>8}"
+
+        print(f"{n_combos:>8} {len(slot_df):>9} {old_text} {new_time:10.3f} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,7 @@ import streamlit as st
 try:
     from app.config import Config
     from app.core.scheduler import Scheduler
+    from app.core.incremental import RosterRunCache
     from app.core.cleaner import DataCleaner
     from app.core.excel_writer import ExcelWriter
     from app.core.time_parser import TimeParser
@@ -71,7 +72,9 @@ try:
     time_parser = TimeParser(
         start_hour=config.start_hour,
         start_minute=config.start_minute,
-        interval_minutes=config.interval_minutes
+        interval_minutes=config.interval_minutes,
+        end_hour=config.end_hour,
+        end_minute=config.end_minute
     )
     
     # Test TimeParser dengan generate slots
@@ -79,16 +82,22 @@ try:
     print(f"🕐 Generated {len(slots)} time slots: {slots[:3]}...")
     
     # Inisialisasi objek lainnya
-    cleaner = DataCleaner()
+    cleaner = DataCleaner(config=config)
     print("✅ DataCleaner initialized")
     
     analyzer = ErrorAnalyzer()
     print("✅ ErrorAnalyzer initialized")
     
+    # Cache run Scheduler disimpan di session agar re-upload roster
+    # yang direvisi hanya memproses baris yang berubah
+    if "run_cache" not in st.session_state:
+        st.session_state["run_cache"] = RosterRunCache()
+
     scheduler = Scheduler(
         parser=time_parser,
         cleaner=cleaner,
-        config=config
+        config=config,
+        run_cache=st.session_state["run_cache"]
     )
     print("✅ Scheduler initialized")
     
@@ -122,6 +131,22 @@ st.set_page_config(
 
 render_sidebar(config)
 
+# ============================================================
+# REGRID SAAT INTERVAL / JAM MULAI BERUBAH
+# ============================================================
+# Rentang waktu hasil proses tersimpan dalam menit di run_cache, jadi
+# perubahan slot di sidebar cukup menurunkan ulang grid tanpa baca Excel
+
+if (st.session_state.get("processed_data") is not None and
+        st.session_state.get("slot_strings") != scheduler.get_slot_strings()):
+    grid_df, slot_strings, errors = scheduler.regrid()
+    if grid_df is not None:
+        st.session_state["processed_data"] = grid_df
+        st.session_state["slot_strings"] = slot_strings
+        st.session_state["processing_errors"] = errors
+        st.session_state["validation"] = scheduler.last_validation
+        st.toast(f"🔁 Grid diperbarui ke {len(slot_strings)} slot tanpa membaca ulang file")
+
 # ============================================================
 # MAIN CONTENT
 # ============================================================
@@ -174,11 +199,19 @@ with st.expander("ℹ️ Debug Information"):
     with col2:
         st.write("**Configuration:**")
         st.write(f"- Start Time: {config.start_hour:02d}:{config.start_minute:02d}")
+        st.write(f"- End Time: {config.end_hour:02d}:{config.end_minute:02d}")
         st.write(f"- Interval: {config.interval_minutes} menit")
         st.write(f"- Max Poleks per Slot: {config.max_poleks_per_slot}")
         st.write(f"- Auto Fix Errors: {config.auto_fix_errors}")
         st.write(f"- Enable Sabtu: {config.enable_sabtu}")
         st.write(f"- Hari List: {config.hari_list}")
+        
+        # Statistik memo parse waktu (untuk tuning MEMO_MAXSIZE)
+        parse_stats = TimeParser.cache_stats()
+        st.write("**Time Parser Cache:**")
+        st.write(f"- Nilai di-parse: {parse_stats['values']} sel, {parse_stats['unique']} string unik")
+        st.write(f"- Hit rate memo: {parse_stats['hit_rate']:.1%} ({parse_stats['hits']} hit, {parse_stats['parsed']} parse)")
+        st.write(f"- Ukuran memo: {parse_stats['memo_size']} / {parse_stats['memo_maxsize']}")
 
 # ============================================================
 # STYLE CUSTOMIZATION